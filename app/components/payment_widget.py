@@ -2,9 +2,20 @@
 Payment Widget Component
 Renders the payment page when user clicks "Proceed to Payment"
 """
+import sys
+from pathlib import Path
+
 import streamlit as st
 import requests
 
+# The repo root, so the UI shares the backend's definition of a final status
+_ROOT = str(Path(__file__).resolve().parents[2])
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
+from backend.utils.payment_status import FINAL_STATUSES
+from components.session_store import load_trip
+
 
 def render_payment_page(api_base: str):
     """Render the payment checkout page."""
@@ -19,12 +30,8 @@ def render_payment_page(api_base: str):
     if amount_cents == 0 or amount_cents is None or product_name == "Travel Insurance Policy":
         sid = st.session_state.get("session_id", "default")
         try:
-            from pathlib import Path
-            import json
-            sess_dir = Path(".sessions")
-            trip_file = sess_dir / f"{sid}.trip.json"
-            if trip_file.exists():
-                trip_data = json.loads(trip_file.read_text(encoding="utf-8"))
+            trip_data = load_trip(sid)
+            if trip_data:
                 quotes = trip_data.get("quotes", [])
                 recommended = trip_data.get("recommended_plan", "")
                 
@@ -109,30 +116,64 @@ def render_payment_page(api_base: str):
         st.query_params = params
         st.rerun()
     
-    # Payment status check (optional - can poll for status)
+    # Live payment status: long-polls the API, which answers as soon as the
+    # webhook lands (or after STATUS_WAIT_SECONDS with no change).
     if payment_intent_id:
-        with st.expander("Check Payment Status", expanded=False):
-            if st.button("Refresh Status"):
-                try:
-                    status_resp = requests.get(
-                        f"{api_base}/payment-status/{payment_intent_id}",
-                        timeout=10
-                    )
-                    if status_resp.status_code == 200:
-                        status_data = status_resp.json()
-                        payment_status = status_data.get("payment_status", "unknown")
-                        
-                        if payment_status == "completed":
-                            st.success("✅ Payment completed successfully!")
-                            st.balloons()
-                            st.session_state["payment_confirmed"] = True
-                        elif payment_status == "pending":
-                            st.info("⏳ Payment is pending. Please complete the checkout process.")
-                        elif payment_status == "failed":
-                            st.error("❌ Payment failed. Please try again.")
-                        else:
-                            st.warning(f"⚠️ Payment status: {payment_status}")
-                    else:
-                        st.warning("Could not check payment status.")
-                except Exception as e:
-                    st.error(f"Error checking status: {e}")
+        with st.container(border=True):
+            st.markdown("### Payment Status")
+            _render_payment_status(api_base, payment_intent_id)
+
+
+STATUS_WAIT_SECONDS = 10
+
+
+def _show_status(payment_status: str) -> None:
+    if payment_status == "completed":
+        st.success("✅ Payment completed successfully!")
+    elif payment_status == "pending":
+        st.info("⏳ Payment is pending. Please complete the checkout process.")
+    elif payment_status == "failed":
+        st.error("❌ Payment failed. Please try again.")
+    elif payment_status in ("expired", "abandoned"):
+        st.warning("⌛ Checkout session expired. Please start the payment again.")
+    else:
+        st.warning(f"⚠️ Payment status: {payment_status}")
+
+
+@st.fragment(run_every=1)
+def _render_payment_status(api_base: str, payment_intent_id: str) -> None:
+    """
+    Show the payment status, waiting server-side for the next change. Keeps
+    listening until a final status: a failed payment can still complete.
+    """
+    key = f"payment_status_{payment_intent_id}"
+    known = st.session_state.get(key)
+    if known in FINAL_STATUSES:
+        _show_status(known)
+        return
+    if known == "unavailable":
+        st.caption("Payment status is not available (no payment database configured).")
+        return
+
+    try:
+        status_resp = requests.get(
+            f"{api_base}/payment-status/{payment_intent_id}",
+            params={"wait": STATUS_WAIT_SECONDS, "status": known} if known else {},
+            timeout=STATUS_WAIT_SECONDS + 5,
+        )
+    except requests.RequestException as e:
+        st.error(f"Error checking status: {e}")
+        return
+
+    if status_resp.status_code != 200:
+        # Not found / no database: stop asking
+        st.session_state[key] = "unavailable"
+        st.warning("Could not check payment status.")
+        return
+
+    payment_status = status_resp.json().get("payment_status", "unknown")
+    st.session_state[key] = payment_status
+    _show_status(payment_status)
+    if payment_status == "completed" and known != "completed":
+        st.balloons()
+        st.session_state["payment_confirmed"] = True
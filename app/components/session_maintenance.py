@@ -0,0 +1,207 @@
+"""
+Session Maintenance Component
+Lifecycle management for the `.sessions` store: shard legacy flat files,
+expire idle sessions, drop empty trip payloads and report store size.
+
+Run manually or from cron:
+    python app/components/session_maintenance.py --migrate --sweep --report
+The Streamlit app also runs an hourly sweep in a background thread.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from components.session_store import (
+    SESS_DIR,
+    ARCHIVE_SUFFIX,
+    LOG_SUFFIX,
+    TRIP_SUFFIX,
+    LEGACY_SUFFIX,
+    migrate_flat,
+)
+
+SESSION_TTL_DAYS = float(os.getenv("SESSION_TTL_DAYS", "30"))
+
+# Longest suffix first so "x.trip.json" is not mistaken for "x" + ".json"
+# (and "x.archive.jsonl" for "x.archive" + ".jsonl").
+_SUFFIXES = (ARCHIVE_SUFFIX, TRIP_SUFFIX, LOG_SUFFIX, LEGACY_SUFFIX)
+
+
+def _split_name(name: str) -> tuple[str, str] | None:
+    for suffix in _SUFFIXES:
+        if name.endswith(suffix):
+            return name[: -len(suffix)], suffix
+    return None
+
+
+def _mtime(path: str) -> float | None:
+    """Fresh mtime (DirEntry.stat() is cached), or None if the file is gone."""
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.unlink(path)
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        print(f"⚠ Could not remove {path}: {e}")
+        return False
+
+
+def _is_empty_payload(entry: os.DirEntry) -> bool:
+    """True for trip payloads that carry no data (`{}`, `null`, blank)."""
+    try:
+        if entry.stat().st_size > 64:
+            return False
+        return not json.loads(Path(entry.path).read_text(encoding="utf-8") or "null")
+    except (OSError, ValueError):
+        return False
+
+
+def _iter_shards():
+    with os.scandir(SESS_DIR) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield entry.path
+
+
+def migrate_flat_files() -> int:
+    """
+    Move pre-sharding files from `.sessions/` into their shard directories,
+    merging with any shard copy (see session_store.migrate_flat).
+    """
+    moved = 0
+    with os.scandir(SESS_DIR) as it:
+        flat = [e for e in it if e.is_file(follow_symlinks=False)]
+    for entry in flat:
+        parts = _split_name(entry.name)
+        if not parts:
+            continue
+        try:
+            moved += migrate_flat(*parts)
+        except OSError as e:
+            print(f"⚠ Could not migrate {entry.path}: {e}")
+    return moved
+
+
+def sweep(ttl_days: float = SESSION_TTL_DAYS, now: float | None = None) -> dict:
+    """
+    Expire idle sessions and drop empty trip payloads.
+
+    A session is idle when the newest of its files (chat log, trip payload)
+    is older than `ttl_days`; all of its files are removed together so an
+    active chat never loses its trip data. Works one shard at a time, so
+    memory stays bounded by the largest shard.
+
+    Live writers keep appending while this runs, so mtimes are read fresh
+    (not from the scandir cache), files that vanish are skipped, and an
+    error on one file never stops the sweep.
+    """
+    cutoff = (now or time.time()) - ttl_days * 86400
+    stats = {"expired_sessions": 0, "empty_trips": 0, "removed_files": 0}
+
+    for shard in _iter_shards():
+        sessions: dict[str, list[os.DirEntry]] = {}
+        with os.scandir(shard) as it:
+            for entry in it:
+                if entry.name.endswith(".tmp"):
+                    continue
+                parts = _split_name(entry.name)
+                if parts:
+                    sessions.setdefault(parts[0], []).append(entry)
+
+        for sid, entries in sessions.items():
+            mtimes = [m for m in (_mtime(e.path) for e in entries) if m is not None]
+            if not mtimes:
+                continue
+            if max(mtimes) < cutoff:
+                removed = sum(_remove(e.path) for e in entries)
+                stats["expired_sessions"] += 1
+                stats["removed_files"] += removed
+                continue
+            for e in entries:
+                if e.name.endswith(TRIP_SUFFIX) and _is_empty_payload(e) and _remove(e.path):
+                    stats["empty_trips"] += 1
+                    stats["removed_files"] += 1
+    return stats
+
+
+def report() -> dict:
+    """Return file count, byte size and session count for the store."""
+    files = total_bytes = 0
+    sessions: set[str] = set()
+    by_kind = {"chat": 0, "archive": 0, "trip": 0, "legacy": 0}
+    kind_of = {LOG_SUFFIX: "chat", ARCHIVE_SUFFIX: "archive", TRIP_SUFFIX: "trip", LEGACY_SUFFIX: "legacy"}
+
+    dirs = [str(SESS_DIR)] + list(_iter_shards())
+    shards = len(dirs) - 1
+    for d in dirs:
+        with os.scandir(d) as it:
+            for entry in it:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                parts = _split_name(entry.name)
+                if not parts:
+                    continue
+                try:
+                    size = entry.stat().st_size
+                except OSError:
+                    continue
+                files += 1
+                total_bytes += size
+                sessions.add(parts[0])
+                by_kind[kind_of[parts[1]]] += 1
+
+    return {
+        "files": files,
+        "bytes": total_bytes,
+        "sessions": len(sessions),
+        "shards": shards,
+        "by_kind": by_kind,
+    }
+
+
+def run_maintenance(ttl_days: float = SESSION_TTL_DAYS) -> dict:
+    """
+    Shard any flat files, then sweep; used by the app's background thread,
+    so failures are logged rather than silently ending the thread.
+    """
+    try:
+        moved = migrate_flat_files()
+        return {"migrated": moved, **sweep(ttl_days)}
+    except Exception as e:
+        print(f"⚠ Session maintenance failed: {e}")
+        return {"error": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the .sessions store.")
+    parser.add_argument("--migrate", action="store_true", help="shard legacy flat files")
+    parser.add_argument("--sweep", action="store_true", help="expire idle sessions and empty trips")
+    parser.add_argument("--ttl-days", type=float, default=SESSION_TTL_DAYS)
+    parser.add_argument("--report", action="store_true", help="print store size and file count")
+    args = parser.parse_args()
+
+    if not (args.migrate or args.sweep or args.report):
+        args.report = True
+    if args.migrate:
+        print(f"Moved {migrate_flat_files()} flat files into shards")
+    if args.sweep:
+        print(json.dumps(sweep(args.ttl_days)))
+    if args.report:
+        print(json.dumps(report(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
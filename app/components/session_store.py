@@ -0,0 +1,356 @@
+"""
+Session Store Component
+Append-only JSONL chat log and trip payloads backing the Streamlit session.
+
+Files are sharded by session-id prefix: `.sessions/<shard>/<sid>.jsonl` for
+the chat log and `.sessions/<shard>/<sid>.trip.json` for uploaded trip data.
+Chat appends are a single O_APPEND write under an exclusive lock, and reads
+walk backwards from the end so only the most recent page is parsed.
+
+Once the active log grows past SESSION_LOG_COMPACT_BYTES, its older lines
+are rotated byte-for-byte onto `<sid>.archive.jsonl`. History is never
+dropped: the archive followed by the active log is the same byte stream
+before and after a rotation, so load_recent() cursors (offsets into that
+stream) stay valid and "Show earlier messages" reaches the first message.
+Expiry and reporting live in session_maintenance.
+"""
+import json
+import os
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends stay atomic, compaction is best-effort
+    fcntl = None
+
+SESS_DIR = Path(".sessions")
+SESS_DIR.mkdir(exist_ok=True)
+
+LOG_SUFFIX = ".jsonl"
+ARCHIVE_SUFFIX = ".archive.jsonl"
+TRIP_SUFFIX = ".trip.json"
+LEGACY_SUFFIX = ".json"
+
+# Leading characters of the session id's random part used as the shard
+# directory name; 2 hex chars -> 256 shards.
+SHARD_CHARS = 2
+
+# Rotate once the active log passes this size; the active log then keeps at
+# most half of it (and at most SESSION_LOG_MAX_MESSAGES messages) so rewrites
+# stay amortised O(1). Older lines move to the archive segment.
+COMPACT_BYTES = int(os.getenv("SESSION_LOG_COMPACT_BYTES", str(2 * 1024 * 1024)))
+MAX_MESSAGES = int(os.getenv("SESSION_LOG_MAX_MESSAGES", "1000"))
+PAGE_SIZE = 50
+
+_READ_BLOCK = 64 * 1024
+_known_shards: set[str] = set()
+
+
+def shard_for(sid: str) -> str:
+    """Shard directory name for a session id (e.g. user_0d8d0925 -> 0d)."""
+    key = sid.rsplit("_", 1)[-1].lower()[:SHARD_CHARS]
+    return key.ljust(SHARD_CHARS, "_")
+
+
+def session_path(sid: str, suffix: str) -> Path:
+    shard = shard_for(sid)
+    if shard not in _known_shards:
+        (SESS_DIR / shard).mkdir(exist_ok=True)
+        _known_shards.add(shard)
+    return SESS_DIR / shard / f"{sid}{suffix}"
+
+
+def _log_path(sid: str) -> Path:
+    return session_path(sid, LOG_SUFFIX)
+
+
+def migrate_flat(sid: str, suffix: str) -> bool:
+    """
+    Move a pre-sharding `.sessions/<sid><suffix>` file into its shard.
+
+    When the shard already has that file the two are merged, the flat file
+    holding the older data, instead of one being discarded. Returns True
+    if a flat file was moved or merged.
+    """
+    flat = SESS_DIR / f"{sid}{suffix}"
+    if not flat.exists():
+        return False
+    target = session_path(sid, suffix)
+    if suffix == LOG_SUFFIX:
+        return _merge_log(sid, flat, target)
+    try:
+        if not target.exists():
+            os.replace(flat, target)
+            return True
+        _merge_json(flat, target)
+    except FileNotFoundError:  # another process migrated it first
+        return False
+    return True
+
+
+def _lock(fd: int, exclusive: bool = True) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+
+def _is_current(fd: int, path: Path) -> bool:
+    """True if `fd` still refers to `path` (i.e. no compaction replaced it)."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    fst = os.fstat(fd)
+    return (st.st_dev, st.st_ino) == (fst.st_dev, fst.st_ino)
+
+
+def _encode(message: dict) -> bytes:
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path):
+    try:
+        return json.loads(path.read_text(encoding="utf-8") or "null")
+    except ValueError:
+        return None
+
+
+def _merge_json(flat: Path, target: Path) -> None:
+    """Merge a flat trip payload or legacy transcript into its shard copy (shard wins)."""
+    older, newer = _read_json(flat), _read_json(target)
+    if isinstance(older, dict) and isinstance(newer, dict):
+        merged = {**older, **newer}
+    elif isinstance(older, list) and isinstance(newer, list):
+        merged = older + newer
+    else:
+        merged = newer if newer else older
+    _write_atomic(target, json.dumps(merged, ensure_ascii=False).encode("utf-8"))
+    flat.unlink(missing_ok=True)
+
+
+def _merge_log(sid: str, flat: Path, target: Path) -> bool:
+    """Prepend a flat chat log to the sharded one under its exclusive lock."""
+    while True:
+        try:
+            fd = os.open(target, os.O_RDWR)
+        except FileNotFoundError:
+            try:
+                os.replace(flat, target)
+                return True
+            except FileNotFoundError:
+                return False
+        try:
+            _lock(fd)
+            if not _is_current(fd, target):
+                continue
+            try:
+                older = flat.read_bytes()
+            except FileNotFoundError:
+                return False
+            if older and not older.endswith(b"\n"):
+                older += b"\n"
+            # The oldest lines belong at the head of the history: the
+            # archive segment if the log has rotated, else the log itself.
+            archive = session_path(sid, ARCHIVE_SUFFIX)
+            head = archive if archive.exists() else target
+            if head == target:
+                with os.fdopen(os.dup(fd), "rb") as f:
+                    current = f.read()
+            else:
+                current = head.read_bytes()
+            _write_atomic(head, older + current)
+            flat.unlink(missing_ok=True)
+            return True
+        finally:
+            os.close(fd)
+
+
+def _migrate_legacy(sid: str) -> None:
+    """Convert an old whole-file `<sid>.json` transcript into the JSONL log."""
+    migrate_flat(sid, LOG_SUFFIX)
+    migrate_flat(sid, LEGACY_SUFFIX)
+    legacy = session_path(sid, LEGACY_SUFFIX)
+    if not legacy.exists():
+        return
+    if not _log_path(sid).exists():
+        try:
+            messages = json.loads(legacy.read_text(encoding="utf-8"))
+        except Exception:
+            messages = []
+        if not isinstance(messages, list):
+            messages = []
+        _write_atomic(_log_path(sid), b"".join(_encode(m) for m in messages))
+    legacy.unlink(missing_ok=True)
+
+
+def append_message(sid: str, message: dict) -> None:
+    """Append one message to the session log."""
+    _migrate_legacy(sid)
+    path = _log_path(sid)
+    line = _encode(message)
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            _lock(fd)
+            # A concurrent compaction may have swapped the file under us.
+            if not _is_current(fd, path):
+                continue
+            os.write(fd, line)
+            size = os.fstat(fd).st_size
+            break
+        finally:
+            os.close(fd)
+    if size > COMPACT_BYTES:
+        compact(sid)
+
+
+def _split_point(data: bytes) -> int:
+    """Byte offset where the recent messages kept in the active log begin."""
+    lines = data.split(b"\n")
+    split = len(data) - len(lines[-1])  # a torn trailing line stays put
+    kept, budget = 0, COMPACT_BYTES // 2
+    for raw in reversed(lines[:-1]):
+        size = len(raw) + 1
+        if kept >= MAX_MESSAGES or (kept and budget < size):
+            break
+        budget -= size
+        split -= size
+        if raw.strip():
+            kept += 1
+    return split
+
+
+def compact(sid: str) -> None:
+    """
+    Rotate older messages from the active log onto the archive segment.
+
+    The newest messages (at most MAX_MESSAGES and COMPACT_BYTES // 2 bytes)
+    stay in the active log; everything before them is appended unchanged to
+    `<sid>.archive.jsonl` and the active log is replaced atomically. Both
+    steps run under the active log's exclusive lock, which readers also
+    take, so nobody sees the moved lines twice.
+    """
+    path = _log_path(sid)
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except FileNotFoundError:
+        return
+    try:
+        _lock(fd)
+        if not _is_current(fd, path):
+            return
+        with os.fdopen(os.dup(fd), "rb") as f:
+            data = f.read()
+        split = _split_point(data)
+        if split <= 0:
+            return
+
+        # A crash between these two writes duplicates lines, never loses them.
+        with open(session_path(sid, ARCHIVE_SUFFIX), "ab") as archive:
+            archive.write(data[:split])
+            archive.flush()
+            os.fsync(archive.fileno())
+        _write_atomic(path, data[split:])
+    finally:
+        os.close(fd)
+
+
+def _read_span(segments: list, start: int, end: int) -> bytes:
+    """Bytes [start, end) of the archive + active log stream."""
+    out = []
+    for f, base, size in segments:
+        lo, hi = max(start, base), min(end, base + size)
+        if lo < hi:
+            f.seek(lo - base)
+            out.append(f.read(hi - lo))
+    return b"".join(out)
+
+
+def load_recent(sid: str, limit: int = PAGE_SIZE, before: int | None = None) -> tuple[list[dict], int]:
+    """
+    Return up to `limit` messages that end before byte offset `before`.
+
+    Offsets address the session's whole history, the archive segment
+    followed by the active log. Reads backwards in blocks, so cost is
+    proportional to the page, not the whole transcript. Returns
+    (messages, cursor); pass `cursor` back as `before` to fetch the
+    previous page. A cursor of 0 means there is nothing older.
+    """
+    _migrate_legacy(sid)
+    path = _log_path(sid)
+    while True:
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return [], 0
+        with f:
+            _lock(f.fileno(), exclusive=False)
+            # A rotation replaced the log while we waited for the lock.
+            if not _is_current(f.fileno(), path):
+                continue
+            try:
+                archive = open(session_path(sid, ARCHIVE_SUFFIX), "rb")
+            except FileNotFoundError:
+                archive = None
+            try:
+                segments, base = [], 0
+                for seg in (archive, f):
+                    if seg is not None:
+                        size = os.fstat(seg.fileno()).st_size
+                        segments.append((seg, base, size))
+                        base += size
+                end = base if before is None else min(before, base)
+                pos, buf = end, b""
+                while pos > 0 and buf.count(b"\n") <= limit:
+                    step = min(_READ_BLOCK, pos)
+                    pos -= step
+                    buf = _read_span(segments, pos, pos + step) + buf
+            finally:
+                if archive is not None:
+                    archive.close()
+        break
+
+    if pos > 0:
+        # The first line is cut in half by the block boundary.
+        cut = buf.index(b"\n") + 1
+        pos, buf = pos + cut, buf[cut:]
+
+    # Last element is "" (clean end) or a torn append still in flight.
+    lines = buf.split(b"\n")[:-1]
+    skip = max(0, len(lines) - limit)
+    cursor = pos + sum(len(l) + 1 for l in lines[:skip])
+
+    messages = []
+    for raw in lines[skip:]:
+        try:
+            messages.append(json.loads(raw))
+        except ValueError:
+            continue
+    return messages, cursor
+
+
+def load_trip(sid: str) -> dict:
+    """Load the saved trip payload (uploads, merged trip, quotes) for a session."""
+    migrate_flat(sid, TRIP_SUFFIX)
+    try:
+        payload = json.loads(session_path(sid, TRIP_SUFFIX).read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+def save_trip(sid: str, payload: dict) -> None:
+    """Persist the trip payload; empty payloads remove the file instead."""
+    path = session_path(sid, TRIP_SUFFIX)
+    if not payload:
+        path.unlink(missing_ok=True)
+        return
+    _write_atomic(path, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
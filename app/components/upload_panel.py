@@ -1,34 +1,20 @@
 # components/upload_panel.py
 # Enhanced version with separate itinerary and ticket uploads
 
-import json
-import mimetypes
-from pathlib import Path
 from datetime import datetime
 
 import requests
 import streamlit as st
 
-SESS_DIR = Path(".sessions")
-SESS_DIR.mkdir(exist_ok=True)
-
-
-def _store_path(sid: str) -> Path:
-    return SESS_DIR / f"{sid}.trip.json"
+from components.session_store import load_trip, save_trip
 
 
 def _save_payload(sid: str, payload: dict) -> None:
-    _store_path(sid).write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    save_trip(sid, payload)
 
 
 def _load_payload(sid: str) -> dict:
-    p = _store_path(sid)
-    if p.exists():
-        try:
-            return json.loads(p.read_text(encoding="utf-8"))
-        except Exception:
-            return {}
-    return {}
+    return load_trip(sid)
 
 
 def _fmt_cost(val):
@@ -119,11 +105,23 @@ def _render_quotes(quotes: list[dict], recommended_plan: str):
         
         coverage_text = "\n".join(coverage_lines) if coverage_lines else "• Coverage details in policy PDF"
         
+        # Per-traveller breakdown for groups (one line per traveller type)
+        breakdown = q.get("per_traveller") or []
+        party_lines = []
+        if len(breakdown) > 1 or any(row.get("count", 1) > 1 for row in breakdown):
+            for row in breakdown:
+                party_lines.append(
+                    f"  – {row['count']} × {row['type']} @ `{row['unit_price']}` = `{row['subtotal']}`"
+                )
+            if q.get("family_cap_applied"):
+                party_lines.append("  – Family plan cap applied")
+        party_text = ("\n" + "\n".join(party_lines)) if party_lines else ""
+        
         st.markdown(
             f"""
 **{q['plan']}**  
 {coverage_text}
-• Price: `{q['price']}`  
+• Price: `{q['price']}`{party_text}  
 {highlight}  
 [View Policy PDF]({q['link']})
             """,
@@ -184,6 +182,73 @@ def _merge_trip_data(itinerary_data: dict, ticket_data: dict) -> dict:
     return merged
 
 
+def _upload_key(uploaded_file) -> str:
+    """
+    Identifies one upload, not one filename: re-uploading the same file (say
+    after a failed extraction) gets a new file_id and is sent again, while
+    page reruns keep the id and don't resubmit.
+    """
+    return getattr(uploaded_file, "file_id", None) or uploaded_file.name
+
+
+def _submit_extract_job(api_base: str, uploaded_file, doc_type: str) -> None:
+    """Queue extraction of an uploaded document; the UI stays responsive meanwhile."""
+    files = {"file": (uploaded_file.name, uploaded_file, uploaded_file.type)}
+    try:
+        resp = requests.post(
+            f"{api_base}/jobs/extract",
+            files=files,
+            data={"doc_type": doc_type},
+            timeout=30,
+        )
+    except requests.RequestException as e:
+        st.error(f"Upload failed: {e}")
+        return
+
+    if resp.status_code == 202:
+        jobs = st.session_state.setdefault("extract_jobs", {})
+        jobs[doc_type] = {"job_id": resp.json()["job_id"], "filename": uploaded_file.name}
+        st.session_state[f"last_{doc_type}_file"] = _upload_key(uploaded_file)
+    elif resp.status_code == 413:
+        st.error(f"{uploaded_file.name} is too large to upload.")
+    else:
+        st.error(f"Upload failed: {resp.status_code}")
+
+
+@st.fragment(run_every=2)
+def _render_extract_job(api_base: str, sid: str, doc_type: str) -> None:
+    """Poll a pending extraction job; store its result and refresh the page when done."""
+    job = st.session_state.get("extract_jobs", {}).get(doc_type)
+    if not job:
+        return
+
+    try:
+        resp = requests.get(f"{api_base}/jobs/{job['job_id']}", timeout=10)
+    except requests.RequestException:
+        st.info(f"Extracting {doc_type} information from {job['filename']}...")
+        return
+
+    if resp.status_code == 404:
+        st.session_state["extract_jobs"].pop(doc_type, None)
+        st.error("Extraction job expired. Please upload the file again.")
+        return
+
+    status = resp.json()
+    if status.get("status") == "done":
+        saved = _load_payload(sid)
+        saved[f"{doc_type}_data"] = status.get("result") or {}
+        _save_payload(sid, saved)
+        st.session_state["extract_jobs"].pop(doc_type, None)
+        st.rerun()
+    elif status.get("status") == "failed":
+        st.session_state["extract_jobs"].pop(doc_type, None)
+        st.error(f"Extraction failed: {status.get('error', 'Unknown error')}")
+    else:
+        eta = status.get("eta_seconds")
+        eta_text = f" (about {int(eta)}s left)" if eta else ""
+        st.info(f"Extracting {doc_type} information from {job['filename']}{eta_text}...")
+
+
 def render_upload_panel(api_base: str):
     """Enhanced upload panel with separate itinerary and ticket uploads."""
     st.header("Quick Buy Insurance")
@@ -219,30 +284,9 @@ def render_upload_panel(api_base: str):
         # Upload itinerary - check if this is a new file
         if itinerary_file:
             last_processed = st.session_state.get("last_itinerary_file", None)
-            if itinerary_file.name != last_processed:
-                with st.spinner("Extracting itinerary information..."):
-                    files = {"file": (itinerary_file.name, itinerary_file, itinerary_file.type)}
-                    data = {"doc_type": "itinerary"}
-                    
-                    resp = requests.post(
-                        f"{api_base}/upload_extract",
-                        files=files,
-                        data=data,
-                        timeout=120,
-                    )
-                    
-                    if resp.status_code == 200:
-                        result = resp.json()
-                        if result.get("ok"):
-                            saved["itinerary_data"] = result.get("data", {})
-                            st.session_state["last_itinerary_file"] = itinerary_file.name
-                            st.success(f"Extracted itinerary from {itinerary_file.name}")
-                            _save_payload(sid, saved)
-                            st.rerun()
-                        else:
-                            st.error(f"Extraction failed: {result.get('error', 'Unknown error')}")
-                    else:
-                        st.error(f"Upload failed: {resp.status_code}")
+            if _upload_key(itinerary_file) != last_processed:
+                _submit_extract_job(api_base, itinerary_file, "itinerary")
+        _render_extract_job(api_base, sid, "itinerary")
     
     with st.container(border=True):
         st.markdown("#### Step 2: Upload Ticket Information")
@@ -269,30 +313,9 @@ def render_upload_panel(api_base: str):
         # Upload ticket - check if this is a new file
         if ticket_file:
             last_processed = st.session_state.get("last_ticket_file", None)
-            if ticket_file.name != last_processed:
-                with st.spinner("Extracting ticket information..."):
-                    files = {"file": (ticket_file.name, ticket_file, ticket_file.type)}
-                    data = {"doc_type": "ticket"}
-                    
-                    resp = requests.post(
-                        f"{api_base}/upload_extract",
-                        files=files,
-                        data=data,
-                        timeout=120,
-                    )
-                    
-                    if resp.status_code == 200:
-                        result = resp.json()
-                        if result.get("ok"):
-                            saved["ticket_data"] = result.get("data", {})
-                            st.session_state["last_ticket_file"] = ticket_file.name
-                            st.success(f"Extracted ticket info from {ticket_file.name}")
-                            _save_payload(sid, saved)
-                            st.rerun()
-                        else:
-                            st.error(f"Extraction failed: {result.get('error', 'Unknown error')}")
-                    else:
-                        st.error(f"Upload failed: {resp.status_code}")
+            if _upload_key(ticket_file) != last_processed:
+                _submit_extract_job(api_base, ticket_file, "ticket")
+        _render_extract_job(api_base, sid, "ticket")
     
     # Generate Quotes section
     if saved.get("itinerary_data") or saved.get("ticket_data"):
@@ -1,12 +1,11 @@
 import streamlit as st
 import requests
 import uuid
-import json
-import base64
-import io
-from pathlib import Path
+import threading
 from components.upload_panel import render_upload_panel
 from components.payment_widget import render_payment_page
+from components.session_store import append_message, load_recent
+from components.session_maintenance import run_maintenance
 
 # ===========================
 # Config
@@ -154,25 +153,20 @@ st.set_page_config(page_title="MSIG Travel Assistant", layout="wide")
 st.markdown(f"<style>{MSIG_CSS}</style>", unsafe_allow_html=True)
 
 # ===========================
-# Tiny on-disk session store (for chat persistence)
+# On-disk session store (append-only JSONL, see components/session_store.py)
 # ===========================
-SESS_DIR = Path(".sessions")
-SESS_DIR.mkdir(exist_ok=True)
+def record_message(role: str, content: str) -> None:
+    msg = {"role": role, "content": content}
+    st.session_state.messages.append(msg)
+    append_message(st.session_state.session_id, msg)
 
-def _session_file(sid: str) -> Path:
-    return SESS_DIR / f"{sid}.json"
+@st.cache_resource(ttl=3600, show_spinner=False)
+def _schedule_session_sweep() -> bool:
+    # Expire idle sessions at most hourly per process, off the render path.
+    threading.Thread(target=run_maintenance, daemon=True).start()
+    return True
 
-def load_messages(sid: str) -> list[dict]:
-    p = _session_file(sid)
-    if not p.exists():
-        return []
-    try:
-        return json.loads(p.read_text(encoding="utf-8"))
-    except Exception:
-        return []
-
-def save_messages(sid: str, messages: list[dict]) -> None:
-    _session_file(sid).write_text(json.dumps(messages, ensure_ascii=False), encoding="utf-8")
+_schedule_session_sweep()
 
 # ===========================
 # Session bootstrap FIRST (before sidebar)
@@ -185,8 +179,10 @@ if not sid:
 
 # Always update session_id to match query params
 st.session_state.session_id = sid
-if "messages" not in st.session_state:
-  st.session_state.messages = load_messages(st.session_state.session_id)
+if st.session_state.get("messages_sid") != sid:
+  # Only the most recent page is parsed; older pages load on demand.
+  st.session_state.messages, st.session_state.history_cursor = load_recent(sid)
+  st.session_state.messages_sid = sid
 
 # ===========================
 # Handle payment success/cancel redirects
@@ -282,6 +278,8 @@ with col1:
     new_sid = f"user_{uuid.uuid4().hex[:8]}"
     st.session_state.session_id = new_sid
     st.session_state.messages = []
+    st.session_state.history_cursor = 0
+    st.session_state.messages_sid = new_sid
     st.query_params = {**st.query_params, "sid": new_sid}
     st.rerun()
 
@@ -292,6 +290,14 @@ st.subheader("Chat with MSIG Assistant")
 st.caption("Ask things like Which plan has better coverage? or Am I covered for skiing in Japan?")
 
 # Render history
+if st.session_state.get("history_cursor"):
+  if st.button("Show earlier messages"):
+    older, st.session_state.history_cursor = load_recent(
+      st.session_state.session_id, before=st.session_state.history_cursor
+    )
+    st.session_state.messages = older + st.session_state.messages
+    st.rerun()
+
 for msg in st.session_state.messages:
   with st.chat_message(msg["role"]):
     st.markdown(msg["content"], unsafe_allow_html=True)
@@ -302,8 +308,7 @@ text_prompt = st.chat_input("Ask about trip cancellation, medical coverage, elig
 # Process if we have input
 if text_prompt:
   # User message
-  st.session_state.messages.append({"role": "user", "content": text_prompt})
-  save_messages(st.session_state.session_id, st.session_state.messages)
+  record_message("user", text_prompt)
   with st.chat_message("user"):
     st.markdown(text_prompt)
 
@@ -320,10 +325,7 @@ if text_prompt:
         if resp.status_code != 200:
           st.error(f"Server error {resp.status_code}")
           st.code(resp.text)
-          st.session_state.messages.append(
-            {"role": "assistant", "content": f"Server error {resp.status_code}:\n{resp.text}"}
-          )
-          save_messages(st.session_state.session_id, st.session_state.messages)
+          record_message("assistant", f"Server error {resp.status_code}:\n{resp.text}")
         else:
           text = resp.text or "No response."
           try:
@@ -340,16 +342,13 @@ if text_prompt:
             pass
 
           st.markdown(text, unsafe_allow_html=True)
-          st.session_state.messages.append({"role": "assistant", "content": text})
-          save_messages(st.session_state.session_id, st.session_state.messages)
+          record_message("assistant", text)
 
       except requests.exceptions.Timeout:
         msg = "Timeout while contacting the API."
         st.error(msg)
-        st.session_state.messages.append({"role": "assistant", "content": msg})
-        save_messages(st.session_state.session_id, st.session_state.messages)
+        record_message("assistant", msg)
       except Exception as e:
         msg = f"API error: {e}"
         st.error(msg)
-        st.session_state.messages.append({"role": "assistant", "content": msg})
-        save_messages(st.session_state.session_id, st.session_state.messages)
+        record_message("assistant", msg)
@@ -3,56 +3,90 @@ backend/api.py
 --------------
 FastAPI bridge for the frontend. Exposes:
   - GET  /health
+  - GET  /ready
+  - GET  /metrics
+  - GET  /usage/tokens
+  - GET  /profiles/{request_id}
+  - GET  /policy_pdf/{filename}
   - POST /chat
+  - GET  /compare
+  - GET  /plans/search
   - POST /upload
   - POST /upload_extract
+  - POST /jobs/extract
+  - GET  /jobs/{job_id}
   - POST /payment-intent
   - POST /stripe-checkout
   - GET  /payment-status/{payment_intent_id}
+  - GET  /payment-status/{payment_intent_id}/events
   - POST /webhook/stripe
+  - GET  /webhooks/stats
 """
 
 import os
 import json
+import asyncio
 import traceback
 import time
 import uuid
 import logging
-from urllib.parse import quote as urlquote
+import threading
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
-from fastapi import FastAPI, Request, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, Request, UploadFile, File, Form, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-import stripe
-import boto3
-import requests
-
 # 🧠 Internal modules
-from backend.chains.conversational_agent import create_insurance_agent
+# Heavy dependencies (LangChain/Groq, stripe, boto3, requests, PyMuPDF) are
+# imported on first use, not here: see _get_agent(), _stripe() and
+# tests/benchmark_startup.py for the import-time budget.
 from backend.chains.response_formatter import format_response
 from backend.chains.intent import detect_intent
-from backend.chains.policy_comparator import load_all_policies
-from backend.ingestion.pdf_loader import extract_text_from_pdf
-from backend.utils.policy_extractor import (
-    init_llm, 
-    extract_itinerary_info,
-    extract_ticket_info,
-    extract_policy_summary, 
-    get_recommended_plan,
-    calculate_dynamic_price
-)
-from backend.utils.taxonomy_reader import load_policy_coverage
+from backend.chains.nlu import classify
+from backend.chains.policy_comparator import get_comparison_matrix, load_all_policies
+from backend.chains.plan_search import search_plans
+from backend.chains.citation_helper import load_page_map
+from backend.chains.retriever import RETRIEVAL_ENABLED, retrieve_clauses
+from backend.ingestion.optimize_pdfs import MANIFEST_PATH as PDF_MANIFEST_PATH, file_sha256
+from backend.utils.policy_extractor import extract_document
+from backend.utils.quote_cache import quote_cache
+from backend.utils.quote_engine import get_rate_table
+from backend.utils.token_ledger import classify_llm_error, ledger as token_ledger, usage_context
+from backend.utils.request_profiler import ProfilerMiddleware, is_admin, profile_path, profiling_enabled, safe_request_id
+from backend.utils.job_queue import JobQueue
+from backend.utils.metrics import Gauge, MetricsMiddleware, render as render_metrics, stage
+from backend.utils.payment_repository import create_payment_repository, probe_table
+from backend.utils.payment_status import FINAL_STATUSES, NOT_FOUND, PaymentStatusHub
+from backend.utils.upload_stream import UploadLimitMiddleware, UploadTooLarge, save_upload
+from backend.utils.warmup import WARMUP_SYNTHETIC_QUERY, Warmup
+from backend.utils.webhook_queue import WebhookQueue
 
 
 # ---------------------------------------------------------------------------- #
 # ⚙️ FastAPI Initialization
 # ---------------------------------------------------------------------------- #
-app = FastAPI(title="Insurance Scammer API", version="1.1")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the background workers, then warm caches and connections in the
+    background: /health is live immediately, /ready turns 200 once warm.
+    (job_queue, webhook_queue and warmup are created further down.)
+    """
+    job_queue.start()
+    webhook_queue.start()
+    warmup.start()
+    yield
+    await warmup.stop()
+    await webhook_queue.stop()
+    job_queue.shutdown()
+
+
+app = FastAPI(title="Insurance Scammer API", version="1.1", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -62,6 +96,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency histograms for /metrics
+app.add_middleware(MetricsMiddleware)
+
 DEBUG = os.getenv("DEBUG", "0") == "1"
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
@@ -71,32 +108,193 @@ def health():
         "ok": True,
         "groq_key_set": bool(GROQ_API_KEY),
         "stripe_configured": bool(STRIPE_SECRET_KEY),
-        "stripe_api_key_set": bool(stripe.api_key if STRIPE_SECRET_KEY else False),
-        "dynamodb_configured": payments_table is not None,
+        "stripe_api_key_set": bool(STRIPE_SECRET_KEY),  # applied on first Stripe call
+        "dynamodb_configured": payments is not None and payments.backend == "dynamodb",
+        "payments_backend": payments.backend if payments else None,
+        "payments_latency_ms": payments.latency_stats() if payments else {},
+        "payment_status_cache": payment_status.stats() if payment_status else {},
     }
 
+POLICY_PDF_DIR = "data/Policy_Wordings"
+PDF_CACHE_MAX_AGE = int(os.getenv("PDF_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+_pdf_etags: Dict[str, Any] = {}  # filename -> (size, mtime_ns, etag)
+
+
+def _load_pdf_manifest() -> Dict[str, Any]:
+    try:
+        with open(PDF_MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _cached_pdf_etag(filename: str, stat: os.stat_result) -> Optional[str]:
+    cached = _pdf_etags.get(filename)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+    return None
+
+
+def _pdf_etag(filename: str, pdf_path: str, manifest: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Strong ETag from the PDF's SHA-256. Taken from the ingestion manifest
+    when it still matches the file on disk, otherwise hashed and cached.
+    Blocking: call it from a worker thread.
+    """
+    stat = os.stat(pdf_path)
+    etag = _cached_pdf_etag(filename, stat)
+    if etag:
+        return etag
+
+    entry = (_load_pdf_manifest() if manifest is None else manifest).get(filename) or {}
+    digest = None
+    if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+        digest = entry.get("sha256")
+    digest = digest or file_sha256(pdf_path)
+
+    etag = f'"{digest}"'
+    _pdf_etags[filename] = (stat.st_size, stat.st_mtime_ns, etag)
+    return etag
+
+
+def precompute_pdf_etags() -> int:
+    """Hash every policy PDF once at startup (warm-up step) so requests never do."""
+    manifest = _load_pdf_manifest()
+    count = 0
+    for filename in sorted(os.listdir(POLICY_PDF_DIR)):
+        pdf_path = os.path.join(POLICY_PDF_DIR, filename)
+        if filename.lower().endswith(".pdf") and os.path.isfile(pdf_path):
+            _pdf_etag(filename, pdf_path, manifest)
+            count += 1
+    return count
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return etag in tags or f"W/{etag}" in tags
+
+
 @app.get("/policy_pdf/{filename}")
-async def get_policy_pdf(filename: str):
-    """Serve policy PDF files."""
-    pdf_path = os.path.join("data/Policy_Wordings", filename)
-    if os.path.exists(pdf_path):
-        return FileResponse(pdf_path, media_type="application/pdf")
-    return {"error": "PDF not found"}
+async def get_policy_pdf(filename: str, request: Request):
+    """
+    Serve policy PDF files with validators for cheap re-opens:
+    strong ETag + long-lived Cache-Control, 304 on If-None-Match, and
+    Range / 206 Partial Content (handled by FileResponse) so viewers can
+    fetch pages lazily.
+    """
+    # Only plain filenames from the policy folder
+    if filename != os.path.basename(filename):
+        raise HTTPException(status_code=404, detail="PDF not found")
+    pdf_path = os.path.join(POLICY_PDF_DIR, filename)
+    if not os.path.isfile(pdf_path):
+        raise HTTPException(status_code=404, detail="PDF not found")
+
+    # Precomputed at startup; a PDF replaced since then is re-hashed off the event loop.
+    etag = _cached_pdf_etag(filename, os.stat(pdf_path)) or await asyncio.to_thread(_pdf_etag, filename, pdf_path)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={PDF_CACHE_MAX_AGE}",
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(pdf_path, media_type="application/pdf", headers=headers)
+
+# ---------------------------------------------------------------------------- #
+# 📊 Product Comparison Matrix
+# ---------------------------------------------------------------------------- #
+@app.get("/compare")
+def compare(
+    benefit: Optional[List[str]] = Query(None, description="Benefit names or keywords; all benefits if omitted"),
+    product: Optional[List[str]] = Query(None, description="Products to include; all products if omitted"),
+):
+    """
+    Every product × benefit: coverage flag, numeric limit and the difference
+    to the best other product. Served from the matrix built at taxonomy load.
+    """
+    matrix = get_comparison_matrix()
+    unknown = [p for p in product or [] if p not in matrix.product_index]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown product(s): {', '.join(unknown)}")
+    return {"ok": True, **matrix.to_dict(benefit, product)}
+
+
+def _parse_limit_filters(values: Optional[List[str]]) -> Dict[str, float]:
+    """['medical:100000', 'dental:5k'] -> {'medical': 100000.0, 'dental': 5000.0}"""
+    filters = {}
+    for raw in values or []:
+        name, sep, amount = raw.partition(":")
+        if not sep:
+            raise HTTPException(status_code=400, detail=f"Expected benefit:amount, got '{raw}'")
+        amount = amount.strip().lower().replace(",", "").replace("$", "")
+        multiplier = 1000 if amount.endswith("k") else 1
+        try:
+            filters[name.strip()] = float(amount.rstrip("k")) * multiplier
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid amount in '{raw}'")
+    return filters
+
+
+@app.get("/plans/search")
+def plans_search(
+    min_limit: Optional[List[str]] = Query(None, alias="min", description="benefit:amount minimum limits, e.g. medical:100000"),
+    max_limit: Optional[List[str]] = Query(None, alias="max", description="benefit:amount maximum limits"),
+    covers: Optional[List[str]] = Query(None, description="Benefits that must be covered"),
+    excludes: Optional[List[str]] = Query(None, description="Benefits that must not be covered"),
+    sort: Optional[str] = Query(None, description="Benefit to sort by (its limit)"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+):
+    """Filter plans by numeric coverage limits and coverage flags, optionally sorted."""
+    try:
+        plans = search_plans(
+            min_limits=_parse_limit_filters(min_limit),
+            max_limits=_parse_limit_filters(max_limit),
+            covers=covers or [],
+            excludes=excludes or [],
+            sort_by=sort,
+            descending=order == "desc",
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=f"Unknown benefit: {e.args[0]}")
+    return {"ok": True, "count": len(plans), "plans": plans}
+
 
 # ---------------------------------------------------------------------------- #
 # 🤖 Chatbot Endpoint (/chat)
 # ---------------------------------------------------------------------------- #
-agent = create_insurance_agent()  # singleton in-memory
-
-def _classify_error_message(err: str) -> str:
-    low = err.lower()
-    if "invalid api key" in low or "invalid_api_key" in low or "401" in low:
-        return "Authentication failed: invalid API key. Check GROQ_API_KEY on the server."
-    if "request too large" in low or "tpm" in low or "413" in low or "tokens per minute" in low:
-        return "Request exceeded the model's token/context limit. Reduce PDF chunk size or shorten input."
-    if "connection" in low or "timeout" in low or "dns" in low or "failed to establish" in low:
-        return "Cannot reach the LLM server. Check network or Groq availability."
-    return "Sorry, I ran into an error processing that. Please try again."
+_agent = None  # singleton in-memory, built on the first /chat
+_agent_lock = threading.Lock()
+
+
+def _get_agent():
+    """The conversational agent, created (and LangChain imported) on first use."""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                from backend.chains.conversational_agent import create_insurance_agent
+
+                _agent = create_insurance_agent()
+    return _agent
+
+_ERROR_MESSAGES = {
+    "auth": "Authentication failed: invalid API key. Check GROQ_API_KEY on the server.",
+    "too_large": "Request exceeded the model's token/context limit. Reduce PDF chunk size or shorten input.",
+    "rate_limit": "The assistant is busy right now (LLM rate limit reached). Please try again in a minute.",
+    "unavailable": "Cannot reach the LLM server. Check network or Groq availability.",
+}
+
+
+def _classify_error_message(error: BaseException) -> str:
+    """User-facing message for a failed /chat, from the Groq error's status/type (see token_ledger)."""
+    return _ERROR_MESSAGES.get(
+        classify_llm_error(error), "Sorry, I ran into an error processing that. Please try again."
+    )
 
 @app.post("/chat")
 async def chat(request: Request):
@@ -123,24 +321,28 @@ async def chat(request: Request):
         )
 
     try:
-        # 1️⃣ Detect intent (metadata)
-        intent = detect_intent(question)
+        # 1️⃣ Classify once: intent, route, benefit and mindset
+        with stage("chat", "nlu"):
+            nlu = classify(question)
+            intent = detect_intent(question, nlu)
 
-        # 2️⃣ Generate answer (LLM + JSON logic)
-        answer_text = agent(session_id, question)
+        # 2️⃣ Generate answer (LLM + JSON logic); the agent times its own stages
+        with stage("chat", "agent"), usage_context(endpoint="/chat", session=session_id):
+            answer_text = _get_agent()(session_id, question, nlu=nlu)
 
         # 3️⃣ Return structured response
-        return format_response(
-            text=answer_text,
-            session_id=session_id,
-            intent=intent,
-            citations=["MSIG TravelEasy / Pre-Ex / Scootsurance Official Policy Wordings (2025)"],
-            meta={"model": "llama-3.3-70b-versatile"},
-        )
+        with stage("chat", "format"):
+            return format_response(
+                text=answer_text,
+                session_id=session_id,
+                intent=intent,
+                citations=["MSIG TravelEasy / Pre-Ex / Scootsurance Official Policy Wordings (2025)"],
+                meta={"model": "llama-3.3-70b-versatile"},
+            )
 
     except Exception as e:
         err = str(e)
-        user_msg = _classify_error_message(err)
+        user_msg = _classify_error_message(e)
 
         # Small traceback tail for dev visibility
         tb_tail = ""
@@ -152,7 +354,7 @@ async def chat(request: Request):
             session_id=session_id,
             intent="error",
             citations=[],
-            meta={"error": err, "detail": tb_tail},
+            meta={"error": err, "error_kind": classify_llm_error(e), "detail": tb_tail},
         )
 
 # ---------------------------------------------------------------------------- #
@@ -161,13 +363,22 @@ async def chat(request: Request):
 UPLOAD_DIR = "data/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Reject oversized bodies from Content-Length before multipart parsing starts.
+app.add_middleware(UploadLimitMiddleware, paths={"/upload", "/upload_extract", "/jobs/extract"})
+
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
     try:
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-        return {"ok": True, "filename": file.filename, "path": file_path}
+        saved = await save_upload(file, UPLOAD_DIR)
+        return {
+            "ok": True,
+            "filename": saved.filename,
+            "path": saved.path,
+            "size": saved.size,
+            "sha256": saved.sha256,
+        }
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
@@ -180,39 +391,87 @@ async def upload_and_extract(file: UploadFile = File(...), doc_type: str = Form(
     Returns extracted information based on document type.
     """
     try:
-        save_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(save_path, "wb") as f:
-            f.write(await file.read())
+        with stage("extract", "save_upload"):
+            saved = await save_upload(file, UPLOAD_DIR)
+        save_path = saved.path
 
-        # Extract text from PDF
-        pdf_text = extract_text_from_pdf(save_path)
-        llm = init_llm()
-        
-        # Extract based on document type
-        if doc_type == "itinerary":
-            extracted_data = extract_itinerary_info(llm, pdf_text)
-        elif doc_type == "ticket":
-            extracted_data = extract_ticket_info(llm, pdf_text)
-        elif doc_type == "policy":
-            extracted_data = extract_policy_summary(llm, pdf_text)
-        else:
-            # Default to itinerary
-            extracted_data = extract_itinerary_info(llm, pdf_text)
+        with stage("extract", "total"), usage_context(endpoint="/upload_extract"):
+            extracted_data = extract_document(save_path, doc_type)
 
         return {
             "ok": True,
-            "filename": file.filename,
+            "filename": saved.filename,
             "path": save_path,
+            "sha256": saved.sha256,
             "doc_type": doc_type,
             "data": extracted_data,
         }
 
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         if DEBUG:
             traceback.print_exc()
         return {"ok": False, "error": str(e)}
 
 
+# ---------------------------------------------------------------------------- #
+# ⏳ Background Extraction Jobs
+# ---------------------------------------------------------------------------- #
+def _run_job(kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    if kind == "extract":
+        # Worker threads don't inherit the request's context; attribute tokens here.
+        with usage_context(endpoint="/jobs/extract"):
+            return extract_document(payload["path"], payload.get("doc_type", "itinerary"))
+    raise ValueError(f"Unknown job kind: {kind}")
+
+
+def _remove_job_upload(kind: str, payload: Dict[str, Any]):
+    """A finished or purged extraction job no longer needs its uploaded file."""
+    path = payload.get("path")
+    if not path or os.path.dirname(os.path.abspath(path)) != os.path.abspath(UPLOAD_DIR):
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+job_queue = JobQueue(_run_job, cleanup=_remove_job_upload)
+
+
+@app.post("/jobs/extract", status_code=202)
+async def submit_extract_job(file: UploadFile = File(...), doc_type: str = Form("itinerary")):
+    """
+    Upload a PDF and queue its extraction. Returns immediately with a job id;
+    poll GET /jobs/{job_id} for status, ETA and the extracted data.
+    """
+    try:
+        saved = await save_upload(file, UPLOAD_DIR)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    job_id = job_queue.submit(
+        "extract", {"path": saved.path, "filename": saved.filename, "doc_type": doc_type}
+    )
+    return {
+        "ok": True,
+        "job_id": job_id,
+        "status": "queued",
+        "filename": saved.filename,
+        "doc_type": doc_type,
+    }
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Job status (queued/running/done/failed), ETA in seconds, and result once done."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return {"ok": True, **job}
+
+
 @app.post("/generate_quotes")
 async def generate_quotes(request: Request):
     """
@@ -225,64 +484,17 @@ async def generate_quotes(request: Request):
         # Get accumulated data (merged from itinerary + ticket)
         trip_data = payload.get("trip_data", {})
         
-        # Extract trip cost and duration for recommendations
-        trip_cost = float(trip_data.get("trip_cost", 0) or 0)
-        duration_days = int(trip_data.get("duration", 0) or 7)  # Default to 7 days
-        
-        # Load existing policies for comparison
-        existing_policies = load_all_policies()
-        quotes = []
-        
-        # Add all MSIG policies to comparison
-        pdf_base_path = "data/Policy_Wordings"
-        pdf_mapping = {
-            "TravelEasy Policy QTD032212": "TravelEasy Policy QTD032212.pdf",
-            "TravelEasy Pre-Ex Policy QTD032212-PX": "TravelEasy Pre-Ex Policy QTD032212-PX.pdf",
-            "Scootsurance QSR022206_updated": "Scootsurance QSR022206_updated.pdf",
-        }
-        
-        for product_name in existing_policies.keys():
-            # Load real coverage data from taxonomy files
-            coverage = load_policy_coverage(product_name)
-            
-            if coverage:
-                # For display name mapping
-                display_name = product_name
-                if product_name == "Scootsurance QSR022206_updated":
-                    display_name = "Scootsurance QSR022206"
-                
-                # Generate PDF link using API endpoint with URL encoding
-                pdf_filename = pdf_mapping.get(product_name, "")
-                pdf_link = f"http://127.0.0.1:8000/policy_pdf/{urlquote(pdf_filename)}" if pdf_filename else ""
-                
-                # Calculate dynamic price based on trip duration
-                dynamic_price = calculate_dynamic_price(product_name, duration_days)
-                formatted_price = f"${dynamic_price:.2f}"
-                
-                quote = {
-                    "plan": display_name,
-                    "medical": coverage.get("medical", "$0"),
-                    "cancellation": coverage.get("cancellation", "$0"),
-                    "death_disablement": coverage.get("death_disablement", "$0"),
-                    "dental": coverage.get("dental", "$0"),
-                    "travel_delay": coverage.get("travel_delay", "$0"),
-                    "price": formatted_price,
-                    "link": pdf_link,
-                }
-            else:
-                # Fallback if extraction fails
-                continue
-            
-            quotes.append(quote)
-        
-        # Recommend best plan based on actual trip data
-        recommended = get_recommended_plan(quotes, trip_cost)
-        if not recommended:
-            recommended = quotes[0].get("plan") if quotes else ""
+        # Price every product for the whole party and pick a plan (shared with the
+        # batch CLI); identical trips are served from the quote cache
+        with stage("quotes", "get_quotes"):
+            result = quote_cache.get_quotes(trip_data)
+        quotes = result["quotes"]
+        recommended = result["recommended_plan"]
 
         return {
             "ok": True,
             "trip": trip_data,
+            "travellers": result["travellers"],
             "quotes": quotes,
             "recommended_plan": recommended,
         }
@@ -304,36 +516,31 @@ AWS_REGION = os.getenv("AWS_REGION", "ap-southeast-1")
 DYNAMODB_PAYMENTS_TABLE = os.getenv("DYNAMODB_PAYMENTS_TABLE", "lea-payments-local")
 DDB_ENDPOINT = os.getenv("DDB_ENDPOINT")
 
-if STRIPE_SECRET_KEY:
-    stripe.api_key = STRIPE_SECRET_KEY
+_stripe_module = None
 
-# Initialize DynamoDB (optional - payment will work without it)
-payments_table = None
-dynamodb = None
 
-try:
-    # Only initialize DynamoDB if DDB_ENDPOINT is explicitly set (for local DynamoDB)
-    # OR if AWS credentials are available
-    if DDB_ENDPOINT:
-        # Local DynamoDB
-        dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION, endpoint_url=DDB_ENDPOINT)
-        payments_table = dynamodb.Table(DYNAMODB_PAYMENTS_TABLE)
-        try:
-            payments_table.load()
-            print(f"✓ DynamoDB table '{DYNAMODB_PAYMENTS_TABLE}' initialized successfully (Local)")
-        except Exception as load_error:
-            print(f"⚠ Warning: DynamoDB table '{DYNAMODB_PAYMENTS_TABLE}' does not exist or cannot be accessed: {load_error}")
-            print("  Table will be created on first write, or you may need to create it manually.")
-    else:
-        # Don't initialize DynamoDB if DDB_ENDPOINT is not set
-        # This avoids trying to authenticate with AWS when credentials aren't available
-        print("ℹ DynamoDB not initialized: DDB_ENDPOINT not set. Payment will work without database storage.")
-        print("  Set DDB_ENDPOINT for local DynamoDB (e.g., 'http://localhost:8000') if you want database storage.")
-except Exception as e:
-    print(f"⚠ DynamoDB initialization failed: {e}")
-    print("  Payment will work without database storage. This is fine for testing.")
-    payments_table = None
-    dynamodb = None
+def _stripe():
+    """The stripe SDK, imported and keyed on the first payment call."""
+    global _stripe_module
+    if _stripe_module is None:
+        import stripe
+
+        if STRIPE_SECRET_KEY:
+            stripe.api_key = STRIPE_SECRET_KEY
+        _stripe_module = stripe
+    return _stripe_module
+
+
+# Payment storage (optional - payment will work without it). Backend from
+# PAYMENTS_BACKEND: dynamodb (default when DDB_ENDPOINT is set), sqlite, memory.
+# The DynamoDB reachability check runs as a warm-up step (see /ready).
+payments = create_payment_repository(
+    table_name=DYNAMODB_PAYMENTS_TABLE, region=AWS_REGION, endpoint_url=DDB_ENDPOINT, probe=False
+)
+# Status cache + push channel, fed by the webhook consumer
+payment_status = PaymentStatusHub(payments) if payments else None
+PAYMENT_STATUS_MAX_WAIT = float(os.getenv("PAYMENT_STATUS_MAX_WAIT", "30"))
+PAYMENT_STREAM_MAX_SECONDS = float(os.getenv("PAYMENT_STREAM_MAX_SECONDS", "900"))
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("stripe-webhook")
@@ -349,7 +556,7 @@ async def create_payment_intent(request: Request):
     product_name = payload.get("product_name")
 
     # Try to save to DynamoDB if available, but don't fail if it's not configured
-    if payments_table:
+    if payments:
         payment_record = {
             'payment_intent_id': payment_intent_id,
             'user_id': user_id,
@@ -363,10 +570,12 @@ async def create_payment_intent(request: Request):
         }
         
         try:
-            payments_table.put_item(Item=payment_record)
-            print(f"✓ Payment record created in DynamoDB with ID: {payment_intent_id}")
+            with stage("payment", "db_put"):
+                await payments.put(payment_record)
+            payment_status.publish(payment_intent_id, 'pending')
+            print(f"✓ Payment record created in {payments.backend} with ID: {payment_intent_id}")
         except Exception as e:
-            print(f"⚠ Warning: Failed to create payment record in DynamoDB: {e}")
+            print(f"⚠ Warning: Failed to create payment record in {payments.backend}: {e}")
             print("  Continuing without database storage (payment will still work)")
     else:
         print(f"ℹ Payment intent created (no database): {payment_intent_id}")
@@ -386,6 +595,7 @@ async def create_stripe_checkout(request: Request):
         print(f"ERROR: {error_msg}")
         raise HTTPException(status_code=500, detail=error_msg)
     
+    stripe = _stripe()
     # Ensure Stripe API key is set (in case it wasn't set during initialization)
     if not stripe.api_key:
         stripe.api_key = STRIPE_SECRET_KEY
@@ -410,39 +620,41 @@ async def create_stripe_checkout(request: Request):
     try:
         print(f"Creating checkout for: {product_name}, Amount: {purchase_amount} cents")
         
-        checkout_session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=[{
-                'price_data': {
-                    'currency': 'sgd',
-                    'unit_amount': purchase_amount,
-                    'product_data': {
-                        'name': product_name,
-                        'description': 'Travel Insurance Policy',
+        with stage("payment", "stripe_checkout"):
+            checkout_session = stripe.checkout.Session.create(
+                payment_method_types=['card'],
+                line_items=[{
+                    'price_data': {
+                        'currency': 'sgd',
+                        'unit_amount': purchase_amount,
+                        'product_data': {
+                            'name': product_name,
+                            'description': 'Travel Insurance Policy',
+                        },
                     },
-                },
-                'quantity': 1,
-            }],
-            mode='payment',
-            success_url=f'http://localhost:8501/?payment_success=true&session_id={{CHECKOUT_SESSION_ID}}',
-            cancel_url='http://localhost:8501/?payment_cancelled=true',
-            client_reference_id=payment_intent_id,
-        )
+                    'quantity': 1,
+                }],
+                mode='payment',
+                success_url=f'http://localhost:8501/?payment_success=true&session_id={{CHECKOUT_SESSION_ID}}',
+                cancel_url='http://localhost:8501/?payment_cancelled=true',
+                client_reference_id=payment_intent_id,
+                # Carried on payment_intent.* webhooks so they can be resolved by key
+                payment_intent_data={'metadata': {'payment_intent_id': payment_intent_id}} if payment_intent_id else None,
+            )
         
         print(f"✓ Stripe Checkout Session created: {checkout_session.id}")
         print(f"  URL: {checkout_session.url}")
         
         # Update DynamoDB if available
-        if payments_table and payment_intent_id:
+        if payments and payment_intent_id:
             try:
-                payments_table.update_item(
-                    Key={'payment_intent_id': payment_intent_id},
-                    UpdateExpression='SET stripe_session_id = :sid',
-                    ExpressionAttributeValues={':sid': checkout_session.id}
-                )
-                print(f"✓ Updated DynamoDB with session ID")
+                with stage("payment", "db_update"):
+                    await payments.update(payment_intent_id, {'stripe_session_id': checkout_session.id})
+                    if checkout_session.payment_intent:
+                        await payments.link_stripe_intent(payment_intent_id, checkout_session.payment_intent)
+                print(f"✓ Updated payment record with session ID")
             except Exception as db_error:
-                print(f"Warning: Could not update DynamoDB with Stripe session ID: {db_error}")
+                print(f"Warning: Could not update payment record with Stripe session ID: {db_error}")
         
         return {
             "id": checkout_session.id,
@@ -467,21 +679,52 @@ async def create_stripe_checkout(request: Request):
         raise HTTPException(status_code=500, detail=error_msg)
 
 @app.get('/payment-status/{payment_intent_id}')
-async def check_payment_status(payment_intent_id: str):
-    if not payments_table:
+async def check_payment_status(
+    payment_intent_id: str,
+    wait: float = Query(0, ge=0, description="Long-poll: seconds to wait for a change"),
+    status: Optional[str] = Query(None, description="Status the client already has"),
+):
+    """
+    Current payment status from the short-TTL cache. With `wait`, holds the
+    request until the status differs from `status` (or `wait` seconds pass).
+    """
+    if not payments:
         return JSONResponse(content={'payment_status': 'database_not_configured'}, status_code=503)
     
     try:
-        response = payments_table.get_item(Key={'payment_intent_id': payment_intent_id})
-        item = response.get('Item')
-        if item:
-            status = item.get('payment_status', 'unknown')
-            return JSONResponse(content={'payment_status': status})
-        return JSONResponse(content={'payment_status': 'not_found'}, status_code=404)
+        if wait:
+            current = await payment_status.wait_for_change(
+                payment_intent_id, status, min(wait, PAYMENT_STATUS_MAX_WAIT)
+            )
+        else:
+            current = await payment_status.get(payment_intent_id)
+        if current == NOT_FOUND:
+            return JSONResponse(content={'payment_status': NOT_FOUND}, status_code=404)
+        return JSONResponse(content={'payment_status': current})
     except Exception as e:
         print(f"Failed to check payment status: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to check payment status: {str(e)}")
 
+
+@app.get('/payment-status/{payment_intent_id}/events')
+async def stream_payment_status(payment_intent_id: str):
+    """Server-Sent Events: the current status, then every change until a final one."""
+    if not payments:
+        return JSONResponse(content={'payment_status': 'database_not_configured'}, status_code=503)
+    
+    async def events():
+        async for current in payment_status.stream(payment_intent_id, PAYMENT_STREAM_MAX_SECONDS):
+            if current is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: status\ndata: {json.dumps({'payment_status': current})}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 class DeleteReq(BaseModel):
     path: str
 
@@ -499,7 +742,7 @@ async def delete_upload(req: DeleteReq):
 # Helper function to check Stripe payment status (synchronous)
 def check_stripe_payment_status_sync(session_id):
     try:
-        session = stripe.checkout.Session.retrieve(session_id)
+        session = _stripe().checkout.Session.retrieve(session_id)
         return session.payment_status, session
     except Exception as e:
         print(f"Failed to check Stripe status: {e}")
@@ -522,6 +765,8 @@ async def trigger_local_webhook(request: Request):
         }
     }
     
+    import requests
+
     try:
         response = requests.post(
             "http://localhost:8086/webhook/stripe",
@@ -538,47 +783,43 @@ async def trigger_local_webhook(request: Request):
         print(f"Failed to trigger webhook: {e}")
         return False
 
-def wait_for_payment_confirmation(payment_intent_id, session_id):
-    """Helper function to poll payment status (synchronous)."""
-    print("Checking payment status on Stripe")
-    print("Polling Stripe API for payment completion...")
+async def wait_for_payment_confirmation(payment_intent_id, session_id=None, timeout=60):
+    """
+    Wait for the webhook consumer to mark a payment completed. Wakes on the
+    status channel instead of polling; Stripe is asked once, only if no
+    webhook arrived within `timeout`.
+    """
+    print(f"Waiting for payment confirmation: {payment_intent_id}")
+    deadline = time.monotonic() + timeout
+    current = None
+    while current not in FINAL_STATUSES:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        current = await payment_status.wait_for_change(payment_intent_id, current, remaining)
     
-    max_attempts = 30
-    for attempt in range(max_attempts):
-        payment_status, session_data = check_stripe_payment_status_sync(session_id)
-        
-        if payment_status == 'paid':
-            print("Payment confirmed on Stripe!")
-            print(f"Payment Status: {payment_status}")
-            
-            # Note: trigger_local_webhook is async, but this sync function won't be called
-            # from async context. If needed, should be refactored.
-            
-            time.sleep(2)
-            
-            # Check database status directly
-            try:
-                response = payments_table.get_item(Key={'payment_intent_id': payment_intent_id})
-                item = response.get('Item')
-                if item and item.get('payment_status') == 'completed':
-                    print("Database status updated to 'completed'!")
-                    return True
-            except Exception as e:
-                print(f"Error checking database status: {e}")
-        
-        if attempt < max_attempts - 1:
-            print(f"   Stripe status: {payment_status or 'checking...'} - Retrying in 2 seconds... ({attempt + 1}/{max_attempts})")
-            time.sleep(2)
+    if current == 'completed':
+        print("Database status updated to 'completed'!")
+        return True
+    
+    if current not in FINAL_STATUSES and session_id:
+        stripe_status, _ = await asyncio.to_thread(check_stripe_payment_status_sync, session_id)
+        print(f"No webhook within {timeout}s; Stripe reports: {stripe_status}")
     
     print("Payment was not completed within timeout")
     return False
 
-def cleanup(payment_intent_id):
+async def cleanup(payment_intent_id):
+    """Delete a test payment record through the repository (any backend)."""
+    if not payments:
+        return False
     try:
-        payments_table.delete_item(Key={'payment_intent_id': payment_intent_id})
-        print(f"Cleaned up test payment record: {payment_intent_id}")
-    except:
-        pass
+        await payments.delete(payment_intent_id)
+    except Exception as e:
+        logger.warning(f"Could not clean up test payment record {payment_intent_id}: {e}")
+        return False
+    print(f"Cleaned up test payment record: {payment_intent_id}")
+    return True
 
 
 # Note: /health endpoint is already defined above, no duplicate needed
@@ -600,7 +841,7 @@ async def stripe_webhook(request: Request):
             logger.warning("Using webhook without signature verification (local testing)")
             event = json.loads(payload.decode('utf-8'))
         else:
-            event = stripe.Webhook.construct_event(
+            event = _stripe().Webhook.construct_event(
                 payload, sig_header, STRIPE_WEBHOOK_SECRET
             )
     except ValueError as e:
@@ -613,21 +854,80 @@ async def stripe_webhook(request: Request):
         logger.error(f"Webhook error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
     
+    event_type = event["type"]
+    logger.info(f"Received Stripe event: {event_type}")
+    
+    # Durably log and acknowledge; the consumer applies it in the background.
+    with stage("webhook", "enqueue"):
+        queued = await webhook_queue.enqueue(dict(event), payload)
+    return JSONResponse({
+        "status": "queued" if queued else "duplicate",
+        "event_type": event_type,
+    })
+
+
+@app.get("/webhooks/stats")
+def webhook_stats():
+    """Webhook queue depth, lag, throughput and receive→apply latency."""
+    return webhook_queue.stats()
+
+
+PAYMENT_UPDATE_RETRIES = 5
+
+
+async def _transition_payment(payment_record: Dict[str, Any], fields: Dict[str, Any]) -> bool:
+    """
+    Apply `fields` to a payment record with an optimistic, versioned write.
+    On a concurrent write the record is re-read and the change re-applied.
+    Returns False when the change is skipped (final state or record gone).
+    """
+    payment_intent_id = payment_record["payment_intent_id"]
+    for _ in range(PAYMENT_UPDATE_RETRIES):
+        # Never move a payment out of a final state on a late or replayed event.
+        if payment_record.get("payment_status") in FINAL_STATUSES \
+                and fields.get("payment_status") != payment_record["payment_status"]:
+            logger.info(f"Ignoring {fields.get('payment_status')} for {payment_intent_id}: already {payment_record['payment_status']}")
+            return False
+        
+        expected_version = payment_record.get("version")
+        now = datetime.utcnow().isoformat()
+        updated = {
+            **payment_record,
+            **fields,
+            "updated_at": now,
+            "webhook_processed_at": now,
+            "version": (expected_version or 0) + 1,
+        }
+        if await payments.put_versioned(updated, expected_version):
+            payment_status.publish(payment_intent_id, updated["payment_status"])
+            return True
+        
+        logger.info(f"Concurrent update on {payment_intent_id}, retrying")
+        payment_record = await payments.get(payment_intent_id)
+        if not payment_record:
+            return False
+    raise RuntimeError(f"Gave up updating {payment_intent_id} after {PAYMENT_UPDATE_RETRIES} conflicting writes")
+
+
+async def apply_stripe_event(event: Dict[str, Any]):
+    """Webhook queue consumer: apply one logged Stripe event. Raises to retry."""
     event_type = event["type"]
     event_data = event["data"]["object"]
     
-    logger.info(f"Received Stripe event: {event_type}")
+    if not payments:
+        logger.info(f"No payment storage configured; dropping {event_type}")
+        return
     
-    if event_type == "checkout.session.completed":
-        await handle_payment_success(event_data)
-    elif event_type == "checkout.session.expired":
-        await handle_payment_expired(event_data)
-    elif event_type == "payment_intent.payment_failed":
-        await handle_payment_failed(event_data)
-    else:
+    handler = WEBHOOK_HANDLERS.get(event_type)
+    if handler is None:
         logger.info(f"Unhandled event type: {event_type}")
-    
-    return JSONResponse({"status": "success", "event_type": event_type})
+        return
+    with stage("webhook", handler.__name__):
+        await handler(event_data)
+
+
+webhook_queue = WebhookQueue(apply_stripe_event)
+
 
 async def handle_payment_success(session_data: Dict[str, Any]):
     session_id = session_data.get("id")
@@ -640,25 +940,14 @@ async def handle_payment_success(session_data: Dict[str, Any]):
         logger.warning(f"No client_reference_id found for session {session_id}")
         return
     
-    try:
-        response = payments_table.get_item(Key={"payment_intent_id": client_reference_id})
-        payment_record = response.get("Item")
-        
-        if not payment_record:
-            logger.warning(f"Payment record not found for payment_intent_id: {client_reference_id}")
-            return
-        
-        payment_record["payment_status"] = "completed"
-        payment_record["stripe_payment_intent"] = payment_intent_id
-        payment_record["updated_at"] = datetime.utcnow().isoformat()
-        payment_record["webhook_processed_at"] = datetime.utcnow().isoformat()
-        
-        payments_table.put_item(Item=payment_record)
-        
+    payment_record = await payments.get(client_reference_id)
+    if not payment_record:
+        logger.warning(f"Payment record not found for payment_intent_id: {client_reference_id}")
+        return
+    
+    fields = {"payment_status": "completed", "stripe_payment_intent": payment_intent_id}
+    if await _transition_payment(payment_record, fields):
         logger.info(f"Updated payment status to completed for {client_reference_id}")
-        
-    except Exception as e:
-        logger.error(f"Failed to update payment record: {e}")
 
 async def handle_payment_expired(session_data: Dict[str, Any]):
     session_id = session_data.get("id")
@@ -670,49 +959,143 @@ async def handle_payment_expired(session_data: Dict[str, Any]):
         logger.warning(f"No client_reference_id found for expired session {session_id}")
         return
     
-    try:
-        response = payments_table.get_item(Key={"payment_intent_id": client_reference_id})
-        payment_record = response.get("Item")
-        
-        if not payment_record:
-            logger.warning(f"Payment record not found for payment_intent_id: {client_reference_id}")
-            return
-        
-        payment_record["payment_status"] = "expired"
-        payment_record["updated_at"] = datetime.utcnow().isoformat()
-        payment_record["webhook_processed_at"] = datetime.utcnow().isoformat()
-        
-        payments_table.put_item(Item=payment_record)
-        
+    payment_record = await payments.get(client_reference_id)
+    if not payment_record:
+        logger.warning(f"Payment record not found for payment_intent_id: {client_reference_id}")
+        return
+    
+    if await _transition_payment(payment_record, {"payment_status": "expired"}):
         logger.info(f"Updated payment status to expired for {client_reference_id}")
-        
-    except Exception as e:
-        logger.error(f"Failed to update expired payment record: {e}")
 
 async def handle_payment_failed(payment_intent_data: Dict[str, Any]):
     payment_intent_id = payment_intent_data.get("id")
     
     logger.info(f"Payment failed for intent: {payment_intent_id}")
     
-    try:
-        response = payments_table.scan(
-            FilterExpression="stripe_payment_intent = :intent_id",
-            ExpressionAttributeValues={":intent_id": payment_intent_id}
-        )
-        
-        items = response.get("Items", [])
-        if not items:
-            logger.warning(f"Payment record not found for intent: {payment_intent_id}")
-            return
-        
-        payment_record = items[0]
-        payment_record["payment_status"] = "failed"
-        payment_record["updated_at"] = datetime.utcnow().isoformat()
-        payment_record["webhook_processed_at"] = datetime.utcnow().isoformat()
-        
-        payments_table.put_item(Item=payment_record)
-        
+    # Keyed read: our id from the intent metadata, else the Stripe pointer
+    metadata = payment_intent_data.get("metadata") or {}
+    payment_record = await payments.find_by_stripe_intent(
+        payment_intent_id, metadata.get("payment_intent_id")
+    )
+    if not payment_record:
+        logger.warning(f"Payment record not found for intent: {payment_intent_id}")
+        return
+    
+    fields = {"payment_status": "failed", "stripe_payment_intent": payment_intent_id}
+    if await _transition_payment(payment_record, fields):
         logger.info(f"Updated payment status to failed for {payment_record['payment_intent_id']}")
-        
-    except Exception as e:
-        logger.error(f"Failed to update failed payment record: {e}")
+
+
+WEBHOOK_HANDLERS = {
+    "checkout.session.completed": handle_payment_success,
+    "checkout.session.expired": handle_payment_expired,
+    "payment_intent.payment_failed": handle_payment_failed,
+}
+
+
+# ---------------------------------------------------------------------------- #
+# 🔥 Warm-up & Readiness
+# ---------------------------------------------------------------------------- #
+def _check_payments_table():
+    if not probe_table(payments.table):
+        raise RuntimeError(f"DynamoDB table '{payments.table.table_name}' unreachable")
+
+
+def _synthetic_query():
+    with usage_context(endpoint="warmup", session="__warmup__"):
+        _get_agent()("__warmup__", "What is the medical coverage of TravelEasy?")
+
+
+warmup = Warmup()
+warmup.add("taxonomy", load_all_policies)
+warmup.add("comparison_matrix", get_comparison_matrix)
+warmup.add("quote_rate_table", get_rate_table)
+warmup.add("citation_page_map", load_page_map)
+warmup.add("pdf_etags", precompute_pdf_etags)
+warmup.add("agent", _get_agent)
+if GROQ_API_KEY:
+    warmup.add("llm_connection", lambda: _get_agent().warm_up(), required=False)
+if RETRIEVAL_ENABLED:
+    warmup.add("retriever", lambda: retrieve_clauses("medical expenses overseas"), required=False)
+if payments and payments.backend == "dynamodb":
+    warmup.add("payments_table", _check_payments_table, required=False)
+if WARMUP_SYNTHETIC_QUERY and GROQ_API_KEY:
+    warmup.add("synthetic_query", _synthetic_query, required=False)
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once warm-up has finished, 503 before. Lists each step and its duration."""
+    report = warmup.report()
+    return JSONResponse(content=report, status_code=200 if report["ready"] else 503)
+
+
+# ---------------------------------------------------------------------------- #
+# 📈 Metrics
+# ---------------------------------------------------------------------------- #
+def _cache_stats():
+    stats = {"quote": quote_cache.stats()}
+    if payment_status:
+        stats["payment_status"] = payment_status.stats()
+    return stats
+
+
+def _hit_ratio(s):
+    total = s["hits"] + s["misses"]
+    return s["hits"] / total if total else 0.0
+
+
+Gauge("lea_cache_hit_ratio", "Cache hits / lookups", ("cache",),
+      fn=lambda: {(name,): _hit_ratio(s) for name, s in _cache_stats().items()})
+Gauge("lea_cache_lookups", "Cache lookups by result", ("cache", "result"),
+      fn=lambda: {(name, result): s[result] for name, s in _cache_stats().items() for result in ("hits", "misses")})
+Gauge("lea_webhook_queue_pending", "Webhook events waiting to be applied",
+      fn=lambda: webhook_queue.stats()["pending"])
+Gauge("lea_webhook_queue_lag_seconds", "Age of the oldest pending webhook event",
+      fn=lambda: webhook_queue.stats()["lag_seconds"])
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint: stage/route latencies, LLM tokens, cache and queue gauges."""
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# ---------------------------------------------------------------------------- #
+# 💸 LLM Token Usage
+# ---------------------------------------------------------------------------- #
+@app.get("/usage/tokens")
+def usage_tokens(request: Request, top: int = Query(10, ge=1, le=100), session_id: Optional[str] = None):
+    """
+    Token and cost totals per endpoint, prompt template and session, the
+    most expensive calls, and last-minute usage against GROQ_TPM_BUDGET.
+    With ?session_id= returns that session's totals only. Session ids key
+    chat history, so this needs the X-Profile admin token like /profiles.
+    """
+    if not is_admin(request.headers.get("x-profile")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    if session_id is not None:
+        totals = token_ledger.session(session_id)
+        if totals is None:
+            raise HTTPException(status_code=404, detail="No LLM usage recorded for this session")
+        return {"ok": True, "session_id": session_id, **totals}
+    return {"ok": True, **token_ledger.snapshot(top)}
+
+
+# ---------------------------------------------------------------------------- #
+# 🔬 Request Profiling (opt-in)
+# ---------------------------------------------------------------------------- #
+# Only installed when PROFILE_ADMIN_TOKEN or PROFILE_SAMPLE_RATE is set.
+if profiling_enabled():
+    app.add_middleware(ProfilerMiddleware)
+
+
+@app.get("/profiles/{request_id}")
+def get_profile(request_id: str, request: Request):
+    """Speedscope profile of a profiled request (needs the X-Profile admin token)."""
+    if not is_admin(request.headers.get("x-profile")):
+        raise HTTPException(status_code=403, detail="Profiling admin token required")
+    if safe_request_id(request_id) != request_id or not os.path.isfile(profile_path(request_id)):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(profile_path(request_id), media_type="application/json",
+                        filename=f"{request_id}.speedscope.json")
@@ -2,29 +2,59 @@
 backend/chains/citation_helper.py
 ---------------------------------
 Appends clickable Markdown PDF citation links for insurance policy documents.
+
+Citations point at the exact page (`#page=N`) of only the documents the
+answer drew on. Page numbers come from data/processed/clause_page_map.json,
+built once by backend/ingestion/build_page_map.py, so no PDF is opened at
+request time.
 """
 
+import json
 import os
+from typing import Dict, List, Optional
 from urllib.parse import quote
 
-# Base folder containing your PDFs
-PDF_BASE_PATH = "data/Policy_Wordings"
+from backend.utils.product_registry import get_registry, resolve_product
+
+PAGE_MAP_PATH = "data/processed/clause_page_map.json"
+MAX_PAGES_PER_DOC = 3
+
+_page_map: Optional[Dict] = None
+
+
+def load_page_map() -> Dict:
+    """Load the clause→page lookup table once; empty if ingestion hasn't run."""
+    global _page_map
+    if _page_map is None:
+        try:
+            with open(PAGE_MAP_PATH, "r", encoding="utf-8") as f:
+                _page_map = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Clause page map unavailable ({e}); citing whole documents.")
+            _page_map = {}
+    return _page_map
 
-# Mapping: internal policy name → actual file path
-PDF_LINKS = {
-    "TravelEasy Policy QTD032212": os.path.join(
-        PDF_BASE_PATH, "TravelEasy Policy QTD032212.pdf"
-    ),
-    "TravelEasy Pre-Ex Policy QTD032212-PX": os.path.join(
-        PDF_BASE_PATH, "TravelEasy Pre-Ex Policy QTD032212-PX.pdf"
-    ),
-    "Scootsurance QSR022206": os.path.join(
-        PDF_BASE_PATH, "Scootsurance QSR022206_updated.pdf"
-    ),
-}
 
+def term_sources(term: Optional[str]) -> List[Dict]:
+    """Page sources for a taxonomy condition/benefit, one per document that has it."""
+    if not term:
+        return []
+    page_map = load_page_map()
+    documents = page_map.get("documents", {})
+    sources = []
+    for product, hit in page_map.get("terms", {}).get(term, {}).items():
+        file = documents.get(product, {}).get("file", f"{product}.pdf")
+        sources.append({"file": file, "page": hit["page"]})
+    return sources
 
-def add_citation(response_text: str, source_label: str = None) -> str:
+
+def _pdf_url(filename: str, page: Optional[int] = None) -> str:
+    # Convert local path to API endpoint with URL encoding
+    url = f"http://127.0.0.1:8000/policy_pdf/{quote(filename)}"
+    return f"{url}#page={page}" if page else url
+
+
+def add_citation(response_text: str, source_label: str = None, sources: Optional[List[Dict]] = None) -> str:
     """
     Adds a Markdown-formatted citation block with clickable PDF links.
 
@@ -33,7 +63,11 @@ def add_citation(response_text: str, source_label: str = None) -> str:
     response_text : str
         The model's answer text.
     source_label : str, optional
-        Label to show before the list (default = 'Sources').
+        Label to show before the list (default = 'Policy Documents').
+    sources : list of dict, optional
+        {"file", "page"} entries the answer drew on (retrieved clauses,
+        taxonomy hits). Only these documents are cited, at those pages.
+        Without sources every policy PDF is listed, as before.
 
     Returns
     -------
@@ -43,10 +77,29 @@ def add_citation(response_text: str, source_label: str = None) -> str:
     label = source_label or "Policy Documents"
     citation_block = f"\n\n**{label}:**\n"
 
-    for title, path in PDF_LINKS.items():
-        # Convert local path to API endpoint with URL encoding
-        filename = os.path.basename(path)
-        pdf_url = f"http://127.0.0.1:8000/policy_pdf/{quote(filename)}"
-        citation_block += f"- [{title} (PDF)]({pdf_url})\n"
+    if not sources:
+        for product in get_registry():
+            citation_block += f"- [{product.display_name} (PDF)]({_pdf_url(product.pdf_file)})\n"
+        return response_text + citation_block
+
+    # Group pages per document, keeping first-seen (most relevant) order.
+    pages: Dict[str, List[int]] = {}
+    for src in sources:
+        file = src.get("file")
+        if not file:
+            continue
+        doc_pages = pages.setdefault(file, [])
+        page = src.get("page")
+        if page and page not in doc_pages and len(doc_pages) < MAX_PAGES_PER_DOC:
+            doc_pages.append(page)
+
+    for file, doc_pages in pages.items():
+        product = resolve_product(file)
+        title = product.display_name if product else os.path.splitext(file)[0]
+        if not doc_pages:
+            citation_block += f"- [{title} (PDF)]({_pdf_url(file)})\n"
+            continue
+        links = ", ".join(f"[p. {p}]({_pdf_url(file, p)})" for p in doc_pages)
+        citation_block += f"- {title}: {links}\n"
 
     return response_text + citation_block
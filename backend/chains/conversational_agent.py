@@ -5,7 +5,11 @@ Enhanced for sales-aware behaviour: adapts to user tone, urgency, mindset, and d
 """
 
 import os
+from typing import Optional
+
+import httpx
 from dotenv import load_dotenv
+from groq import Groq
 
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
@@ -14,29 +18,43 @@ from langchain_core.chat_history import InMemoryChatMessageHistory
 from langchain_core.runnables.history import RunnableWithMessageHistory
 
 # 🧠 Import Internal Logic Modules
+from backend.chains.nlu import NLUResult, classify
+from backend.chains.plan_search import answer_plan_query
 from backend.chains.question_handler import handle_question
-from backend.chains.citation_helper import add_citation
+from backend.chains.retriever import retrieve_clauses, format_clauses
+from backend.chains.citation_helper import add_citation, term_sources
+from backend.utils.llm_usage import UsageCallback
+from backend.utils.metrics import stage
+from backend.utils.product_registry import get_registry
 
 load_dotenv()
 
+# Keep warmed Groq connections in the pool between requests (httpx drops idle ones after 5s).
+GROQ_KEEPALIVE_SECONDS = float(os.getenv("GROQ_KEEPALIVE_SECONDS", "120"))
+
 
 def create_insurance_agent():
     """Creates a psychologically adaptive, sales-aware travel insurance chatbot."""
 
     # 1️⃣  Initialize Groq LLM (LangChain)
+    model = "llama-3.3-70b-versatile"
+    http_client = httpx.Client(
+        limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=GROQ_KEEPALIVE_SECONDS),
+    )
     llm = ChatGroq(
-        model="llama-3.3-70b-versatile",
+        model=model,
         temperature=0.5,
         groq_api_key=os.getenv("GROQ_API_KEY"),
+        http_client=http_client,
+        callbacks=[UsageCallback(model)],
     )
 
     # 2️⃣  Define AI behaviour and personality
     system_prompt = (
         "You are **MSIG Travel Assistant**, an insurance advisor providing MSIG's travel insurance products. "
         "You only know these policy documents:\n"
-        "- TravelEasy Policy QTD032212\n"
-        "- TravelEasy Pre-Ex Policy QTD032212-PX\n"
-        "- Scootsurance QSR022206\n\n"
+        + "".join(f"- {product.display_name}\n" for product in get_registry())
+        + "\n"
         "Be factual and concise, but adapt tone based on the user’s emotional and decision state. "
         "Apply human psychology and ethical sales communication principles to build trust and clarity.\n\n"
         "Tone adaptation rules:\n"
@@ -66,72 +84,83 @@ def create_insurance_agent():
     store: dict[str, InMemoryChatMessageHistory] = {}
 
     def _get_history(session_id: str) -> InMemoryChatMessageHistory:
-        if session_id not in store:
-            store[session_id] = InMemoryChatMessageHistory()
-        return store[session_id]
+        with stage("chat", "history"):
+            if session_id not in store:
+                store[session_id] = InMemoryChatMessageHistory()
+            return store[session_id]
 
     chat = RunnableWithMessageHistory(
-        chain.with_config(run_name="chat"),
+        chain.with_config(run_name="chat", metadata={"prompt_template": "chat_agent"}),
         get_session_history=_get_history,
         input_messages_key="question",
         history_messages_key="history",
     )
 
     # 5️⃣  Main conversational method
-    def ask(session_id: str, question: str) -> str:
+    def ask(session_id: str, question: str, nlu: Optional[NLUResult] = None) -> str:
         """
         Handles:
           - Intent routing via Hasif’s backend logic
           - Behaviour-aware tone detection
           - LLM phrasing grounded to real JSON data
-          - Adds citations to PDFs
-        """
+          - Adds page-anchored citations to the relevant PDFs
 
-        routed_answer = handle_question(question)
-        q_lower = question.lower()
-
-        # Behaviour/tone classification
-        if any(
-            k in q_lower
-            for k in ["not sure", "don’t know", "maybe", "which", "help me decide"]
-        ):
-            user_state = "unsure"
-        elif any(k in q_lower for k in ["confused", "don’t understand", "complicated"]):
-            user_state = "confused"
-        elif any(
-            k in q_lower for k in ["angry", "frustrated", "unfair", "why", "hate"]
-        ):
-            user_state = "frustrated"
-        elif any(
-            k in q_lower for k in ["quick", "asap", "urgent", "flight soon", "leaving"]
-        ):
-            user_state = "urgent"
-        elif any(k in q_lower for k in ["ready", "buy", "decide", "i’ll choose"]):
-            user_state = "ready"
-        elif any(k in q_lower for k in ["what if", "explore", "browsing", "curious"]):
-            user_state = "exploratory"
-        elif any(
-            k in q_lower for k in ["worried", "concerned", "risk", "pre-existing"]
-        ):
-            user_state = "cautious"
-        else:
-            user_state = "neutral"
-
-        # Query Groq conversationally
-        ai_response = chat.invoke(
-            {
-                "question": (
-                    f"User said: {question}\n"
-                    f"Detected user mindset: {user_state}\n"
-                    f"Assistant reasoning (from JSON policies): {routed_answer}\n"
-                    "Now respond naturally, applying psychological sales communication, "
-                    "while staying strictly factual and grounded to MSIG/Scootsurance data."
-                )
-            },
-            config={"configurable": {"session_id": session_id}},
-        )
-
-        # Add clickable citations
-        return add_citation(ai_response)
+        `nlu` is the classifier result from /chat; it is computed here only
+        when the caller did not already classify the question.
+        """
 
+        nlu = nlu or classify(question)
+
+        # Coverage-filter questions are answered straight from the numeric
+        # plan table; no LLM round-trip needed.
+        if nlu.route == "search_plans":
+            with stage("chat", "plan_search"):
+                answer = answer_plan_query(question)
+            if answer:
+                history = _get_history(session_id)
+                history.add_user_message(question)
+                history.add_ai_message(answer)
+                return answer
+
+        with stage("chat", "handle_question"):
+            routed_answer = handle_question(question, nlu)
+
+        # Behaviour/tone classification (same scan as intent + routing)
+        user_state = nlu.mindset
+
+        # Ground on the actual policy wording (top-k clauses from the vector index)
+        with stage("chat", "retrieval"):
+            clauses = retrieve_clauses(question)
+        grounding = format_clauses(clauses) if clauses else "(no clauses retrieved)"
+
+        # Query Groq conversationally (history replay + LLM call)
+        with stage("chat", "llm"):
+            ai_response = chat.invoke(
+                {
+                    "question": (
+                        f"User said: {question}\n"
+                        f"Detected user mindset: {user_state}\n"
+                        f"Assistant reasoning (from JSON policies): {routed_answer}\n"
+                        f"Relevant policy clauses:\n{grounding}\n"
+                        "Now respond naturally, applying psychological sales communication, "
+                        "while staying strictly factual and grounded to MSIG/Scootsurance data. "
+                        "Answer directly from the clauses above (limits, conditions, exclusions) "
+                        "instead of sending the user to the PDFs."
+                    )
+                },
+                config={"configurable": {"session_id": session_id}},
+            )
+
+        # Cite only the pages the answer drew on: retrieved clauses first,
+        # then the taxonomy benefit the question was about.
+        sources = [{"file": c["file"], "page": c["page"]} for c in clauses] + term_sources(nlu.benefit)
+        with stage("chat", "citation"):
+            return add_citation(ai_response, sources=sources)
+
+    def warm_up() -> None:
+        """Open a pooled Groq connection (DNS + TLS) before the first real question."""
+        # Same pool as the chat model, so the connection opened here is reused.
+        Groq(api_key=os.getenv("GROQ_API_KEY"), http_client=http_client).models.list()
+
+    ask.warm_up = warm_up
     return ask
@@ -2,18 +2,13 @@
 backend/chains/intent.py
 ------------------------
 Very lightweight keyword-based intent detection.
+Backed by the shared single-pass classifier in backend.chains.nlu.
 """
 
-def detect_intent(question: str) -> str:
-    q = question.lower()
+from typing import Optional
 
-    if any(k in q for k in ["compare", "better", "vs", "difference"]):
-        return "comparison"
-    if any(k in q for k in ["what is", "mean", "explain", "definition"]):
-        return "explanation"
-    if any(k in q for k in ["pre-existing", "covered", "eligibility", "cover"]):
-        return "eligibility"
-    if any(k in q for k in ["if i", "scenario", "accident", "broke my", "ski"]):
-        return "scenario"
+from backend.chains.nlu import NLUResult, classify
 
-    return "general"
+
+def detect_intent(question: str, nlu: Optional[NLUResult] = None) -> str:
+    return (nlu or classify(question)).intent
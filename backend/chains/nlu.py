@@ -0,0 +1,143 @@
+"""
+backend/chains/nlu.py
+---------------------
+Single-pass keyword classifier for /chat.
+
+All keyword lists (intent, benefit, user mindset) are compiled into one regex
+that is scanned once per question. The result carries everything the intent
+detector, question router and conversational agent need, so they no longer
+re-scan the question with their own (diverging) lists.
+
+"search" keywords ("at least", "minimum", "which plans") only count when
+plan_search can also pull a coverage threshold out of the question, so
+"is the minimum medical cover enough?" goes to the agent, not the filter.
+
+Keywords and questions are matched without apostrophes, so "dont",
+"don't" and "don’t" all hit the same keyword.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional
+
+from backend.chains.plan_search import has_plan_filters
+
+# Ordered by precedence: the first label with a hit wins.
+INTENT_KEYWORDS = {
+    "search": ["at least", "minimum", "more than", "which plans", "plans with", "plans that"],
+    "comparison": ["compare", "better", "vs", "difference"],
+    "explanation": ["what is", "mean", "explain", "definition"],
+    "eligibility": ["pre-existing", "covered", "eligibility", "cover"],
+    "scenario": ["if i", "scenario", "accident", "broke my", "ski"],
+}
+
+# Intent -> policy_comparator / plan_search function that answers it.
+ROUTES = {
+    "search": "search_plans",
+    "comparison": "compare_policies",
+    "explanation": "explain_section",
+    "eligibility": "check_eligibility",
+    "scenario": "scenario_coverage",
+    "general": "fallback",
+}
+
+# Taxonomy benefit_name -> keywords that point at it.
+BENEFIT_KEYWORDS = {
+    "overseas_medical_expenses": ["medical"],
+    "trip_cancellation": ["trip", "cancel"],
+}
+
+# Ordered by precedence, mirroring the agent's tone adaptation rules.
+MINDSET_KEYWORDS = {
+    "unsure": ["not sure", "don't know", "maybe", "which", "help me decide"],
+    "confused": ["confused", "don't understand", "complicated"],
+    # A plain "why" is usually just a question ("why is X cheaper?").
+    "frustrated": ["angry", "frustrated", "unfair", "hate", "why can't", "why won't", "why doesn't", "why is it so"],
+    "urgent": ["quick", "asap", "urgent", "flight soon", "leaving"],
+    "ready": ["ready", "buy", "decide", "i'll choose"],
+    "exploratory": ["what if", "explore", "browsing", "curious"],
+    "cautious": ["worried", "concerned", "risk", "pre-existing"],
+}
+
+_GROUPS = (
+    ("intent", INTENT_KEYWORDS),
+    ("benefit", BENEFIT_KEYWORDS),
+    ("mindset", MINDSET_KEYWORDS),
+)
+
+
+@dataclass(frozen=True)
+class NLUResult:
+    """Everything /chat needs to know about a question, from one scan."""
+
+    intent: str
+    route: str
+    benefit: Optional[str]
+    mindset: str
+    text: str
+    matched: FrozenSet[str]
+
+
+_APOSTROPHES = re.compile(r"['’‘`ʼ]")
+
+
+def _normalise(text: str) -> str:
+    return _APOSTROPHES.sub("'", text.lower())
+
+
+def _match_form(text: str) -> str:
+    return _normalise(text).replace("'", "")
+
+
+def _compile():
+    labels: Dict[str, set] = {}
+    for group, table in _GROUPS:
+        for label, keywords in table.items():
+            for kw in keywords:
+                labels.setdefault(_match_form(kw), set()).add((group, label))
+
+    # Only one keyword can match per position, so a longer keyword also
+    # carries the labels of any shorter keyword it starts with.
+    for kw in labels:
+        for other in labels:
+            if other != kw and kw.startswith(other):
+                labels[kw] |= labels[other]
+
+    alternation = "|".join(re.escape(k) for k in sorted(labels, key=len, reverse=True))
+    # Zero-width lookahead so overlapping keywords ("what if i") all report.
+    pattern = re.compile(rf"(?=\b({alternation}))")
+    return pattern, {k: frozenset(v) for k, v in labels.items()}
+
+
+_PATTERN, _LABELS = _compile()
+
+
+def _first(group: str, table: dict, hits: set) -> Optional[str]:
+    for label in table:
+        if (group, label) in hits:
+            return label
+    return None
+
+
+def classify(question: str) -> NLUResult:
+    """Classify a question's intent, route, benefit and mindset in one pass."""
+    text = _normalise(question)
+    matched = set()
+    hits = set()
+    for m in _PATTERN.finditer(_match_form(question)):
+        kw = m.group(1)
+        matched.add(kw)
+        hits |= _LABELS[kw]
+
+    if ("intent", "search") in hits and not has_plan_filters(text):
+        hits.discard(("intent", "search"))
+
+    intent = _first("intent", INTENT_KEYWORDS, hits) or "general"
+    return NLUResult(
+        intent=intent,
+        route=ROUTES[intent],
+        benefit=_first("benefit", BENEFIT_KEYWORDS, hits),
+        mindset=_first("mindset", MINDSET_KEYWORDS, hits) or "neutral",
+        text=text,
+        matched=frozenset(matched),
+    )
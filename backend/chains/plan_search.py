@@ -0,0 +1,175 @@
+"""
+backend/chains/plan_search.py
+-----------------------------
+Numeric coverage filters over the products.
+
+Evaluates threshold filters ("medical >= 100000") and coverage flags
+("covers dental") with sorting against the columnar benefit × product
+arrays of the comparison matrix, so questions like "which plans give at
+least $100k medical and cover dental" are answered without an LLM call.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.chains.policy_comparator import get_comparison_matrix
+
+# Words in questions/filters -> taxonomy benefit_name
+BENEFIT_ALIASES = {
+    "medical": "overseas_medical_expenses",
+    "dental": "emergency_dental_expenses_accident",
+    "cancellation": "trip_cancellation",
+    "cancel": "trip_cancellation",
+    "delay": "travel_delay",
+    "death": "accidental_death_permanent_disablement",
+    "disablement": "accidental_death_permanent_disablement",
+    "baggage": "delayed_baggage",
+    "covid": "overseas_medical_expenses_covid_19",
+}
+
+_ALIAS = "|".join(sorted(BENEFIT_ALIASES, key=len, reverse=True))
+_COMPARATOR = r"(?:at\s+least|no\s+less\s+than|minimum(?:\s+of)?|min\.?|more\s+than|over|above|>=|≥)"
+# Words allowed between a benefit and its comparator: "medical coverage of at least $100k".
+_FILLER = r"(?:\s+(?:cover|coverage|limits?|expenses|benefits?|of|is|that's|with))*"
+
+
+def _amount(n: int) -> str:
+    return rf"\$?\s*(?P<amount{n}>\d[\d,]*(?:\.\d+)?)\s*(?P<unit{n}>k|m|million|thousand)?\b"
+
+
+# A filter is a benefit and a comparator + amount right next to each other,
+# in either order: "medical >= $100k", "at least 100k of medical cover".
+_FILTER_RE = re.compile(
+    rf"\b(?P<benefit1>{_ALIAS})\w*{_FILLER}\s*{_COMPARATOR}\s*{_amount(1)}"
+    rf"|(?<!\w){_COMPARATOR}\s*{_amount(2)}\s+(?:(?:of|in|for)\s+)?(?P<benefit2>{_ALIAS})"
+)
+_COVERS_RE = re.compile(rf"\b(?:cover(?:s|ing)?|includ(?:e|es|ing)|with)\s+(?:for\s+)?(?P<benefit>{_ALIAS})")
+_MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "m": 1e6, "million": 1e6}
+
+
+def resolve_benefit(name: str) -> int:
+    """Matrix row for an alias, benefit name or keyword. Raises KeyError if unknown."""
+    matrix = get_comparison_matrix()
+    row = matrix.find_benefit(BENEFIT_ALIASES.get(name.lower().strip(), name))
+    if row is None:
+        raise KeyError(name)
+    return row
+
+
+def match_mask(
+    min_limits: Optional[Dict[str, float]] = None,
+    max_limits: Optional[Dict[str, float]] = None,
+    covers: Sequence[str] = (),
+    excludes: Sequence[str] = (),
+    products: Optional[Sequence[str]] = None,
+) -> np.ndarray:
+    """Boolean mask over `products` (default: all) that pass every filter."""
+    matrix = get_comparison_matrix()
+    cols = np.array([matrix.product_index[p] for p in products], dtype=int) if products is not None \
+        else np.arange(len(matrix.products))
+    mask = np.ones(len(cols), dtype=bool)
+
+    for name, value in (min_limits or {}).items():
+        limits = matrix.limit[resolve_benefit(name), cols]
+        mask &= ~np.isnan(limits) & (limits >= value)
+    for name, value in (max_limits or {}).items():
+        limits = matrix.limit[resolve_benefit(name), cols]
+        mask &= ~np.isnan(limits) & (limits <= value)
+    for name in covers:
+        mask &= matrix.covered[resolve_benefit(name), cols]
+    for name in excludes:
+        mask &= ~matrix.covered[resolve_benefit(name), cols]
+    return mask
+
+
+def search_plans(
+    min_limits: Optional[Dict[str, float]] = None,
+    max_limits: Optional[Dict[str, float]] = None,
+    covers: Sequence[str] = (),
+    excludes: Sequence[str] = (),
+    sort_by: Optional[str] = None,
+    descending: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Products passing all filters, each with the limits of the benefits
+    involved. sort_by is a benefit (unknown limits sort last).
+    """
+    matrix = get_comparison_matrix()
+    mask = match_mask(min_limits, max_limits, covers, excludes)
+    cols = np.flatnonzero(mask)
+
+    if sort_by:
+        keys = matrix.limit[resolve_benefit(sort_by), cols]
+        keys = np.where(np.isnan(keys), -np.inf if descending else np.inf, keys)
+        order = np.argsort(-keys if descending else keys, kind="stable")
+        cols = cols[order]
+
+    shown = list(dict.fromkeys(
+        [*(min_limits or {}), *(max_limits or {}), *covers, *([sort_by] if sort_by else [])]
+    ))
+    rows = {name: resolve_benefit(name) for name in shown}
+    results = []
+    for c in cols:
+        limits = {}
+        for name, row in rows.items():
+            value = matrix.limit[row, c]
+            limits[matrix.benefits[row]] = None if np.isnan(value) else float(value)
+        results.append({"product": matrix.products[c], "limits": limits})
+    return results
+
+
+def parse_plan_query(text: str) -> Tuple[Dict[str, float], List[str]]:
+    """
+    Pull filters out of a question. Only a benefit with an adjacent
+    comparator and amount ("medical at least $100k", "over 5k
+    cancellation") becomes a minimum, and only "cover(s)/with/including
+    <benefit>" becomes a covers filter. Other numbers (trip cost, days)
+    and bare benefit mentions are ignored, so "is the minimum medical
+    cover enough for a trip costing 2000?" yields no filters.
+    Returns (min_limits, covers).
+    """
+    text = text.lower()
+    min_limits: Dict[str, float] = {}
+    for m in _FILTER_RE.finditer(text):
+        n = 1 if m.group("benefit1") else 2
+        benefit = BENEFIT_ALIASES[m.group(f"benefit{n}")]
+        amount = float(m.group(f"amount{n}").replace(",", "")) * _MULTIPLIERS.get(m.group(f"unit{n}") or "", 1)
+        min_limits[benefit] = max(amount, min_limits.get(benefit, 0))
+
+    covers = [BENEFIT_ALIASES[m.group("benefit")] for m in _COVERS_RE.finditer(text)]
+    return min_limits, list(dict.fromkeys(b for b in covers if b not in min_limits))
+
+
+def has_plan_filters(text: str) -> bool:
+    """
+    True if text asks for at least one coverage threshold. "Covers" filters
+    alone don't count: "which plans cover dental?" is left to the agent.
+    """
+    return bool(parse_plan_query(text)[0])
+
+
+def answer_plan_query(text: str) -> Optional[str]:
+    """Markdown answer for a coverage-threshold question, or None if there is no threshold."""
+    min_limits, covers = parse_plan_query(text)
+    if not min_limits:
+        return None
+
+    sort_by = next(iter(min_limits), None)
+    plans = search_plans(min_limits=min_limits, covers=covers, sort_by=sort_by)
+
+    wanted = [f"{b.replace('_', ' ')} ≥ ${v:,.0f}" for b, v in min_limits.items()]
+    wanted += [f"covers {b.replace('_', ' ')}" for b in covers]
+    header = f"**Plans with {' and '.join(wanted)}:**\n"
+    if not plans:
+        return header + "\nNone of our plans meet all of these. Would you like to see the closest matches side by side?"
+
+    lines = []
+    for plan in plans:
+        limits = ", ".join(
+            f"{b.replace('_', ' ')}: {'$' + format(v, ',.0f') if v is not None else 'covered'}"
+            for b, v in plan["limits"].items()
+        )
+        lines.append(f"- **{plan['product']}**" + (f" — {limits}" if limits else ""))
+    return header + "\n".join(lines) + "\n\nWould you like a quote for one of these plans?"
@@ -8,73 +8,229 @@ Final version supports:
 - Scenario coverage lookups
 """
 
-import os
 import json
-from typing import Dict, List, Any
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.utils.product_registry import get_registry
 
 # Use only the combined taxonomy JSON
 TAXONOMY_PATH = "data/processed/combined_taxonomy_policies.json"
 
+# Benefits whose numeric limit comes from the known coverage table
+# (taxonomy_reader) when the taxonomy itself has no coverage_limit.
+BENEFIT_LIMIT_FIELDS = {
+    "overseas_medical_expenses": "medical",
+    "trip_cancellation": "cancellation",
+    "accidental_death_permanent_disablement": "death_disablement",
+    "emergency_dental_expenses_accident": "dental",
+    "travel_delay": "travel_delay",
+}
+
 # Load the combined taxonomy once
 _combined_taxonomy = None
+_comparison_matrix = None
 
 
 def load_all_policies() -> Dict[str, Any]:
     """Load the combined taxonomy JSON with all 3 products."""
-    global _combined_taxonomy
+    global _combined_taxonomy, _comparison_matrix
     if _combined_taxonomy is None:
         with open(TAXONOMY_PATH, "r", encoding="utf-8") as f:
             _combined_taxonomy = json.load(f)
+        _comparison_matrix = None
 
     # Return dict with product names as keys pointing to the full taxonomy
     products = _combined_taxonomy.get("products", [])
     return {product: _combined_taxonomy for product in products}
 
 
+def load_policy(product: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Taxonomy for `product` (any id, name or alias in the product registry),
+    or for the first registered product present in the taxonomy. {} if none is.
+    """
+    policies = load_all_policies()
+    registry = get_registry()
+    for entry in ([registry.resolve(product)] if product else registry):
+        if entry is not None and entry.name in policies:
+            return policies[entry.name]
+    return {}
+
+
+def reload_policies() -> None:
+    """Drop the cached taxonomy so the next load_all_policies() re-reads it."""
+    global _combined_taxonomy, _comparison_matrix
+    _combined_taxonomy = None
+    _comparison_matrix = None
+
+
 # ----------------------------------------------------------------------
-# Compare two policies
+# Comparison matrix (every product × every benefit)
 # ----------------------------------------------------------------------
-def compare_policies(policy_a: dict, policy_b: dict, keyword: str) -> str:
-    """Compare two policies using a keyword that matches section names (taxonomy structure)."""
-    keyword = keyword.lower()
+@dataclass(frozen=True)
+class ComparisonMatrix:
+    """
+    Benefit × product table built once per taxonomy load.
+
+    covered (B, P) bool; limit (B, P) float, NaN where no numeric limit is
+    known; diff (B, P) = limit minus the best limit among the other
+    products (NaN when either side is unknown).
+    """
+
+    products: Tuple[str, ...]
+    benefits: Tuple[str, ...]
+    covered: np.ndarray
+    limit: np.ndarray
+    diff: np.ndarray
+    benefit_index: Dict[str, int]
+    product_index: Dict[str, int]
+
+    def find_benefit(self, keyword: str) -> Optional[int]:
+        """Row for an exact benefit name, else the first name containing the keyword's words."""
+        keyword = keyword.lower().strip().replace(" ", "_").replace("-", "_")
+        if keyword in self.benefit_index:
+            return self.benefit_index[keyword]
+        # Whole words first so "dental" doesn't land on "accidental_...".
+        for i, name in enumerate(self.benefits):
+            if f"_{keyword}_" in f"_{name.replace('-', '_')}_":
+                return i
+        for i, name in enumerate(self.benefits):
+            if keyword in name:
+                return i
+        return None
+
+    def row(self, b: int, products: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        cols = [self.product_index[p] for p in products] if products else range(len(self.products))
+        cells = {}
+        for p in cols:
+            limit, diff = self.limit[b, p], self.diff[b, p]
+            cells[self.products[p]] = {
+                "covered": bool(self.covered[b, p]),
+                "limit": None if np.isnan(limit) else float(limit),
+                "diff_vs_best_other": None if np.isnan(diff) else float(diff),
+            }
+        return {"benefit": self.benefits[b], "products": cells}
+
+    def to_dict(self, benefits: Optional[Sequence[str]] = None,
+                products: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        rows = [self.find_benefit(b) for b in benefits] if benefits else range(len(self.benefits))
+        return {
+            "products": list(products or self.products),
+            "benefits": [self.row(b, products) for b in rows if b is not None],
+        }
+
+
+def _best_other(limit: np.ndarray) -> np.ndarray:
+    """For each cell, the max limit across the *other* products in its row."""
+    filled = np.where(np.isnan(limit), -np.inf, limit)
+    n = filled.shape[1]
+    if n < 2:
+        return np.full_like(limit, np.nan)
+    order = np.sort(filled, axis=1)
+    top, second = order[:, -1:], order[:, -2:-1]
+    # The row max is "the best other" for everyone except the max itself.
+    best_other = np.where(filled == top, second, top)
+    # Ties at the top: the other top cell is still the best other.
+    ties = (filled == top).sum(axis=1, keepdims=True) > 1
+    best_other = np.where(ties & (filled == top), top, best_other)
+    return np.where(np.isinf(best_other), np.nan, best_other)
+
+
+def build_comparison_matrix(taxonomy: Dict[str, Any]) -> ComparisonMatrix:
+    from backend.utils.taxonomy_reader import load_policy_coverage
+
+    products = tuple(taxonomy.get("products", []))
+    benefits = taxonomy.get("layers", {}).get("layer_2_benefits", [])
+    names = tuple(b.get("benefit_name", "").lower() for b in benefits)
+    known = {p: load_policy_coverage(p) for p in products}
+
+    covered = np.zeros((len(names), len(products)), dtype=bool)
+    limit = np.full((len(names), len(products)), np.nan)
+    for i, benefit in enumerate(benefits):
+        field = BENEFIT_LIMIT_FIELDS.get(names[i])
+        for j, product in enumerate(products):
+            info = benefit.get("products", {}).get(product, {})
+            covered[i, j] = bool(info.get("condition_exist", False))
+            raw = (info.get("parameters") or {}).get("coverage_limit")
+            if raw in (None, "") and field:
+                raw = known[product].get(field)
+            amount = _parse_limit(raw)
+            if amount is not None:
+                limit[i, j] = amount
+
+    return ComparisonMatrix(
+        products=products,
+        benefits=names,
+        covered=covered,
+        limit=limit,
+        diff=limit - _best_other(limit),
+        benefit_index={name: i for i, name in enumerate(names)},
+        product_index={p: j for j, p in enumerate(products)},
+    )
 
-    # Since both policy_a and policy_b are the same combined taxonomy, we need to extract product names differently
-    # The "policy" dicts passed in are actually the full combined taxonomy
-    products = policy_a.get("products", [])
 
-    if len(products) < 2:
-        return f"Comparing '{keyword}' coverage. Please refer to the policy documents for detailed information."
+def _parse_limit(raw) -> Optional[float]:
+    if raw in (None, ""):
+        return None
+    if isinstance(raw, (int, float)):
+        return float(raw)
+    digits = "".join(ch for ch in str(raw) if ch.isdigit() or ch == ".")
+    try:
+        return float(digits)
+    except ValueError:
+        return None
 
-    # Get the first two products for comparison (or you can pass product indices)
-    product_a_name = products[0]
-    product_b_name = products[1]
 
-    # Search in layer_2_benefits
-    benefits = policy_a.get("layers", {}).get("layer_2_benefits", [])
+def get_comparison_matrix() -> ComparisonMatrix:
+    """The matrix for the currently loaded taxonomy (built on first use)."""
+    global _comparison_matrix
+    load_all_policies()
+    if _comparison_matrix is None:
+        _comparison_matrix = build_comparison_matrix(_combined_taxonomy)
+    return _comparison_matrix
 
-    # Find matching benefit
-    matching_benefit = None
-    for benefit in benefits:
-        benefit_name = benefit.get("benefit_name", "").lower()
-        if keyword in benefit_name:
-            matching_benefit = benefit
-            break
 
-    if not matching_benefit:
-        return f"Coverage information for '{keyword}' is available in the policy documents. Please check the PDFs."
+# ----------------------------------------------------------------------
+# Compare policies (N-way)
+# ----------------------------------------------------------------------
+def _fmt_limit(value: Optional[float]) -> str:
+    return f"${value:,.0f}" if value is not None else "—"
 
-    # Extract product-specific data
-    info_a = matching_benefit.get("products", {}).get(product_a_name, {})
-    info_b = matching_benefit.get("products", {}).get(product_b_name, {})
 
-    exists_a = info_a.get("condition_exist", False)
-    exists_b = info_b.get("condition_exist", False)
+def compare_policies(keyword: str, products: Optional[Sequence[str]] = None) -> str:
+    """
+    Compare every product (or `products`) on the benefit matching `keyword`.
 
-    # Build comparison
-    result = f"### Comparison: {matching_benefit.get('benefit_name', keyword)}\n\n"
-    result += f"**{product_a_name}**: {'Covered' if exists_a else 'Not covered'}\n"
-    result += f"**{product_b_name}**: {'Covered' if exists_b else 'Not covered'}\n"
+    Answers come from the precomputed comparison matrix.
+    """
+    matrix = get_comparison_matrix()
+    if len(products or matrix.products) < 2:
+        return f"Comparing '{keyword}' coverage. Please refer to the policy documents for detailed information."
 
+    b = matrix.find_benefit(keyword)
+    if b is None:
+        return f"Coverage information for '{keyword}' is available in the policy documents. Please check the PDFs."
+
+    row = matrix.row(b, products)
+    result = f"### Comparison: {row['benefit']}\n\n"
+    result += "| Plan | Covered | Limit | vs. best other |\n|---|---|---|---|\n"
+    for product, cell in row["products"].items():
+        diff = cell["diff_vs_best_other"]
+        if diff is None:
+            diff_text = "—"
+        elif diff > 0:
+            diff_text = f"+{_fmt_limit(diff)} (best)"
+        elif diff == 0:
+            diff_text = "tied best"
+        else:
+            diff_text = f"-{_fmt_limit(-diff)}"
+        result += (
+            f"| **{product}** | {'Covered' if cell['covered'] else 'Not covered'} "
+            f"| {_fmt_limit(cell['limit'])} | {diff_text} |\n"
+        )
     return result
 
 
@@ -158,19 +314,15 @@ def scenario_coverage(policy: dict, user_scenario: str) -> str:
 if __name__ == "__main__":
     policies = load_all_policies()
     print(f"Loaded: {list(policies.keys())}")
+    travel = load_policy("TravelEasy")
+    scoot = load_policy("Scootsurance")
 
-    print(
-        compare_policies(
-            policies["TravelEasy Policy QTD032212"],
-            policies["Scootsurance QSR022206"],
-            "Trip Cancellation due to COVID-19",
-        )
-    )
+    print(compare_policies("Trip Cancellation due to COVID-19"))
 
-    print(explain_section(policies["Scootsurance QSR022206"], "Trip Cancellation"))
-    print(check_eligibility(policies["TravelEasy Policy QTD032212"], "pre-existing"))
+    print(explain_section(scoot, "Trip Cancellation"))
+    print(check_eligibility(travel, "pre-existing"))
     print(
         scenario_coverage(
-            policies["TravelEasy Policy QTD032212"], "I broke my leg skiing in Japan"
+            travel, "I broke my leg skiing in Japan"
         )
     )
@@ -2,45 +2,56 @@
 backend/chains/question_handler.py
 -----------------------------------
 Routes user queries to correct logic (comparison, explanation, eligibility, scenario).
+Routing comes from the shared classifier in backend.chains.nlu.
 """
 
+from typing import Optional
+
+from backend.chains.nlu import NLUResult, classify
+from backend.chains.plan_search import answer_plan_query
 from backend.chains.policy_comparator import (
-    load_all_policies,
+    load_policy,
     compare_policies,
     explain_section,
     check_eligibility,
     scenario_coverage
 )
 
-def handle_question(question: str) -> str:
-    q = question.lower()
-    policies = load_all_policies()
-    travel = policies["TravelEasy Policy QTD032212"]
-    scoot = policies["Scootsurance QSR022206_updated"]
 
-    if any(k in q for k in ["compare", "better", "vs", "difference"]):
+def handle_question(question: str, nlu: Optional[NLUResult] = None) -> str:
+    nlu = nlu or classify(question)
+    # Every product shares the combined taxonomy; the registry decides which
+    # product's entry to read, so no product ids are hard-coded here.
+    policy = load_policy()
+
+    if nlu.route == "search_plans":
+        # Coverage filters ("at least $100k medical") answered from the numeric table
+        answer = answer_plan_query(question)
+        if answer:
+            return answer
+        return "I can filter plans by coverage limits — e.g. 'plans with at least $100k medical that cover dental'."
+
+    elif nlu.route == "compare_policies":
         # Comparison logic
-        if "medical" in q:
-            return compare_policies(travel, scoot, "overseas_medical_expenses")
-        elif "trip" in q or "cancel" in q:
-            return compare_policies(travel, scoot, "trip_cancellation")
+        if nlu.benefit:
+            return compare_policies(nlu.benefit)
         else:
             return "I can compare benefits like medical coverage or trip cancellation — which one?"
 
-    elif any(k in q for k in ["mean", "explain", "what is"]):
+    elif nlu.route == "explain_section":
         # Explanation
-        if "trip" in q or "cancel" in q:
-            return explain_section(scoot, "trip_cancellation")
+        if nlu.benefit == "trip_cancellation":
+            return explain_section(policy, "trip_cancellation")
         else:
-            return explain_section(travel, "overseas_medical")
+            return explain_section(policy, "overseas_medical")
 
-    elif any(k in q for k in ["cover", "covered", "eligibility", "pre-existing"]):
+    elif nlu.route == "check_eligibility":
         # Eligibility
-        return check_eligibility(travel, "pre-existing")
+        return check_eligibility(policy, "pre-existing")
 
-    elif any(k in q for k in ["if i", "scenario", "accident", "broke my", "ski"]):
+    elif nlu.route == "scenario_coverage":
         # Scenario
-        return scenario_coverage(travel, q)
+        return scenario_coverage(policy, nlu.text)
 
     else:
         return "I can compare plans, explain benefits, or check coverage. Try asking about 'trip cancellation' or 'medical coverage'."
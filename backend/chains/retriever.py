@@ -0,0 +1,104 @@
+"""
+backend/chains/retriever.py
+---------------------------
+Query-time retrieval of policy clauses from the on-disk vector index.
+
+The index is built by backend/ingestion/build_vector_index.py: page-aware
+chunks of every PDF in data/Policy_Wordings, embedded with the local
+bge-small model and stored in a persistent Chroma (HNSW) collection under
+CHROMA_PERSIST_DIR. Retrieval degrades to an empty list when the index or
+its optional dependencies are missing, or when a query fails, so /chat
+keeps working without it.
+"""
+
+import os
+from typing import Any, Dict, List
+
+EMBED_MODEL = "BAAI/bge-small-en-v1.5"
+COLLECTION_NAME = "policy_clauses"
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "1") == "1"
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+
+_embedder = None
+_collection = None
+_unavailable = False
+
+
+def get_embedder():
+    """Load the bge-small embedding model once (shared with ingestion)."""
+    global _embedder
+    if _embedder is None:
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+        _embedder = HuggingFaceEmbedding(model_name=EMBED_MODEL)
+    return _embedder
+
+
+def get_collection(create: bool = False):
+    """Open the persistent Chroma collection (HNSW, cosine space)."""
+    global _collection
+    if _collection is None or create:
+        import chromadb
+        from backend.config import CHROMA_PERSIST_DIR
+
+        client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
+        if create:
+            _collection = client.get_or_create_collection(
+                COLLECTION_NAME, metadata={"hnsw:space": "cosine"}
+            )
+        else:
+            _collection = client.get_collection(COLLECTION_NAME)
+    return _collection
+
+
+def retrieve_clauses(question: str, k: int = RETRIEVAL_TOP_K) -> List[Dict[str, Any]]:
+    """
+    Return the top-k policy clauses for a question.
+
+    Each clause is {"product", "file", "page", "offset", "text", "score"},
+    best match first. Returns [] when retrieval is disabled or unavailable.
+    """
+    global _unavailable
+    if not RETRIEVAL_ENABLED or _unavailable or not question.strip():
+        return []
+
+    try:
+        collection = get_collection()
+        query_vec = get_embedder().get_query_embedding(question)
+    except Exception as e:
+        # Index not built yet or optional deps missing: stop retrying per request.
+        print(f"ℹ Clause retrieval disabled: {e}")
+        _unavailable = True
+        return []
+
+    try:
+        res = collection.query(
+            query_embeddings=[query_vec],
+            n_results=k,
+            include=["documents", "metadatas", "distances"],
+        )
+    except Exception as e:
+        # A failed query (corrupt segment, embedding shape mismatch) costs this
+        # answer its grounding, not the whole /chat request.
+        print(f"⚠ Clause retrieval failed: {e}")
+        return []
+    clauses = []
+    for text, meta, dist in zip(res["documents"][0], res["metadatas"][0], res["distances"][0]):
+        clauses.append(
+            {
+                "product": meta.get("product"),
+                "file": meta.get("file"),
+                "page": meta.get("page"),
+                "offset": meta.get("offset"),
+                "text": text,
+                "score": round(1.0 - dist, 4),
+            }
+        )
+    return clauses
+
+
+def format_clauses(clauses: List[Dict[str, Any]]) -> str:
+    """Render retrieved clauses as a compact prompt block."""
+    return "\n".join(
+        f"[{c['product']}, p.{c['page']}] {c['text']}" for c in clauses
+    )
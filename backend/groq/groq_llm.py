@@ -7,14 +7,17 @@ Uses the official `langchain_groq` integration.
 
 from langchain_groq import ChatGroq
 from backend.config import GROQ_API_KEY
+from backend.utils.llm_usage import UsageCallback
 
 
 def get_groq_llm(model: str = "llama-3.3-70b-versatile", temperature: float = 0.3):
     """
-    Returns a LangChain ChatGroq instance using the official connector.
+    Returns a LangChain ChatGroq instance using the official connector,
+    with token usage recorded like the agent's and extractor's models.
     """
     return ChatGroq(
         groq_api_key=GROQ_API_KEY,
         model=model,
         temperature=temperature,
+        callbacks=[UsageCallback(model)],
     )
@@ -0,0 +1,130 @@
+# backend/ingestion/build_page_map.py
+"""
+Record where every policy clause and taxonomy term lives in the PDFs.
+
+Writes data/processed/clause_page_map.json:
+  - documents: product -> {file, pages}
+  - clauses:   product -> [{section, title, page, offset}]  ("SECTION n – TITLE" headings)
+  - terms:     taxonomy condition/benefit -> product -> {page, offset, section, pages}
+
+citation_helper reads this table to emit `#page=N` links without touching
+the PDFs at request time. Re-run after changing a PDF or the taxonomy:
+    python -m backend.ingestion.build_page_map
+"""
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+from backend.ingestion.pdf_loader import extract_pages_from_pdf
+
+DATA_DIR = "data/Policy_Wordings"
+TAXONOMY_PATH = "data/processed/combined_taxonomy_policies.json"
+OUTPUT_PATH = "data/processed/clause_page_map.json"
+
+MAX_TEXT_HITS = 10  # pages kept per term when falling back to plain-text search
+
+# Upper-case benefit headings, e.g. "SECTION 6 – OVERSEAS MEDICAL EXPENSES".
+HEADING_RE = re.compile(
+    r"\bSECTION\s+(\d+[A-Z]?)\s*[–-]\s*"
+    r"((?:[A-Z0-9&/(),'’-]+\s+)*?[A-Z0-9&/(),'’-]+)(?=\s+[A-Z]?[a-z]|\s*$)"
+)
+
+STOPWORDS = {"of", "and", "to", "the", "in", "due", "a", "for", "on", "whilst", "while", "by", "or"}
+SYNONYMS = {"travel": "trip", "disability": "disablement", "expense": "expenses"}
+
+
+def _tokens(text: str) -> set:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return {SYNONYMS.get(w, w) for w in words if w not in STOPWORDS}
+
+
+def find_clauses(pages: List[str]) -> List[Dict]:
+    clauses = []
+    for page_no, text in enumerate(pages, start=1):
+        for m in HEADING_RE.finditer(text):
+            clauses.append(
+                {"section": m.group(1), "title": m.group(2).strip(), "page": page_no, "offset": m.start()}
+            )
+    return clauses
+
+
+def _match_clause(term: str, clauses: List[Dict]) -> Optional[Dict]:
+    """Best clause whose title covers most of the term's words (>= 60%)."""
+    wanted = _tokens(term)
+    if not wanted:
+        return None
+    best, best_score = None, 0.6
+    for clause in clauses:
+        score = len(wanted & _tokens(clause["title"])) / len(wanted)
+        if score > best_score or (best is None and score >= best_score):
+            best, best_score = clause, score
+    return best
+
+
+def _text_hits(term: str, lowered_pages: List[str]) -> List[Dict]:
+    phrase = term.replace("_", " ").replace("-", " ").lower()
+    hits = []
+    for page_no, text in enumerate(lowered_pages, start=1):
+        offset = text.find(phrase)
+        if offset != -1:
+            hits.append({"page": page_no, "offset": offset})
+            if len(hits) >= MAX_TEXT_HITS:
+                break
+    return hits
+
+
+def taxonomy_terms(path: str = TAXONOMY_PATH) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        taxonomy = json.load(f)
+    terms = []
+    for items in taxonomy.get("layers", {}).values():
+        for item in items:
+            name = item.get("benefit_name") or item.get("condition")
+            if name:
+                terms.append(name)
+    return terms
+
+
+def build_page_map() -> Dict:
+    terms = taxonomy_terms()
+    page_map = {"documents": {}, "clauses": {}, "terms": {}}
+
+    for file in sorted(os.listdir(DATA_DIR)):
+        if not file.endswith(".pdf"):
+            continue
+        product = os.path.splitext(file)[0]
+        pages = extract_pages_from_pdf(os.path.join(DATA_DIR, file))
+        lowered = [p.lower() for p in pages]
+        clauses = find_clauses(pages)
+
+        page_map["documents"][product] = {"file": file, "pages": len(pages)}
+        page_map["clauses"][product] = clauses
+
+        for term in terms:
+            clause = _match_clause(term, clauses)
+            hits = _text_hits(term, lowered)
+            if clause:
+                entry = {"page": clause["page"], "offset": clause["offset"], "section": clause["section"]}
+            elif hits:
+                entry = {"page": hits[0]["page"], "offset": hits[0]["offset"], "section": None}
+            else:
+                continue
+            entry["pages"] = sorted({h["page"] for h in hits} | {entry["page"]})
+            page_map["terms"].setdefault(term, {})[product] = entry
+
+        print(f"✅ {file}: {len(clauses)} clauses, {len(pages)} pages")
+
+    return page_map
+
+
+def main():
+    page_map = build_page_map()
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
+        json.dump(page_map, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ Clause→page map saved → {OUTPUT_PATH} ({len(page_map['terms'])} taxonomy terms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# backend/ingestion/build_vector_index.py
+"""
+Embed page-aware chunks of every policy PDF into the persistent vector index
+used by backend/chains/retriever.py.
+
+Run after adding or updating a PDF in data/Policy_Wordings:
+    python -m backend.ingestion.build_vector_index
+"""
+import os
+from typing import Dict, Iterator, List, Tuple
+
+from backend.chains.retriever import get_collection, get_embedder
+from backend.ingestion.pdf_loader import extract_pages_from_pdf
+
+DATA_DIR = "data/Policy_Wordings"
+
+CHUNK_CHARS = 900   # ~200 tokens per clause
+CHUNK_OVERLAP = 150
+BATCH_SIZE = 64
+
+
+def chunk_page(text: str) -> Iterator[Tuple[int, str]]:
+    """Split one page into overlapping chunks, breaking on whitespace. Yields (offset, chunk)."""
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + CHUNK_CHARS)
+        if end < len(text):
+            cut = text.rfind(" ", start + CHUNK_CHARS // 2, end)
+            end = cut if cut != -1 else end
+        yield start, text[start:end].strip()
+        if end >= len(text):
+            break
+        start = max(start + 1, end - CHUNK_OVERLAP)
+        # Realign to a word boundary so chunks don't start mid-word.
+        space = text.find(" ", start, end)
+        start = space + 1 if space != -1 else start
+
+
+def build_chunks(pdf_path: str) -> List[Dict]:
+    filename = os.path.basename(pdf_path)
+    product = os.path.splitext(filename)[0]
+    chunks = []
+    for page_no, page_text in enumerate(extract_pages_from_pdf(pdf_path), start=1):
+        for i, (offset, chunk) in enumerate(chunk_page(page_text)):
+            if len(chunk) < 40:
+                continue
+            chunks.append(
+                {
+                    "id": f"{filename}:{page_no}:{i}",
+                    "text": chunk,
+                    "meta": {"product": product, "file": filename, "page": page_no, "offset": offset},
+                }
+            )
+    return chunks
+
+
+def main():
+    embedder = get_embedder()
+    collection = get_collection(create=True)
+
+    for file in sorted(os.listdir(DATA_DIR)):
+        if not file.endswith(".pdf"):
+            continue
+        print(f"\n📄 Indexing: {file}")
+        chunks = build_chunks(os.path.join(DATA_DIR, file))
+
+        # Replace this document's previous chunks so re-runs stay idempotent.
+        collection.delete(where={"file": file})
+        for i in range(0, len(chunks), BATCH_SIZE):
+            batch = chunks[i:i + BATCH_SIZE]
+            collection.add(
+                ids=[c["id"] for c in batch],
+                documents=[c["text"] for c in batch],
+                metadatas=[c["meta"] for c in batch],
+                embeddings=embedder.get_text_embedding_batch([c["text"] for c in batch]),
+            )
+        print(f"✅ {len(chunks)} chunks indexed")
+
+    print(f"\n📦 Vector index ready: {collection.count()} clauses")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,23 @@
 import os
+import sys
 import json
 from copy import deepcopy
 
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.utils.product_registry import get_registry
+
 # Paths
 TAXONOMY_PATH = "data/Taxonomy/Taxonomy_Hackathon.json"
 PROCESSED_DIR = "data/processed"
 OUTPUT_PATH = os.path.join(PROCESSED_DIR, "combined_taxonomy_policies.json")
 
-# Map your actual product filenames to taxonomy placeholders
+# Taxonomy placeholders → actual product names (data/products.json)
 PRODUCT_MAPPING = {
-    "Product A": "TravelEasy Policy QTD032212",
-    "Product B": "TravelEasy Pre-Ex Policy QTD032212-PX",
-    "Product C": "Scootsurance QSR022206_updated"
+    product.taxonomy_placeholder: product.name
+    for product in get_registry()
+    if product.taxonomy_placeholder
 }
 
 def load_json(path):
@@ -3,13 +3,20 @@ import json
 import re
 import os
 from dotenv import load_dotenv
-from llama_index.core import Settings
-from llama_index.llms.groq import Groq
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+from backend.utils.metrics import LLM_CALLS, record_llm_tokens
+from backend.utils.token_ledger import classify_llm_error, estimate_tokens, ledger
+
+INGESTION_ENDPOINT = "ingestion"
+STRUCTURE_TEMPLATE = "structure_policy"
 
 
 def init_llm():
     """Initialize Groq + Embeddings (reads API key from .env)."""
+    from llama_index.core import Settings
+    from llama_index.llms.groq import Groq
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
     load_dotenv()
 
     llm = Groq(
@@ -38,8 +45,31 @@ def extract_json_from_text(text):
     return None
 
 
-def llm_structure_text(llm, text_chunk, schema_prompt):
-    """Send one chunk to Groq for schema-based parsing."""
-    response = llm.complete(f"{schema_prompt}\n\nDocument:\n{text_chunk}")
+def completion_usage(response):
+    """(prompt_tokens, completion_tokens) from a llama_index response's raw Groq payload."""
+    raw = getattr(response, "raw", None) or {}
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is None:
+        return 0, 0
+    if not isinstance(usage, dict):
+        usage = {k: getattr(usage, k, 0) for k in ("prompt_tokens", "completion_tokens")}
+    return usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0
+
+
+def llm_structure_text(llm, text_chunk, schema_prompt, template=STRUCTURE_TEMPLATE):
+    """Send one chunk to Groq for schema-based parsing (tokens go to the usage ledger)."""
+    prompt = f"{schema_prompt}\n\nDocument:\n{text_chunk}"
+    model = getattr(llm, "model", "unknown")
+    ledger.check_prompt(estimate_tokens(len(prompt)), template, INGESTION_ENDPOINT)
+    try:
+        response = llm.complete(prompt)
+    except Exception as e:
+        LLM_CALLS.inc(model=model, outcome="error")
+        ledger.record_error(classify_llm_error(e), template, INGESTION_ENDPOINT)
+        raise
+    input_tokens, output_tokens = completion_usage(response)
+    record_llm_tokens(model, input_tokens, output_tokens)
+    ledger.record(model, input_tokens, output_tokens, template=template,
+                  endpoint=INGESTION_ENDPOINT, prompt_chars=len(prompt))
     parsed = extract_json_from_text(response.text)
     return parsed or {"raw_text": response.text}
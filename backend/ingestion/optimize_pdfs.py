@@ -0,0 +1,95 @@
+# backend/ingestion/optimize_pdfs.py
+"""
+Prepare policy PDFs for serving over /policy_pdf.
+
+For every PDF in data/Policy_Wordings:
+  - linearise it ("fast web view") with qpdf when it isn't already, so
+    viewers can render page 1 before the download finishes;
+  - record its SHA-256, size and mtime in data/processed/pdf_manifest.json.
+    The API uses the hash as a strong ETag instead of re-hashing per request.
+
+Run after adding or replacing a PDF:
+    python -m backend.ingestion.optimize_pdfs
+"""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from typing import Dict
+
+DATA_DIR = "data/Policy_Wordings"
+MANIFEST_PATH = "data/processed/pdf_manifest.json"
+
+HASH_CHUNK = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_linearized(path: str) -> bool:
+    import fitz  # only the CLI needs MuPDF; the API just hashes
+
+    with fitz.open(path) as doc:
+        return bool(doc.is_fast_webaccess)
+
+
+def linearize(path: str) -> bool:
+    """
+    Linearise a PDF in place with qpdf. Returns True if the file is
+    linearised afterwards. MuPDF dropped linearisation support, so without
+    qpdf on PATH the file is left untouched.
+    """
+    if is_linearized(path):
+        return True
+    qpdf = shutil.which("qpdf")
+    if not qpdf:
+        print(f"⚠️ qpdf not found; serving {os.path.basename(path)} as-is (not linearised)")
+        return False
+
+    tmp_path = path + ".linear.tmp"
+    try:
+        subprocess.run([qpdf, "--linearize", path, tmp_path], check=True, capture_output=True)
+        os.replace(tmp_path, path)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ qpdf failed for {os.path.basename(path)}: {e.stderr.decode(errors='ignore').strip()}")
+        return False
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return is_linearized(path)
+
+
+def manifest_entry(path: str, linearized: bool) -> Dict:
+    stat = os.stat(path)
+    return {
+        "sha256": file_sha256(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "linearized": linearized,
+    }
+
+
+def main():
+    manifest = {}
+    for file in sorted(os.listdir(DATA_DIR)):
+        if not file.endswith(".pdf"):
+            continue
+        path = os.path.join(DATA_DIR, file)
+        linearized = linearize(path)
+        manifest[file] = manifest_entry(path, linearized)
+        print(f"✅ {file}: {manifest[file]['size']} bytes, linearised={linearized}")
+
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"\n✅ PDF manifest saved → {MANIFEST_PATH}")
+
+
+if __name__ == "__main__":
+    main()
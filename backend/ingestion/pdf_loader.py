@@ -1,6 +1,7 @@
 # backend/ingestion/pdf_loader.py
 import fitz
 import os
+from typing import List
 
 def extract_text_from_pdf(pdf_path: str) -> str:
     """Extract text from a given PDF file."""
@@ -11,3 +12,10 @@ def extract_text_from_pdf(pdf_path: str) -> str:
         for page in doc:
             text += page.get_text("text") + "\n"
     return " ".join(text.split())
+
+def extract_pages_from_pdf(pdf_path: str) -> List[str]:
+    """Extract whitespace-normalised text per page (index 0 = page 1)."""
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"File not found: {pdf_path}")
+    with fitz.open(pdf_path) as doc:
+        return [" ".join(page.get_text("text").split()) for page in doc]
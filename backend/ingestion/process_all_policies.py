@@ -3,7 +3,8 @@ import os
 import json
 from backend.ingestion.pdf_loader import extract_text_from_pdf
 from backend.ingestion.taxonomy_mapper import load_taxonomy, build_schema_prompt
-from backend.ingestion.llama_structurer import init_llm, llm_structure_text
+from backend.ingestion.llama_structurer import INGESTION_ENDPOINT, init_llm, llm_structure_text
+from backend.utils.token_ledger import ledger
 
 DATA_DIR = "data/Policy_Wordings"
 OUTPUT_DIR = "data/processed"
@@ -38,5 +39,10 @@ def main():
             json.dump(structured_data, f, indent=2, ensure_ascii=False)
         print(f"✅ Saved structured JSON → {out_path}")
 
+    usage = ledger.snapshot()["by_endpoint"].get(INGESTION_ENDPOINT)
+    if usage:
+        print(f"💸 LLM usage: {usage['calls']} calls, {usage['input_tokens']} in / "
+              f"{usage['output_tokens']} out tokens, ${usage['cost_usd']:.4f}")
+
 if __name__ == "__main__":
     main()
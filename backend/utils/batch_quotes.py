@@ -0,0 +1,180 @@
+"""
+backend/utils/batch_quotes.py
+-----------------------------
+Offline bulk quoting over booking exports.
+
+Streams trips from CSV or Parquet, prices them in chunks on a process pool
+with the same engine and recommendation rule as /generate_quotes, and
+writes one output row per trip as each chunk finishes. At most
+`workers * 2` chunks are in flight, so memory stays flat regardless of
+file size. Input rows need `duration` and `trip_cost` columns (missing
+duration defaults to 7 days) and may carry `passenger_details` /
+`passenger_count` for party pricing; all input columns are passed through.
+
+Usage:
+    python -m backend.utils.batch_quotes trips.csv -o quotes.csv
+    python -m backend.utils.batch_quotes trips.parquet -o quotes.parquet --workers 8
+
+Parquet support needs the optional `pyarrow` package.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.utils.product_registry import get_registry
+from backend.utils.quote_engine import get_rate_table, price_trips
+
+CHUNK_ROWS = int(os.getenv("BATCH_QUOTE_CHUNK_ROWS", "5000"))
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        sys.exit("❌ Parquet files need pyarrow: pip install pyarrow")
+
+
+# ---------------------------------------------------------------------------- #
+# Readers: yield lists of row dicts, CHUNK_ROWS at a time
+# ---------------------------------------------------------------------------- #
+def read_chunks(path: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[List[Dict]]:
+    if path.endswith(".parquet"):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pylist()
+        return
+
+    with open(path, newline="", encoding="utf-8") as f:
+        chunk = []
+        for row in csv.DictReader(f):
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+# ---------------------------------------------------------------------------- #
+# Worker: price one chunk
+# ---------------------------------------------------------------------------- #
+def quote_chunk(rows: List[Dict]) -> List[Dict]:
+    """Add party counts, per-product party prices and the recommended plan to each row."""
+    table = get_rate_table()
+    pricing, best = price_trips(rows, table)
+    names = [get_registry().display_name(p) for p in table.products]
+
+    out = []
+    for row, party, row_prices, pick in zip(
+        rows, pricing.counts.tolist(), pricing.total.round(2).tolist(), best.tolist()
+    ):
+        quoted = dict(row)
+        quoted["adults"], quoted["children"], quoted["infants"] = party
+        for name, price in zip(names, row_prices):
+            quoted[f"price_{name}"] = price
+        quoted["recommended_plan"] = names[pick]
+        quoted["recommended_price"] = row_prices[pick]
+        out.append(quoted)
+    return out
+
+
+# ---------------------------------------------------------------------------- #
+# Writers: append one chunk at a time
+# ---------------------------------------------------------------------------- #
+class _CsvWriter:
+    def __init__(self, path: str):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = None
+
+    def write(self, rows: List[Dict]):
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._file, fieldnames=list(rows[0].keys()), extrasaction="ignore")
+            self._writer.writeheader()
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path: str):
+        _require_pyarrow()
+        self.path = path
+        self._writer = None
+
+    def write(self, rows: List[Dict]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            batch = pa.Table.from_pylist(rows)
+            self._writer = pq.ParquetWriter(self.path, batch.schema)
+        else:
+            batch = pa.Table.from_pylist(rows, schema=self._writer.schema)
+        self._writer.write_table(batch)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def open_writer(path: str):
+    return _ParquetWriter(path) if path.endswith(".parquet") else _CsvWriter(path)
+
+
+# ---------------------------------------------------------------------------- #
+# Driver
+# ---------------------------------------------------------------------------- #
+def run(input_path: str, output_path: str, workers: int = os.cpu_count() or 1,
+        chunk_rows: int = CHUNK_ROWS) -> int:
+    """Quote every trip in input_path into output_path. Returns rows written."""
+    writer = open_writer(output_path)
+    written = 0
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Bounded window: keeps output in input order and memory flat.
+            pending = deque()
+            for chunk in read_chunks(input_path, chunk_rows):
+                pending.append(pool.submit(quote_chunk, chunk))
+                if len(pending) >= workers * 2:
+                    rows = pending.popleft().result()
+                    writer.write(rows)
+                    written += len(rows)
+            while pending:
+                rows = pending.popleft().result()
+                writer.write(rows)
+                written += len(rows)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Quoted {written:,} trips → {output_path} in {elapsed:.1f}s")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-quote trips from a CSV/Parquet export.")
+    parser.add_argument("input", help="Trips file (.csv or .parquet)")
+    parser.add_argument("-o", "--output", required=True, help="Quotes file (.csv or .parquet)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Trips per chunk")
+    args = parser.parse_args()
+
+    run(args.input, args.output, workers=max(1, args.workers), chunk_rows=max(1, args.chunk_rows))
+
+
+if __name__ == "__main__":
+    main()
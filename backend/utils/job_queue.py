@@ -0,0 +1,203 @@
+"""
+backend/utils/job_queue.py
+--------------------------
+In-process background job queue backed by a durable SQLite table.
+
+Jobs are rows in `jobs` (queued → running → done/failed) executed by a
+thread pool. Rows survive restarts: jobs that were queued or running when
+the process stopped are re-queued by start(). Finished jobs are kept for
+JOB_RETENTION_HOURS so clients can fetch the result, then purged. An
+optional cleanup(kind, payload) hook releases a job's inputs (e.g. its
+uploaded file) once it is done or failed, and again when its row is purged.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "data/jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))
+
+DEFAULT_JOB_SECONDS = 20.0  # ETA guess until a kind has finished jobs
+ETA_SAMPLE = 20             # recent finished jobs averaged for the ETA
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    payload     TEXT NOT NULL,
+    result      TEXT,
+    error       TEXT,
+    created_at  REAL NOT NULL,
+    started_at  REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class JobQueue:
+    """
+    Durable queue running `handler(kind, payload) -> result` on worker threads.
+    The result must be JSON-serialisable.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, Dict[str, Any]], Any],
+        db_path: str = JOBS_DB_PATH,
+        workers: int = JOB_WORKERS,
+        retention_hours: float = JOB_RETENTION_HOURS,
+        cleanup: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ):
+        self.handler = handler
+        self.cleanup = cleanup
+        self.workers = max(1, workers)
+        self.retention_seconds = retention_hours * 3600
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def start(self) -> int:
+        """Start the workers and re-queue jobs interrupted by a restart."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self.purge()
+        with self._lock:
+            self._db.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+            pending = [r["id"] for r in self._db.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at"
+            )]
+        for job_id in pending:
+            self._executor.submit(self._run, job_id)
+        if pending:
+            print(f"🔁 Re-queued {len(pending)} interrupted job(s)")
+        return len(pending)
+
+    def shutdown(self, wait: bool = False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
+
+    # ------------------------------------------------------------------ #
+    # Producer / status API
+    # ------------------------------------------------------------------ #
+    def submit(self, kind: str, payload: Dict[str, Any]) -> str:
+        if self._executor is None:
+            self.start()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, status, payload, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(payload), time.time()),
+            )
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job status with ETA in seconds (None once finished), or None if unknown/purged."""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            ahead = 0
+            if row["status"] == "queued":
+                ahead = self._db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running') AND created_at < ?",
+                    (row["created_at"],),
+                ).fetchone()[0]
+            avg = self._avg_duration(row["kind"])
+
+        now = time.time()
+        if row["status"] == "queued":
+            # Jobs ahead are drained `workers` at a time, then this one runs.
+            eta = (ahead // self.workers) * avg + avg
+        elif row["status"] == "running":
+            eta = max(0.0, avg - (now - row["started_at"]))
+        else:
+            eta = None
+
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        }
+
+    def purge(self) -> int:
+        """Delete finished jobs older than the retention window."""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            purged = self._db.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (cutoff,),
+            ).fetchall()
+            self._db.executemany("DELETE FROM jobs WHERE id = ?", [(row["id"],) for row in purged])
+        for row in purged:
+            self._cleanup(row["id"], row["kind"], row["payload"])
+        return len(purged)
+
+    # ------------------------------------------------------------------ #
+    # Worker
+    # ------------------------------------------------------------------ #
+    def _cleanup(self, job_id: str, kind: str, payload: str):
+        if self.cleanup is None:
+            return
+        try:
+            self.cleanup(kind, json.loads(payload))
+        except Exception as e:
+            print(f"⚠ Cleanup for job {job_id} ({kind}) failed: {e}")
+
+    def _avg_duration(self, kind: str) -> float:
+        row = self._db.execute(
+            "SELECT AVG(finished_at - started_at) FROM (SELECT finished_at, started_at FROM jobs "
+            "WHERE kind = ? AND status = 'done' ORDER BY finished_at DESC LIMIT ?)",
+            (kind, ETA_SAMPLE),
+        ).fetchone()
+        return row[0] if row and row[0] is not None else DEFAULT_JOB_SECONDS
+
+    def _run(self, job_id: str):
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+            if cur.rowcount == 0:
+                return  # already picked up or purged
+            row = self._db.execute("SELECT kind, payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+        try:
+            result = self.handler(row["kind"], json.loads(row["payload"]))
+            update = ("done", json.dumps(result), None)
+        except Exception as e:
+            print(f"❌ Job {job_id} ({row['kind']}) failed: {e}")
+            update = ("failed", None, str(e))
+
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (*update, time.time(), job_id),
+            )
+        self._cleanup(job_id, row["kind"], row["payload"])
+        self.purge()
@@ -0,0 +1,113 @@
+"""
+backend/utils/llm_usage.py
+--------------------------
+LangChain callback that records token usage from every Groq response.
+
+Attach it to a chat model (`ChatGroq(..., callbacks=[UsageCallback(model)])`);
+on each completed call it reads the provider's usage block and feeds
+lea_llm_tokens_total / lea_llm_calls_total in backend/utils/metrics.py and
+the per-endpoint/session/template ledger in backend/utils/token_ledger.py.
+Name the prompt at the call site with run metadata:
+
+    llm.invoke(prompt, config={"metadata": {"prompt_template": "extract_ticket"}})
+
+Imported only by modules that already load LangChain, so the API's cold
+start doesn't pay for it.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from backend.utils.metrics import LLM_CALLS, record_llm_tokens
+from backend.utils.token_ledger import (
+    UNKNOWN, classify_llm_error, current_context, estimate_tokens, ledger as default_ledger,
+)
+
+
+def usage_from_result(response) -> Dict[str, int]:
+    """{input_tokens, output_tokens, total_tokens} from an LLMResult (zeros if absent)."""
+    for generations in response.generations or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {
+                    "input_tokens": usage.get("input_tokens", 0),
+                    "output_tokens": usage.get("output_tokens", 0),
+                    "total_tokens": usage.get("total_tokens", 0),
+                }
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return {
+        "input_tokens": token_usage.get("prompt_tokens", 0),
+        "output_tokens": token_usage.get("completion_tokens", 0),
+        "total_tokens": token_usage.get("total_tokens", 0),
+    }
+
+
+def _prompt_chars(messages) -> int:
+    chars = 0
+    for batch in messages or []:
+        for message in batch:
+            content = getattr(message, "content", message)
+            if isinstance(content, str):
+                chars += len(content)
+            elif isinstance(content, list):
+                chars += sum(len(part.get("text", "")) if isinstance(part, dict) else len(str(part)) for part in content)
+    return chars
+
+
+class UsageCallback(BaseCallbackHandler):
+    """
+    Counts tokens and call outcomes for one model. The endpoint/session
+    context and prompt template are captured when the call starts (on the
+    calling thread) and attached to the usage when it ends.
+    """
+
+    def __init__(self, model: str, ledger=None):
+        self.model = model
+        self.ledger = ledger or default_ledger
+        self._pending: Dict[UUID, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: Optional[UUID], metadata: Optional[Dict[str, Any]], chars: int):
+        context = current_context()
+        call = {
+            "template": (metadata or {}).get("prompt_template") or UNKNOWN,
+            "endpoint": context.get("endpoint"),
+            "session": context.get("session"),
+            "prompt_chars": chars,
+        }
+        self.ledger.check_prompt(estimate_tokens(chars), call["template"], call["endpoint"] or UNKNOWN)
+        if run_id is not None:
+            with self._lock:
+                self._pending[run_id] = call
+
+    def _finish(self, run_id: Optional[UUID]) -> Dict[str, Any]:
+        with self._lock:
+            call = self._pending.pop(run_id, None) if run_id is not None else None
+        if call is None:  # no start event seen: attribute to the current context
+            context = current_context()
+            call = {"template": UNKNOWN, "endpoint": context.get("endpoint"),
+                    "session": context.get("session"), "prompt_chars": 0}
+        return call
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID = None,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._start(run_id, metadata, _prompt_chars(messages))
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID = None,
+                     metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._start(run_id, metadata, sum(len(p) for p in prompts or []))
+
+    def on_llm_end(self, response, *, run_id: UUID = None, **kwargs: Any) -> None:
+        usage = usage_from_result(response)
+        record_llm_tokens(self.model, usage["input_tokens"], usage["output_tokens"])
+        call = self._finish(run_id)
+        self.ledger.record(self.model, usage["input_tokens"], usage["output_tokens"], **call)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID = None, **kwargs: Any) -> None:
+        LLM_CALLS.inc(model=self.model, outcome="error")
+        call = self._finish(run_id)
+        self.ledger.record_error(classify_llm_error(error), call["template"], call["endpoint"], call["session"])
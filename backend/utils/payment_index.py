@@ -0,0 +1,179 @@
+"""
+backend/utils/payment_index.py
+------------------------------
+Stripe payment intent → payment record lookup for the payments table.
+
+Payment records are keyed by our own `payment_intent_id`, but
+payment_intent.payment_failed webhooks only carry Stripe's intent id.
+Every write that knows the Stripe intent also writes a small pointer item
+(`payment_intent_id = "stripe#<pi_…>"`, `target_id = <our id>`) in the same
+table, so resolving a Stripe intent is a keyed read instead of a table
+scan. Checkout sessions also stamp our id into the intent's metadata, which
+lets most webhooks skip the pointer entirely.
+
+Records written before pointers existed have no pointer. Lookups never
+scan for them by default, because a full-table scan per webhook doesn't
+scale. Run the one-off backfill after upgrading instead:
+
+    python -m backend.utils.payment_index            # add --dry-run to only count
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+STRIPE_POINTER_PREFIX = "stripe#"
+POINTER_RECORD_TYPE = "stripe_pointer"
+BACKFILL_PAGE_ITEMS = 1000
+
+logger = logging.getLogger("payment-index")
+
+
+def stripe_pointer_key(stripe_payment_intent: str) -> str:
+    return f"{STRIPE_POINTER_PREFIX}{stripe_payment_intent}"
+
+
+def is_pointer(item: Dict[str, Any]) -> bool:
+    return str(item.get("payment_intent_id", "")).startswith(STRIPE_POINTER_PREFIX)
+
+
+def pointer_item(payment_intent_id: str, stripe_payment_intent: str) -> Dict[str, Any]:
+    return {
+        "payment_intent_id": stripe_pointer_key(stripe_payment_intent),
+        "record_type": POINTER_RECORD_TYPE,
+        "target_id": payment_intent_id,
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+
+
+def link_stripe_intent(table, payment_intent_id: str, stripe_payment_intent: str):
+    """Write (or refresh) the Stripe intent → payment_intent_id pointer."""
+    table.put_item(Item=pointer_item(payment_intent_id, stripe_payment_intent))
+
+
+def put_payment(table, record: Dict[str, Any], **put_kwargs):
+    """
+    put_item for a payment record, keeping its Stripe pointer in step.
+    put_kwargs (e.g. ConditionExpression) apply to the record write only.
+    """
+    table.put_item(Item=record, **put_kwargs)
+    stripe_payment_intent = record.get("stripe_payment_intent")
+    if stripe_payment_intent:
+        link_stripe_intent(table, record["payment_intent_id"], stripe_payment_intent)
+
+
+def _get(table, key: str) -> Optional[Dict[str, Any]]:
+    return table.get_item(Key={"payment_intent_id": key}).get("Item")
+
+
+def _scan_for_intent(table, stripe_payment_intent: str) -> Optional[str]:
+    """Legacy fallback: walk every scan page (not just the first) for the record id."""
+    kwargs = {
+        "FilterExpression": "stripe_payment_intent = :intent_id",
+        "ExpressionAttributeValues": {":intent_id": stripe_payment_intent},
+        "ProjectionExpression": "payment_intent_id",
+    }
+    while True:
+        response = table.scan(**kwargs)
+        for item in response.get("Items", []):
+            if not is_pointer(item):
+                return item["payment_intent_id"]
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return None
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def find_by_stripe_intent(
+    table,
+    stripe_payment_intent: str,
+    payment_intent_id: Optional[str] = None,
+    scan_fallback: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """
+    Payment record for a Stripe payment intent.
+
+    payment_intent_id is our id when the caller already has it (the intent's
+    metadata); that is one keyed read. Otherwise the pointer is read, then
+    the record. Only with scan_fallback (off by default, and never on the
+    webhook path) are records without a pointer found by a full paginated
+    scan, after which their pointer is backfilled.
+    """
+    if payment_intent_id:
+        record = _get(table, payment_intent_id)
+        if record:
+            return record
+
+    pointer = _get(table, stripe_pointer_key(stripe_payment_intent))
+    if pointer:
+        return _get(table, pointer["target_id"])
+
+    if not scan_fallback:
+        return None
+    target_id = _scan_for_intent(table, stripe_payment_intent)
+    if target_id is None:
+        return None
+    logger.warning(f"Backfilling Stripe pointer for {stripe_payment_intent} → {target_id}")
+    link_stripe_intent(table, target_id, stripe_payment_intent)
+    return _get(table, target_id)
+
+
+def backfill_pointers(table, dry_run: bool = False, page_size: int = BACKFILL_PAGE_ITEMS) -> Dict[str, int]:
+    """
+    One-off migration: walk the table once and write the Stripe pointer for
+    every record that has a Stripe intent but no (or a stale) pointer.
+    """
+    counts = {"scanned": 0, "with_intent": 0, "backfilled": 0}
+    kwargs = {"Limit": page_size}
+    while True:
+        response = table.scan(**kwargs)
+        for item in response.get("Items", []):
+            if is_pointer(item):
+                continue
+            counts["scanned"] += 1
+            stripe_payment_intent = item.get("stripe_payment_intent")
+            if not stripe_payment_intent:
+                continue
+            counts["with_intent"] += 1
+            pointer = _get(table, stripe_pointer_key(stripe_payment_intent))
+            if pointer and pointer.get("target_id") == item["payment_intent_id"]:
+                continue
+            counts["backfilled"] += 1
+            if not dry_run:
+                link_stripe_intent(table, item["payment_intent_id"], stripe_payment_intent)
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return counts
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill Stripe intent pointers for legacy payment records.")
+    parser.add_argument("--dry-run", action="store_true", help="Count missing pointers without writing them")
+    parser.add_argument("--page-size", type=int, default=BACKFILL_PAGE_ITEMS, help="Items per scan page")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    from backend.utils.payment_repository import create_payment_repository
+
+    repository = create_payment_repository()
+    if repository is None:
+        sys.exit("❌ No payment storage configured (set DDB_ENDPOINT or PAYMENTS_BACKEND)")
+
+    start = time.perf_counter()
+    counts = backfill_pointers(repository.table, dry_run=args.dry_run, page_size=max(1, args.page_size))
+    summary = ", ".join(f"{k}={v}" for k, v in counts.items())
+    print(f"✅ Pointer backfill{' (dry run)' if args.dry_run else ''} in {time.perf_counter() - start:.1f}s: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+backend/utils/payment_reconciler.py
+-----------------------------------
+Batch reconciliation of payments stuck in `pending`.
+
+A payment stays pending forever if its webhook was missed or the process
+died between /payment-intent and /stripe-checkout. This job streams
+pending records page by page, asks Stripe about each checkout session
+concurrently (bounded by a token-bucket rate limit), and writes each
+resulting status change back with a versioned (optimistic) write:
+
+  session complete + paid   -> completed (Stripe intent recorded)
+  session expired           -> expired, kept PAYMENT_RECORD_TTL_DAYS
+  no session, older than    -> abandoned, kept PAYMENT_RECORD_TTL_DAYS
+    PENDING_ABANDON_HOURS
+  session still open        -> left alone
+
+Expired and abandoned records get an `expires_at` TTL instead of being
+deleted one by one; DynamoDB's TTL removes them (enable it once with
+--enable-ttl), and the SQLite/in-memory backends purge them at the end of
+each run. A record changed since it was scanned (a webhook, or
+/stripe-checkout storing a session id) fails the version check and is
+skipped as a conflict; the next run sees its new state.
+
+Usage:
+    python -m backend.utils.payment_reconciler
+    python -m backend.utils.payment_reconciler --dry-run --rate 10
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.utils.payment_repository import TTL_ATTRIBUTE, PaymentRepository, create_payment_repository
+
+RECONCILE_PAGE_SIZE = int(os.getenv("RECONCILE_PAGE_SIZE", "200"))
+RECONCILE_CONCURRENCY = int(os.getenv("RECONCILE_CONCURRENCY", "8"))
+STRIPE_RATE_LIMIT = float(os.getenv("STRIPE_RATE_LIMIT", "20"))  # requests/sec (test mode allows 25)
+PENDING_ABANDON_HOURS = float(os.getenv("PENDING_ABANDON_HOURS", "24"))
+PAYMENT_RECORD_TTL_DAYS = float(os.getenv("PAYMENT_RECORD_TTL_DAYS", "30"))
+
+
+class RateLimiter:
+    """Async token bucket: at most `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = max(rate, 0.001)
+        self.capacity = float(burst or max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class StripeSessions:
+    """The one Stripe call the reconciler needs (swap for a stub in tests)."""
+
+    def retrieve(self, session_id: str) -> Dict[str, Any]:
+        import stripe
+
+        session = stripe.checkout.Session.retrieve(session_id)
+        return {
+            "status": session.status,
+            "payment_status": session.payment_status,
+            "payment_intent": session.payment_intent,
+        }
+
+
+def _age_hours(record: Dict[str, Any], now: datetime) -> float:
+    try:
+        return (now - datetime.fromisoformat(record["created_at"])).total_seconds() / 3600
+    except (KeyError, TypeError, ValueError):
+        return float("inf")  # no usable timestamp: treat as old
+
+
+def resolve_status(record: Dict[str, Any], session: Optional[Dict[str, Any]], now: datetime) -> Optional[Dict[str, Any]]:
+    """Fields to write for one pending record given its Stripe session (None = no change)."""
+    ttl = {TTL_ATTRIBUTE: int(time.time() + PAYMENT_RECORD_TTL_DAYS * 86400)}
+    if session is None:
+        if _age_hours(record, now) >= PENDING_ABANDON_HOURS:
+            return {"payment_status": "abandoned", **ttl}
+        return None
+    if session.get("status") == "complete" and session.get("payment_status") in ("paid", "no_payment_required"):
+        fields = {"payment_status": "completed"}
+        if session.get("payment_intent"):
+            fields["stripe_payment_intent"] = session["payment_intent"]
+        return fields
+    if session.get("status") == "expired":
+        return {"payment_status": "expired", **ttl}
+    return None
+
+
+async def reconcile(
+    repository: PaymentRepository,
+    stripe_sessions=None,
+    page_size: int = RECONCILE_PAGE_SIZE,
+    concurrency: int = RECONCILE_CONCURRENCY,
+    rate: float = STRIPE_RATE_LIMIT,
+    dry_run: bool = False,
+    on_update: Optional[Callable[[str, str], None]] = None,
+) -> Dict[str, int]:
+    """
+    Reconcile every pending payment once. Returns counters; on_update(id,
+    status) is called for each written change (e.g. to publish it).
+    """
+    stripe_sessions = stripe_sessions or StripeSessions()
+    limiter = RateLimiter(rate)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    counts = {"scanned": 0, "stripe_calls": 0, "unchanged": 0, "errors": 0, "written": 0, "conflicts": 0, "purged": 0}
+
+    async def check(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        session = None
+        session_id = record.get("stripe_session_id")
+        if session_id:
+            async with semaphore:
+                await limiter.acquire()
+                counts["stripe_calls"] += 1
+                try:
+                    session = await asyncio.to_thread(stripe_sessions.retrieve, session_id)
+                except Exception as e:
+                    print(f"⚠ Stripe lookup failed for {record['payment_intent_id']} ({session_id}): {e}")
+                    counts["errors"] += 1
+                    return None
+        fields = resolve_status(record, session, datetime.utcnow())
+        if not fields:
+            counts["unchanged"] += 1
+            return None
+        now = datetime.utcnow().isoformat()
+        return {
+            **record,
+            **fields,
+            "updated_at": now,
+            "reconciled_at": now,
+            "version": (record.get("version") or 0) + 1,
+        }
+
+    async def write(record: Dict[str, Any], expected_version: Optional[int]):
+        if not await repository.put_versioned(record, expected_version):
+            print(f"ℹ Skipping {record['payment_intent_id']}: changed since it was scanned")
+            counts["conflicts"] += 1
+            return
+        counts["written"] += 1
+        if on_update:
+            on_update(record["payment_intent_id"], record["payment_status"])
+
+    # Pages are written as they are checked; the scan resumes by key, so
+    # rewriting records already passed doesn't disturb it.
+    async for page in repository.iter_by_status("pending", page_size):
+        counts["scanned"] += len(page)
+        results = await asyncio.gather(*(check(record) for record in page))
+        changes = [(r, record.get("version")) for r, record in zip(results, page) if r]
+        for record, _ in changes:
+            counts[record["payment_status"]] = counts.get(record["payment_status"], 0) + 1
+        if dry_run or not changes:
+            continue
+        await asyncio.gather(*(write(record, expected) for record, expected in changes))
+
+    if not dry_run:
+        counts["purged"] = await repository.purge_expired()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile pending payments against Stripe.")
+    parser.add_argument("--page-size", type=int, default=RECONCILE_PAGE_SIZE, help="Records per scan page / batch")
+    parser.add_argument("--concurrency", type=int, default=RECONCILE_CONCURRENCY, help="Parallel Stripe lookups")
+    parser.add_argument("--rate", type=float, default=STRIPE_RATE_LIMIT, help="Max Stripe requests per second")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them")
+    parser.add_argument("--enable-ttl", action="store_true", help="Enable DynamoDB TTL on expires_at first")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    import stripe
+
+    stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+    repository = create_payment_repository()
+    if repository is None:
+        sys.exit("❌ No payment storage configured (set DDB_ENDPOINT or PAYMENTS_BACKEND)")
+    if args.enable_ttl and hasattr(repository.table, "enable_ttl"):
+        repository.table.enable_ttl()
+        print(f"✓ TTL enabled on {TTL_ATTRIBUTE}")
+
+    start = time.perf_counter()
+    counts = asyncio.run(reconcile(
+        repository, page_size=max(1, args.page_size), concurrency=args.concurrency,
+        rate=args.rate, dry_run=args.dry_run,
+    ))
+    summary = ", ".join(f"{k}={v}" for k, v in counts.items())
+    print(f"✅ Reconciled in {time.perf_counter() - start:.1f}s: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,622 @@
+"""
+backend/utils/payment_repository.py
+-----------------------------------
+Async persistence for payment records with swappable backends.
+
+PaymentRepository is the only thing the API talks to. Its methods are
+async; the blocking storage calls run on a bounded thread pool so a slow
+DynamoDB request never stalls the event loop, and every call is timed
+into a per-operation latency histogram.
+
+Backends all expose the subset of boto3's `Table` API the payment code
+uses (get_item / put_item / update_item / delete_item / scan with a single
+equality filter, plus batch_put), so payment_index and the repository
+behave identically on each of them:
+
+  dynamodb  one pooled, thread-safe botocore client (DDB_ENDPOINT for local)
+  sqlite    JSON rows in PAYMENTS_DB_PATH, for single-node deployments
+  memory    a dict, for tests and demos
+
+Selected with PAYMENTS_BACKEND; defaults to dynamodb when DDB_ENDPOINT is
+set and to no persistence otherwise (payments still work, as before).
+"""
+
+import asyncio
+import bisect
+import copy
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.utils.payment_index import find_by_stripe_intent, link_stripe_intent, pointer_item, put_payment
+
+PAYMENTS_BACKEND = os.getenv("PAYMENTS_BACKEND", "dynamodb" if os.getenv("DDB_ENDPOINT") else "none").lower()
+PAYMENTS_DB_PATH = os.getenv("PAYMENTS_DB_PATH", "data/payments.db")
+PAYMENTS_IO_WORKERS = int(os.getenv("PAYMENTS_IO_WORKERS", "8"))
+PAYMENTS_TIMEOUT_SECONDS = float(os.getenv("PAYMENTS_TIMEOUT_SECONDS", "5"))
+
+KEY = "payment_intent_id"
+SCAN_PAGE_ITEMS = 1000
+TTL_ATTRIBUTE = "expires_at"   # epoch seconds; DynamoDB TTL attribute
+BATCH_WRITE_ITEMS = 25         # DynamoDB BatchWriteItem limit
+BATCH_WRITE_RETRIES = 6
+VERSIONED_UPDATE_RETRIES = 5   # update(): re-reads after losing the version race
+
+# Latency histogram bucket upper bounds, in milliseconds.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+# ---------------------------------------------------------------------------- #
+# Latency histograms
+# ---------------------------------------------------------------------------- #
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (ms) with percentile estimates."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th percentile (max for +Inf)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return float(self.buckets[i]) if i < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            labels = [f"le_{b}" for b in self.buckets] + ["le_inf"]
+            return {
+                "count": self.count,
+                "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+                "max_ms": round(self.max_ms, 3),
+                "p50_ms": self.percentile(0.5),
+                "p95_ms": self.percentile(0.95),
+                "p99_ms": self.percentile(0.99),
+                "buckets": dict(zip(labels, self.counts)),
+            }
+
+
+# ---------------------------------------------------------------------------- #
+# Backends: boto3 Table-compatible
+# ---------------------------------------------------------------------------- #
+class ConditionalCheckFailed(Exception):
+    """A conditional write lost (DynamoDB's ConditionalCheckFailedException)."""
+
+
+_SET_RE = re.compile(r"^\s*SET\s+(.+)$", re.IGNORECASE | re.DOTALL)
+_EQ_RE = re.compile(r"^\s*(#?\w+)\s*=\s*(:\w+)\s*$")
+_NOT_EXISTS_RE = re.compile(r"^\s*attribute_not_exists\(\s*(#?\w+)\s*\)\s*$", re.IGNORECASE)
+_OR_RE = re.compile(r"\s+OR\s+", re.IGNORECASE)
+
+
+def _name(token: str, names: Optional[Dict[str, str]]) -> str:
+    return (names or {}).get(token, token) if token.startswith("#") else token
+
+
+def _parse_set(expression: str, names, values) -> Dict[str, Any]:
+    """'SET a = :a, #b = :b' -> {"a": ..., "b": ...} (the only update form we use)."""
+    match = _SET_RE.match(expression)
+    if not match:
+        raise ValueError(f"Unsupported UpdateExpression: {expression}")
+    fields = {}
+    for clause in match.group(1).split(","):
+        eq = _EQ_RE.match(clause)
+        if not eq:
+            raise ValueError(f"Unsupported UpdateExpression clause: {clause}")
+        fields[_name(eq.group(1), names)] = values[eq.group(2)]
+    return fields
+
+
+def _parse_filter(expression: Optional[str], names, values) -> Optional[Tuple[str, Any]]:
+    if not expression:
+        return None
+    eq = _EQ_RE.match(expression)
+    if not eq:
+        raise ValueError(f"Unsupported FilterExpression: {expression}")
+    return _name(eq.group(1), names), values[eq.group(2)]
+
+
+def _condition_holds(item: Optional[Dict[str, Any]], expression: str, names, values) -> bool:
+    """'attribute_not_exists(a) OR #b = :b' style conditions (OR of simple clauses)."""
+    item = item or {}
+    for clause in _OR_RE.split(expression.strip()):
+        not_exists = _NOT_EXISTS_RE.match(clause)
+        if not_exists:
+            if _name(not_exists.group(1), names) not in item:
+                return True
+            continue
+        eq = _EQ_RE.match(clause)
+        if not eq:
+            raise ValueError(f"Unsupported ConditionExpression clause: {clause}")
+        name = _name(eq.group(1), names)
+        if name in item and item[name] == values[eq.group(2)]:
+            return True
+    return False
+
+
+def _project(item: Dict[str, Any], projection: Optional[str], names) -> Dict[str, Any]:
+    if not projection:
+        return item
+    wanted = [_name(p.strip(), names) for p in projection.split(",")]
+    return {k: item[k] for k in wanted if k in item}
+
+
+class LocalTable:
+    """
+    Table semantics shared by the SQLite and in-memory backends. Subclasses
+    provide _load / _store / _remove / _page (keys in ascending order).
+    """
+
+    def get_item(self, Key: Dict[str, Any], **_) -> Dict[str, Any]:
+        item = self._load(Key[KEY])
+        return {"Item": item} if item is not None else {}
+
+    def put_item(self, Item: Dict[str, Any], ConditionExpression: Optional[str] = None,
+                 ExpressionAttributeNames=None, ExpressionAttributeValues=None, **_) -> Dict[str, Any]:
+        with self._lock:
+            if ConditionExpression and not _condition_holds(
+                self._load(Item[KEY]), ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues
+            ):
+                raise ConditionalCheckFailed(Item[KEY])
+            self._store(copy.deepcopy(Item))
+        return {}
+
+    def delete_item(self, Key: Dict[str, Any], **_) -> Dict[str, Any]:
+        self._remove(Key[KEY])
+        return {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues,
+                    ExpressionAttributeNames=None, ConditionExpression: Optional[str] = None,
+                    **_) -> Dict[str, Any]:
+        fields = _parse_set(UpdateExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+        with self._lock:
+            current = self._load(Key[KEY])
+            if ConditionExpression and not _condition_holds(
+                current, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues
+            ):
+                raise ConditionalCheckFailed(Key[KEY])
+            # Like DynamoDB, updating a missing key creates the item.
+            item = current or {KEY: Key[KEY]}
+            item.update(copy.deepcopy(fields))
+            self._store(item)
+        return {}
+
+    def batch_put(self, items: List[Dict[str, Any]]) -> int:
+        """Unconditional bulk write (DynamoDB BatchWriteItem semantics)."""
+        with self._lock:
+            for item in items:
+                self._store(copy.deepcopy(item))
+        return len(items)
+
+    def scan(self, FilterExpression=None, ExpressionAttributeValues=None, ExpressionAttributeNames=None,
+             ProjectionExpression=None, ExclusiveStartKey=None, Limit=SCAN_PAGE_ITEMS, **_) -> Dict[str, Any]:
+        condition = _parse_filter(FilterExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+        after = ExclusiveStartKey[KEY] if ExclusiveStartKey else None
+        page = self._page(after, Limit)
+        items = [
+            _project(item, ProjectionExpression, ExpressionAttributeNames)
+            for item in page
+            if condition is None or item.get(condition[0]) == condition[1]
+        ]
+        response = {"Items": items, "Count": len(items), "ScannedCount": len(page)}
+        if len(page) == Limit:
+            response["LastEvaluatedKey"] = {KEY: page[-1][KEY]}
+        return response
+
+
+class MemoryTable(LocalTable):
+    def __init__(self):
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def _load(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            return copy.deepcopy(item) if item is not None else None
+
+    def _store(self, item):
+        with self._lock:
+            self._items[item[KEY]] = item
+
+    def _remove(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """Drop items whose `expires_at` (epoch seconds) has passed, like DynamoDB TTL."""
+        now = now if now is not None else time.time()
+        with self._lock:
+            expired = [k for k, v in self._items.items() if v.get(TTL_ATTRIBUTE, float("inf")) <= now]
+            for key in expired:
+                del self._items[key]
+        return len(expired)
+
+    def _page(self, after, limit) -> List[Dict[str, Any]]:
+        with self._lock:
+            keys = sorted(self._items)
+            start = bisect.bisect_right(keys, after) if after is not None else 0
+            return [copy.deepcopy(self._items[k]) for k in keys[start:start + limit]]
+
+
+class SQLiteTable(LocalTable):
+    def __init__(self, db_path: str = PAYMENTS_DB_PATH):
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS payments (payment_intent_id TEXT PRIMARY KEY, item TEXT NOT NULL)"
+        )
+
+    def _load(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT item FROM payments WHERE payment_intent_id = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _store(self, item):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO payments (payment_intent_id, item) VALUES (?, ?)",
+                (item[KEY], json.dumps(item, default=str)),
+            )
+
+    def _remove(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM payments WHERE payment_intent_id = ?", (key,))
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """Drop items whose `expires_at` (epoch seconds) has passed, like DynamoDB TTL."""
+        with self._lock:
+            cur = self._db.execute(
+                "DELETE FROM payments WHERE json_extract(item, '$.expires_at') <= ?",
+                (now if now is not None else time.time(),),
+            )
+        return cur.rowcount
+
+    def _page(self, after, limit) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT item FROM payments WHERE payment_intent_id > ? ORDER BY payment_intent_id LIMIT ?",
+                (after if after is not None else "", limit),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+
+def _to_dynamo(value):
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {k: _to_dynamo(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_dynamo(v) for v in value]
+    return value
+
+
+def _from_dynamo(value):
+    # Decimal -> int/float so every backend returns plain JSON types.
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {k: _from_dynamo(v) for k, v in value.items()}
+    if isinstance(value, (list, set)):
+        return [_from_dynamo(v) for v in value]
+    return value
+
+
+class DynamoTable:
+    """
+    boto3 Table-style wrapper over one low-level client. Clients are
+    thread-safe (resources are not) and keep a pool of max_pool_connections
+    HTTP connections, sized to the repository's worker threads.
+    """
+
+    def __init__(self, table_name: str, region: str, endpoint_url: Optional[str] = None,
+                 pool_size: int = PAYMENTS_IO_WORKERS, timeout: float = PAYMENTS_TIMEOUT_SECONDS):
+        self.table_name = table_name
+        self._settings = (region, endpoint_url, pool_size, timeout)
+        self._client_obj = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def _client(self):
+        # boto3 costs ~0.3s to import; pay it on the first storage call, not at API import.
+        if self._client_obj is None:
+            with self._client_lock:
+                if self._client_obj is None:
+                    import boto3
+                    from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+                    from botocore.config import Config
+
+                    region, endpoint_url, pool_size, timeout = self._settings
+                    self._ser = TypeSerializer()
+                    self._de = TypeDeserializer()
+                    self._client_obj = boto3.client(
+                        "dynamodb",
+                        region_name=region,
+                        endpoint_url=endpoint_url,
+                        config=Config(
+                            max_pool_connections=pool_size,
+                            connect_timeout=timeout,
+                            read_timeout=timeout,
+                            retries={"max_attempts": 3, "mode": "adaptive"},
+                        ),
+                    )
+        return self._client_obj
+
+    def _dump(self, obj: Optional[Dict[str, Any]]):
+        self._client  # serializers are created with the client
+        return {k: self._ser.serialize(_to_dynamo(v)) for k, v in obj.items()} if obj else obj
+
+    def _load(self, obj: Optional[Dict[str, Any]]):
+        return _from_dynamo({k: self._de.deserialize(v) for k, v in obj.items()}) if obj else obj
+
+    def _call(self, op: str, **kwargs) -> Dict[str, Any]:
+        for field in ("Key", "Item", "ExpressionAttributeValues", "ExclusiveStartKey"):
+            if field in kwargs:
+                kwargs[field] = self._dump(kwargs[field])
+        try:
+            response = getattr(self._client, op)(TableName=self.table_name, **kwargs)
+        except self._client.exceptions.ConditionalCheckFailedException as e:
+            raise ConditionalCheckFailed(str(e)) from e
+        for field in ("Item", "Attributes", "LastEvaluatedKey"):
+            if field in response:
+                response[field] = self._load(response[field])
+        if "Items" in response:
+            response["Items"] = [self._load(i) for i in response["Items"]]
+        return response
+
+    def load(self):
+        self._client.describe_table(TableName=self.table_name)
+
+    def enable_ttl(self, attribute: str = None):
+        """Turn on DynamoDB TTL for `expires_at` (one-off table setup)."""
+        self._client.update_time_to_live(
+            TableName=self.table_name,
+            TimeToLiveSpecification={"Enabled": True, "AttributeName": attribute or TTL_ATTRIBUTE},
+        )
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        return 0  # DynamoDB TTL deletes expired items itself
+
+    def batch_put(self, items: List[Dict[str, Any]]) -> int:
+        """BatchWriteItem in chunks of 25, retrying unprocessed items with backoff."""
+        for start in range(0, len(items), BATCH_WRITE_ITEMS):
+            requests = [{"PutRequest": {"Item": self._dump(item)}} for item in items[start:start + BATCH_WRITE_ITEMS]]
+            pending = {self.table_name: requests}
+            for attempt in range(BATCH_WRITE_RETRIES):
+                response = self._client.batch_write_item(RequestItems=pending)
+                pending = response.get("UnprocessedItems") or {}
+                if not pending:
+                    break
+                time.sleep(min(2.0, 0.05 * 2 ** attempt))
+            if pending:
+                raise RuntimeError(f"{len(pending[self.table_name])} items unprocessed after {BATCH_WRITE_RETRIES} retries")
+        return len(items)
+
+    def get_item(self, **kwargs):
+        return self._call("get_item", **kwargs)
+
+    def put_item(self, **kwargs):
+        return self._call("put_item", **kwargs)
+
+    def update_item(self, **kwargs):
+        return self._call("update_item", **kwargs)
+
+    def delete_item(self, **kwargs):
+        return self._call("delete_item", **kwargs)
+
+    def scan(self, **kwargs):
+        return self._call("scan", **kwargs)
+
+
+# ---------------------------------------------------------------------------- #
+# Repository
+# ---------------------------------------------------------------------------- #
+class PaymentRepository:
+    """Async payment store over a Table-compatible backend."""
+
+    def __init__(self, table, backend: str, workers: int = PAYMENTS_IO_WORKERS):
+        self.table = table
+        self.backend = backend
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="payments-io")
+        self._latency: Dict[str, LatencyHistogram] = {}
+
+    async def _run(self, op: str, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+        finally:
+            self._latency.setdefault(op, LatencyHistogram()).observe((time.perf_counter() - start) * 1000)
+
+    async def get(self, payment_intent_id: str) -> Optional[Dict[str, Any]]:
+        response = await self._run("get", self.table.get_item, Key={KEY: payment_intent_id})
+        return response.get("Item")
+
+    async def put(self, record: Dict[str, Any]):
+        """Write a record (and its Stripe pointer, if it has a Stripe intent)."""
+        await self._run("put", put_payment, self.table, record)
+
+    async def put_versioned(self, record: Dict[str, Any], expected_version: Optional[int]) -> bool:
+        """
+        Optimistic write: store `record` only if the stored version still
+        equals expected_version (None = record has no version yet). Returns
+        False when another writer got there first; re-read and retry.
+        """
+        kwargs = {"ExpressionAttributeNames": {"#v": "version"}}
+        if expected_version is None:
+            kwargs["ConditionExpression"] = "attribute_not_exists(#v)"
+        else:
+            kwargs["ConditionExpression"] = "#v = :expected"
+            kwargs["ExpressionAttributeValues"] = {":expected": expected_version}
+        try:
+            await self._run("put_versioned", put_payment, self.table, record, **kwargs)
+        except ConditionalCheckFailed:
+            return False
+        return True
+
+    async def update(self, payment_intent_id: str, fields: Dict[str, Any]):
+        """
+        Set `fields` on a record and bump its version, conditional on the
+        version just read. A put_versioned() racing this (a webhook holding
+        the older copy) then fails and re-reads instead of silently
+        overwriting `fields`.
+        """
+        names = {f"#f{i}": name for i, name in enumerate(fields)}
+        names["#v"] = "version"
+        assignments = ", ".join(f"#f{i} = :v{i}" for i in range(len(fields)))
+        for _ in range(VERSIONED_UPDATE_RETRIES):
+            current = await self.get(payment_intent_id)
+            expected = (current or {}).get("version")
+            values = {f":v{i}": value for i, value in enumerate(fields.values())}
+            values[":next"] = (expected or 0) + 1
+            if expected is None:
+                condition = "attribute_not_exists(#v)"
+            else:
+                condition = "#v = :expected"
+                values[":expected"] = expected
+            try:
+                await self._run(
+                    "update",
+                    self.table.update_item,
+                    Key={KEY: payment_intent_id},
+                    UpdateExpression=f"SET {assignments}, #v = :next",
+                    ConditionExpression=condition,
+                    ExpressionAttributeNames=names,
+                    ExpressionAttributeValues=values,
+                )
+                return
+            except ConditionalCheckFailed:
+                continue
+        raise RuntimeError(f"Gave up updating {payment_intent_id} after {VERSIONED_UPDATE_RETRIES} conflicting writes")
+
+    async def delete(self, payment_intent_id: str):
+        await self._run("delete", self.table.delete_item, Key={KEY: payment_intent_id})
+
+    async def link_stripe_intent(self, payment_intent_id: str, stripe_payment_intent: str):
+        await self._run("link", link_stripe_intent, self.table, payment_intent_id, stripe_payment_intent)
+
+    async def find_by_stripe_intent(self, stripe_payment_intent: str,
+                                    payment_intent_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Keyed lookup (metadata id, else the Stripe pointer); never scans.
+        Legacy records without a pointer need `python -m backend.utils.payment_index` once.
+        """
+        return await self._run(
+            "find_by_stripe_intent", find_by_stripe_intent, self.table, stripe_payment_intent, payment_intent_id
+        )
+
+    async def iter_by_status(self, status: str, page_size: int = SCAN_PAGE_ITEMS):
+        """Async generator of record pages with payment_status == status (paginated scan)."""
+        kwargs = {
+            "FilterExpression": "#s = :s",
+            "ExpressionAttributeNames": {"#s": "payment_status"},
+            "ExpressionAttributeValues": {":s": status},
+            "Limit": page_size,
+        }
+        while True:
+            response = await self._run("scan", self.table.scan, **kwargs)
+            if response.get("Items"):
+                yield response["Items"]
+            last_key = response.get("LastEvaluatedKey")
+            if not last_key:
+                return
+            kwargs["ExclusiveStartKey"] = last_key
+
+    async def batch_put(self, records: List[Dict[str, Any]]) -> int:
+        """Bulk write records (unconditional) plus their Stripe pointers."""
+        items = list(records)
+        items += [
+            pointer_item(r[KEY], r["stripe_payment_intent"]) for r in records if r.get("stripe_payment_intent")
+        ]
+        return await self._run("batch_put", self.table.batch_put, items)
+
+    async def purge_expired(self) -> int:
+        return await self._run("purge_expired", self.table.purge_expired)
+
+    def latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {op: hist.snapshot() for op, hist in sorted(self._latency.items())}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def probe_table(table) -> bool:
+    """Check a DynamoDB table is reachable; warns (never raises) if it isn't."""
+    try:
+        table.load()
+        print(f"✓ DynamoDB table '{table.table_name}' initialized successfully")
+        return True
+    except Exception as load_error:
+        print(f"⚠ Warning: DynamoDB table '{table.table_name}' does not exist or cannot be accessed: {load_error}")
+        print("  Table will be created on first write, or you may need to create it manually.")
+        return False
+
+
+def create_payment_repository(
+    backend: str = PAYMENTS_BACKEND,
+    table_name: Optional[str] = None,
+    region: Optional[str] = None,
+    endpoint_url: Optional[str] = None,
+    probe: bool = True,
+) -> Optional[PaymentRepository]:
+    """
+    Repository for the configured backend, or None when persistence is
+    off/unavailable. probe=False skips the DynamoDB describe_table check
+    (and the boto3 import) so callers can run it later with probe_table().
+    """
+    if backend in ("", "none", "off"):
+        print("ℹ Payment storage disabled (PAYMENTS_BACKEND=none). Payment will work without database storage.")
+        print("  Set DDB_ENDPOINT or PAYMENTS_BACKEND=sqlite|memory to store payment records.")
+        return None
+
+    if backend == "memory":
+        print("✓ Payment storage: in-memory (records are lost on restart)")
+        return PaymentRepository(MemoryTable(), backend)
+
+    if backend == "sqlite":
+        print(f"✓ Payment storage: SQLite ({PAYMENTS_DB_PATH})")
+        return PaymentRepository(SQLiteTable(PAYMENTS_DB_PATH), backend)
+
+    if backend == "dynamodb":
+        table_name = table_name or os.getenv("DYNAMODB_PAYMENTS_TABLE", "lea-payments-local")
+        try:
+            table = DynamoTable(
+                table_name,
+                region=region or os.getenv("AWS_REGION", "ap-southeast-1"),
+                endpoint_url=endpoint_url or os.getenv("DDB_ENDPOINT"),
+            )
+        except Exception as e:
+            print(f"⚠ DynamoDB initialization failed: {e}")
+            print("  Payment will work without database storage. This is fine for testing.")
+            return None
+        if probe:
+            probe_table(table)
+        return PaymentRepository(table, backend)
+
+    raise ValueError(f"Unknown PAYMENTS_BACKEND: {backend} (expected dynamodb, sqlite, memory or none)")
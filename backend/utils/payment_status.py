@@ -0,0 +1,125 @@
+"""
+backend/utils/payment_status.py
+-------------------------------
+Push channel for payment status changes.
+
+The webhook consumer publishes every status it writes; clients wait on
+that instead of polling the store or Stripe. A short-TTL in-memory cache
+sits in front of PaymentRepository, so repeated status reads within
+PAYMENT_STATUS_TTL_SECONDS never touch the database.
+
+Waiters are woken by publish() in this process. With several API workers
+a waiter re-reads the (cached) store every PAYMENT_STATUS_RECHECK_SECONDS,
+so changes applied by another worker still arrive, just less promptly.
+"""
+
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+PAYMENT_STATUS_TTL_SECONDS = float(os.getenv("PAYMENT_STATUS_TTL_SECONDS", "5"))
+PAYMENT_STATUS_RECHECK_SECONDS = float(os.getenv("PAYMENT_STATUS_RECHECK_SECONDS", "10"))
+
+# The only status a payment never leaves. failed/expired/abandoned can still
+# become completed (a declined card retried in the same Checkout session, a
+# late or out-of-order webhook), so waiters keep listening through them and
+# the webhook consumer keeps applying events to them.
+FINAL_STATUSES = frozenset({"completed"})
+NOT_FOUND = "not_found"
+
+
+class PaymentStatusHub:
+    """TTL status cache + per-payment waiters notified on publish()."""
+
+    def __init__(self, repository, ttl_seconds: float = PAYMENT_STATUS_TTL_SECONDS,
+                 recheck_seconds: float = PAYMENT_STATUS_RECHECK_SECONDS):
+        self.repository = repository
+        self.ttl_seconds = ttl_seconds
+        self.recheck_seconds = recheck_seconds
+        self._cache: Dict[str, Tuple[str, float]] = {}   # id -> (status, expires_at)
+        self._waiters: Dict[str, Set[asyncio.Event]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _store(self, payment_intent_id: str, status: str):
+        self._cache[payment_intent_id] = (status, time.monotonic() + self.ttl_seconds)
+        if len(self._cache) > 10_000:
+            now = time.monotonic()
+            self._cache = {k: v for k, v in self._cache.items() if v[1] > now}
+
+    def publish(self, payment_intent_id: str, status: str):
+        """Record a new status and wake everyone waiting on this payment."""
+        self._store(payment_intent_id, status)
+        for event in self._waiters.get(payment_intent_id, ()):
+            event.set()
+
+    async def get(self, payment_intent_id: str) -> str:
+        """Current status (cached for ttl_seconds), or NOT_FOUND."""
+        cached = self._cache.get(payment_intent_id)
+        if cached and cached[1] > time.monotonic():
+            self.hits += 1
+            return cached[0]
+        self.misses += 1
+        record = await self.repository.get(payment_intent_id)
+        status = record.get("payment_status", "unknown") if record else NOT_FOUND
+        self._store(payment_intent_id, status)
+        return status
+
+    async def wait_for_change(self, payment_intent_id: str, known_status: Optional[str],
+                              timeout: float) -> str:
+        """
+        Long-poll: return as soon as the status differs from known_status,
+        or the current status once `timeout` seconds pass.
+        """
+        deadline = time.monotonic() + timeout
+        event = asyncio.Event()
+        self._waiters.setdefault(payment_intent_id, set()).add(event)
+        try:
+            while True:
+                status = await self.get(payment_intent_id)
+                remaining = deadline - time.monotonic()
+                if status != known_status or remaining <= 0:
+                    return status
+                event.clear()
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=min(remaining, self.recheck_seconds))
+                except asyncio.TimeoutError:
+                    # Let the cached entry lapse so the next read sees other workers' writes.
+                    self._cache.pop(payment_intent_id, None)
+        finally:
+            waiters = self._waiters.get(payment_intent_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    self._waiters.pop(payment_intent_id, None)
+
+    async def stream(self, payment_intent_id: str, max_seconds: float,
+                     heartbeat_seconds: float = 15.0) -> AsyncIterator[Optional[str]]:
+        """
+        Yield the current status, then each change, until a final status or
+        max_seconds. Yields None as a heartbeat when nothing changed.
+        """
+        deadline = time.monotonic() + max_seconds
+        status = await self.get(payment_intent_id)
+        yield status
+        while status not in FINAL_STATUSES and status != NOT_FOUND:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            new_status = await self.wait_for_change(
+                payment_intent_id, status, min(remaining, heartbeat_seconds)
+            )
+            if new_status == status:
+                yield None
+            else:
+                status = new_status
+                yield status
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "cached": len(self._cache),
+            "waiting": sum(len(w) for w in self._waiters.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -7,20 +7,27 @@ Extract information from travel documents (itinerary, ticket, policy) for quote
 import json
 import os
 import re
+import numpy as np
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 
-from langchain_groq import ChatGroq
+from backend.utils.metrics import stage
 
 load_dotenv()
 
 
 def init_llm():
     """Initialize Groq LLM for extraction."""
+    from langchain_groq import ChatGroq
+
+    from backend.utils.llm_usage import UsageCallback
+
+    model = "llama-3.3-70b-versatile"
     return ChatGroq(
-        model="llama-3.3-70b-versatile",
+        model=model,
         temperature=0.2,
         groq_api_key=os.getenv("GROQ_API_KEY"),
+        callbacks=[UsageCallback(model)],
     )
 
 
@@ -74,7 +81,8 @@ Return ONLY valid JSON with these EXACT keys:
 Return ONLY the JSON object, no markdown, no explanations."""
 
     try:
-        response = llm.invoke(prompt)
+        with stage("extract", "llm"):
+            response = llm.invoke(prompt, config={"metadata": {"prompt_template": "extract_itinerary"}})
         text = response.content.strip() if hasattr(response, 'content') else str(response).strip()
         text = re.sub(r'```json|```|json\n', '', text).strip()
         result = json.loads(text)
@@ -141,7 +149,8 @@ Return ONLY valid JSON with these exact keys:
 Return only the JSON object, no markdown, no explanations."""
 
     try:
-        response = llm.invoke(prompt)
+        with stage("extract", "llm"):
+            response = llm.invoke(prompt, config={"metadata": {"prompt_template": "extract_ticket"}})
         text = response.content.strip() if hasattr(response, 'content') else str(response).strip()
         text = re.sub(r'```json|```|json\n', '', text).strip()
         result = json.loads(text)
@@ -191,7 +200,8 @@ If information is not found, use reasonable defaults based on typical travel ins
 Return only valid JSON, no markdown or extra text."""
 
     try:
-        response = llm.invoke(prompt)
+        with stage("extract", "llm"):
+            response = llm.invoke(prompt, config={"metadata": {"prompt_template": "extract_policy"}})
         text = response.content.strip() if hasattr(response, 'content') else str(response).strip()
         text = re.sub(r'```json|```', '', text).strip()
         result = json.loads(text)
@@ -206,71 +216,61 @@ Return only valid JSON, no markdown or extra text."""
         }
 
 
+EXTRACTORS = {
+    "itinerary": extract_itinerary_info,
+    "ticket": extract_ticket_info,
+    "policy": extract_policy_summary,
+}
+
+
+def extract_document(pdf_path: str, doc_type: str = "itinerary") -> Dict[str, Any]:
+    """
+    Extract structured data from an uploaded PDF.
+
+    doc_type: 'itinerary', 'ticket', or 'policy' (unknown types fall back to itinerary).
+    Shared by /upload_extract and the background extraction jobs.
+    """
+    from backend.ingestion.pdf_loader import extract_text_from_pdf
+
+    with stage("extract", "pdf_text"):
+        pdf_text = extract_text_from_pdf(pdf_path)
+    extractor = EXTRACTORS.get(doc_type, extract_itinerary_info)
+    return extractor(init_llm(), pdf_text)
+
+
 def calculate_dynamic_price(product_name: str, duration_days: int = 7) -> float:
     """
     Calculate dynamic insurance price based on trip duration.
     
-    Pricing logic based on typical travel insurance per-day rates:
-    - TravelEasy: ~$4.25/day (base) + age/destination factors
-    - TravelEasy Pre-Ex: ~$7.13/day (higher for pre-existing conditions)
-    - Scootsurance: ~$5.43/day (budget option)
-    
-    For simplicity, using average daily rates.
+    Thin single-trip wrapper over quote_engine: per-day rates live in
+    data/products.json (quote_engine.daily_rate) and the billing rule (1-7 days = one week,
+    8-30 pro-rata, 70% per day beyond) in quote_engine.billed_days.
     """
-    base_rates_per_day = {
-        "TravelEasy Policy QTD032212": 4.25,
-        "TravelEasy Pre-Ex Policy QTD032212-PX": 7.13,
-        "Scootsurance QSR022206_updated": 5.43,
-    }
-    
-    daily_rate = base_rates_per_day.get(product_name, 5.0)
-    
-    # Minimum 1 week, then pro-rated
-    # Typical travel insurance: 1-7 days = same rate, then additional days
-    if duration_days <= 7:
-        return daily_rate * 7
-    elif duration_days <= 30:
-        return daily_rate * duration_days
-    else:
-        # Monthly cap + additional days
-        monthly_rate = daily_rate * 30
-        additional_days = duration_days - 30
-        return monthly_rate + (daily_rate * additional_days * 0.7)
+    from backend.utils.quote_engine import billed_days, daily_rate
+
+    return float(billed_days([duration_days])[0] * daily_rate(product_name))
 
 
 def get_recommended_plan(quotes: list, trip_cost: float = 0) -> str:
     """
     Recommend the best plan based on simple logic.
     
-    Logic: Choose based on trip cost and coverage adequacy.
+    Logic: cheapest plan, unless the trip is high-value, in which case the
+    first plan meeting quote_engine.HIGH_VALUE_REQUIREMENTS (the same
+    plan-search thresholds the quote engine uses). Prices and limits are
+    parsed once into arrays (numbers or "$1,234" strings both work); a
+    price or limit that is not an amount never counts as cheapest or
+    adequate.
     """
     if not quotes:
         return ""
-    
-    # For now, use simple logic: cheapest with adequate coverage
-    # Later can be enhanced with LLM-based recommendation
-    
-    # Sort by price (extract numeric value)
-    def extract_price(price_str: str) -> float:
-        try:
-            return float(price_str.replace("$", "").replace(",", ""))
-        except:
-            return 999999
-    
-    sorted_quotes = sorted(quotes, key=lambda x: extract_price(x.get("price", "$999")))
-    
-    # Simple heuristic: if trip cost > $3000, prefer better coverage
-    if trip_cost > 3000:
-        # Find plan with good medical coverage
-        for quote in quotes:
-            med_str = quote.get("medical", "$0")
-            try:
-                med_val = float(med_str.replace("$", "").replace(",", ""))
-                if med_val >= 80000:
-                    return quote.get("plan", "")
-            except:
-                pass
-    
-    # Default: return cheapest
-    return sorted_quotes[0].get("plan", "") if sorted_quotes else quotes[0].get("plan", "")
 
+    from backend.utils.quote_engine import HIGH_VALUE_REQUIREMENTS, parse_amount, recommend_batch
+
+    prices = np.array([[parse_amount(q.get("price"), default=np.inf) for q in quotes]])
+    adequate = np.array([
+        all(parse_amount(q.get(field, 0), default=np.nan) >= minimum for field, minimum in HIGH_VALUE_REQUIREMENTS.items())
+        for q in quotes
+    ])
+    best = int(recommend_batch(prices, [trip_cost], adequate)[0])
+    return quotes[best].get("plan", "")
@@ -0,0 +1,143 @@
+"""
+backend/utils/product_registry.py
+---------------------------------
+Single source of truth for the insurance products we sell.
+
+data/products.json lists each product once: its taxonomy name, display
+name, PDF and sample files, daily rate, known coverage limits and aliases.
+The registry is loaded once and indexed by id and by every alias, so any
+module can resolve "Scootsurance", "Scootsurance QSR022206",
+"Scootsurance QSR022206_updated" or the PDF filename to the same product
+in O(1). Adding a product is a data change, not a code change: the
+registry reloads itself when the file's mtime changes.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+PRODUCTS_PATH = os.getenv("PRODUCTS_PATH", "data/products.json")
+PDF_BASE_PATH = "data/Policy_Wordings"
+SAMPLES_PATH = "data/samples"
+
+
+@dataclass(frozen=True)
+class Product:
+    id: str
+    name: str                   # key used in the combined taxonomy
+    display_name: str           # name shown to users and on quotes
+    pdf_file: str
+    sample_file: str = ""
+    taxonomy_placeholder: str = ""
+    daily_rate: Optional[float] = None
+    list_price: Optional[float] = None
+    coverage: Dict[str, float] = field(default_factory=dict)
+    aliases: Tuple[str, ...] = ()
+
+    @property
+    def pdf_path(self) -> str:
+        return os.path.join(PDF_BASE_PATH, self.pdf_file)
+
+    @property
+    def sample_path(self) -> str:
+        return os.path.join(SAMPLES_PATH, self.sample_file) if self.sample_file else ""
+
+
+def _norm(key: str) -> str:
+    return " ".join(str(key).lower().split())
+
+
+class ProductRegistry:
+    """Products indexed by id and by every name/alias/file they are known by."""
+
+    def __init__(self, products: List[Product]):
+        self._products = list(products)
+        self._by_id: Dict[str, Product] = {}
+        self._by_key: Dict[str, Product] = {}
+        for product in self._products:
+            if product.id in self._by_id:
+                raise ValueError(f"Duplicate product id: {product.id}")
+            self._by_id[product.id] = product
+            keys = [
+                product.id, product.name, product.display_name, product.pdf_file,
+                os.path.splitext(product.pdf_file)[0], *product.aliases,
+            ]
+            if product.sample_file:
+                keys.append(os.path.splitext(product.sample_file)[0])
+            for key in keys:
+                # First product to claim an alias keeps it.
+                self._by_key.setdefault(_norm(key), product)
+
+    def __iter__(self) -> Iterator[Product]:
+        return iter(self._products)
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def get(self, product_id: str) -> Optional[Product]:
+        return self._by_id.get(product_id)
+
+    def resolve(self, key: Optional[str]) -> Optional[Product]:
+        """Product for an id, taxonomy name, display name, alias or PDF filename."""
+        if not key:
+            return None
+        return self._by_id.get(key) or self._by_key.get(_norm(key))
+
+    def display_name(self, key: str) -> str:
+        product = self.resolve(key)
+        return product.display_name if product else key
+
+
+def load_registry(path: str = PRODUCTS_PATH) -> ProductRegistry:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    products = []
+    for item in data.get("products", []):
+        products.append(
+            Product(
+                id=item["id"],
+                name=item["name"],
+                display_name=item.get("display_name") or item["name"],
+                pdf_file=item.get("pdf_file", ""),
+                sample_file=item.get("sample_file", ""),
+                taxonomy_placeholder=item.get("taxonomy_placeholder", ""),
+                daily_rate=item.get("daily_rate"),
+                list_price=item.get("list_price"),
+                coverage={k: float(v) for k, v in (item.get("coverage") or {}).items()},
+                aliases=tuple(item.get("aliases", [])),
+            )
+        )
+    return ProductRegistry(products)
+
+
+_registry: Optional[ProductRegistry] = None
+_registry_mtime: Optional[int] = None
+
+
+def products_mtime() -> int:
+    try:
+        return os.stat(PRODUCTS_PATH).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def get_registry() -> ProductRegistry:
+    """Process-wide registry, loaded on first use and reloaded when products.json changes."""
+    global _registry, _registry_mtime
+    mtime = products_mtime()
+    if _registry is None or mtime != _registry_mtime:
+        try:
+            registry = load_registry(PRODUCTS_PATH)
+        except (OSError, ValueError, KeyError) as e:
+            if _registry is None:
+                raise
+            # Half-written edit: keep serving the last good registry.
+            print(f"⚠ Could not reload {PRODUCTS_PATH}, keeping previous products: {e}")
+            return _registry
+        _registry, _registry_mtime = registry, mtime
+    return _registry
+
+
+def resolve_product(key: Optional[str]) -> Optional[Product]:
+    return get_registry().resolve(key)
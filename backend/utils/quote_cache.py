@@ -0,0 +1,97 @@
+"""
+backend/utils/quote_cache.py
+----------------------------
+LRU cache for /generate_quotes responses.
+
+Entries are keyed on a canonical hash of the pricing-relevant trip fields
+(duration, trip cost, party, destination) plus a version token built from
+the taxonomy and data/products.json mtimes and the rate-table fingerprint.
+products.json also carries display names and PDF links, which the
+fingerprint doesn't see. Changing any of them changes every key, so stale
+quotes are never served; the old entries are simply cleared on the next
+lookup.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from backend.utils.product_registry import products_mtime
+from backend.utils.quote_engine import (
+    build_quotes,
+    get_rate_table,
+    parse_party,
+    rate_fingerprint,
+    taxonomy_mtime,
+    trip_terms,
+)
+
+QUOTE_CACHE_SIZE = int(os.getenv("QUOTE_CACHE_SIZE", "1024"))
+
+
+def trip_signature(trip_data: Dict[str, Any]) -> str:
+    """Canonical hash of the fields that change a quote."""
+    duration, trip_cost = trip_terms(trip_data)
+    canonical = {
+        "duration": duration,
+        "trip_cost": round(trip_cost, 2),
+        "party": list(parse_party(trip_data)),
+        "destination": " ".join(str(trip_data.get("destination") or "").lower().split()),
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+class QuoteCache:
+    """Thread-safe LRU of build_quotes() results."""
+
+    def __init__(self, max_entries: int = QUOTE_CACHE_SIZE):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+    def version(self) -> str:
+        """Taxonomy and products mtimes + rate-table fingerprint; clears the cache when it changes."""
+        version = f"{taxonomy_mtime()}:{products_mtime()}:{rate_fingerprint(get_rate_table())}"
+        if version != self._version:
+            with self._lock:
+                self._entries.clear()
+                self._version = version
+        return version
+
+    def get_quotes(self, trip_data: Dict[str, Any]) -> Dict[str, Any]:
+        key = f"{self.version()}:{trip_signature(trip_data)}"
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(cached)
+            self.misses += 1
+
+        result = build_quotes(trip_data)
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return copy.deepcopy(result)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+quote_cache = QuoteCache()
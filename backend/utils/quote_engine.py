@@ -0,0 +1,341 @@
+"""
+backend/utils/quote_engine.py
+-----------------------------
+Vectorised quoting engine.
+
+Rate tables and coverage limits are held as NumPy arrays (one row per
+product), so a whole batch of trips is priced for every product in one
+call. Results are plain numbers; "$1234.00" price and "$100,000" limit
+strings are produced only at the API edge via format_amount().
+"""
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote as urlquote
+
+import numpy as np
+
+from backend.chains.policy_comparator import TAXONOMY_PATH, load_all_policies, reload_policies
+from backend.utils.product_registry import get_registry, products_mtime, resolve_product
+
+# Per-day base premium for one adult traveller, for products without a
+# daily_rate in data/products.json.
+DEFAULT_DAILY_RATE = 5.0
+
+# Billing: 1-7 days cost a full week, 8-30 days pro-rata, then 70% per extra day.
+MIN_BILLED_DAYS = 7
+MONTH_DAYS = 30
+LONG_TRIP_DAY_FACTOR = 0.7
+
+# Premium per traveller type, relative to one adult.
+TRAVELLER_TYPES = ("adult", "child", "infant")
+TRAVELLER_FACTORS = (1.0, 0.5, 0.0)
+
+# Family plan: 1-2 adults travelling with children/infants pay at most this
+# many single-adult premiums.
+FAMILY_MAX_ADULTS = 2
+FAMILY_CAP_FACTOR = 2.5
+
+COVERAGE_FIELDS = ("medical", "cancellation", "death_disablement", "dental", "travel_delay")
+
+# Recommendation: trips above this cost need plans meeting these minimum
+# limits (plan_search filters; keys are also quote coverage fields).
+HIGH_VALUE_TRIP_COST = 3000.0
+HIGH_VALUE_REQUIREMENTS = {"medical": 80000.0}
+
+_AMOUNT_RE = re.compile(r"[^\d.]")
+_PARTY_RE = re.compile(r"(\d+)\s*(adult|child|children|kid|infant|bab(?:y|ies))", re.IGNORECASE)
+_PARTY_TYPES = {"adult": 0, "child": 1, "children": 1, "kid": 1, "infant": 2, "baby": 2, "babies": 2}
+
+
+def parse_amount(value, default: float = 0.0) -> float:
+    """'$100,000' / 100000 -> float; `default` when there is no amount (None, "TBA")."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(_AMOUNT_RE.sub("", str(value or "")))
+    except ValueError:
+        return default
+
+
+def format_amount(value: float, cents: bool = False) -> str:
+    """Prices (cents=True) as "$1234.50", the format clients parse; limits as "$100,000"."""
+    if np.isnan(value):
+        return "N/A"
+    return f"${value:.2f}" if cents else f"${value:,.0f}"
+
+
+def daily_rate(product: str) -> float:
+    """Registry daily rate for a product name/alias, or DEFAULT_DAILY_RATE."""
+    entry = resolve_product(product)
+    return entry.daily_rate if entry and entry.daily_rate is not None else DEFAULT_DAILY_RATE
+
+
+@dataclass(frozen=True)
+class RateTable:
+    """
+    Products with their daily rate (P,) and coverage limits (P, len(COVERAGE_FIELDS)).
+    A limit missing from the coverage data is 0; one that is present but not
+    an amount ("TBA") is NaN, like unknown limits in the comparison matrix.
+    """
+
+    products: Tuple[str, ...]
+    daily_rates: np.ndarray
+    coverage: np.ndarray
+
+    def index(self, product: str) -> int:
+        return self.products.index(product)
+
+
+@dataclass(frozen=True)
+class PartyPricing:
+    """Batch premiums for whole travelling parties."""
+
+    unit: np.ndarray           # (N, T, P) premium per traveller of each type
+    counts: np.ndarray         # (N, T) travellers of each type
+    total: np.ndarray          # (N, P) party premium after the family cap
+    family_capped: np.ndarray  # (N, P) True where the family cap applied
+
+
+@dataclass(frozen=True)
+class Quote:
+    """One priced product for one trip."""
+
+    product: str
+    price: float
+    coverage: Dict[str, float]
+
+
+def build_rate_table(products: Optional[Sequence[str]] = None) -> RateTable:
+    """Build the arrays from the taxonomy product list and known coverage limits."""
+    from backend.utils.taxonomy_reader import load_policy_coverage
+
+    names, rates, limits = [], [], []
+    for product in products if products is not None else load_all_policies().keys():
+        coverage = load_policy_coverage(product)
+        if not coverage:
+            continue
+        names.append(product)
+        rates.append(daily_rate(product))
+        limits.append([parse_amount(coverage.get(field, 0), default=np.nan) for field in COVERAGE_FIELDS])
+
+    return RateTable(
+        products=tuple(names),
+        daily_rates=np.asarray(rates, dtype=np.float64),
+        coverage=np.asarray(limits, dtype=np.float64).reshape(len(names), len(COVERAGE_FIELDS)),
+    )
+
+
+_rate_table: Optional[RateTable] = None
+_rate_table_version: Optional[Tuple[int, int]] = None
+
+
+def taxonomy_mtime() -> int:
+    try:
+        return os.stat(TAXONOMY_PATH).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def get_rate_table() -> RateTable:
+    """Process-wide rate table, rebuilt when the taxonomy or products.json changes."""
+    global _rate_table, _rate_table_version
+    version = (taxonomy_mtime(), products_mtime())
+    if _rate_table is None or version != _rate_table_version:
+        if _rate_table is not None and version[0] != _rate_table_version[0]:
+            reload_policies()
+        _rate_table = build_rate_table()
+        _rate_table_version = version
+    return _rate_table
+
+
+def rate_fingerprint(table: Optional[RateTable] = None) -> str:
+    """Short hash of everything that affects a price or recommendation."""
+    table = table or get_rate_table()
+    digest = hashlib.sha256()
+    digest.update(json.dumps([
+        table.products, DEFAULT_DAILY_RATE, MIN_BILLED_DAYS, MONTH_DAYS,
+        LONG_TRIP_DAY_FACTOR, TRAVELLER_FACTORS, FAMILY_MAX_ADULTS, FAMILY_CAP_FACTOR,
+        HIGH_VALUE_TRIP_COST, HIGH_VALUE_REQUIREMENTS,
+    ], sort_keys=True).encode())
+    digest.update(table.daily_rates.tobytes())
+    digest.update(table.coverage.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def billed_days(durations) -> np.ndarray:
+    """Chargeable days for each trip duration (vectorised billing rule)."""
+    d = np.maximum(np.asarray(durations, dtype=np.float64), 1.0)
+    return np.where(
+        d <= MIN_BILLED_DAYS,
+        MIN_BILLED_DAYS,
+        np.where(d <= MONTH_DAYS, d, MONTH_DAYS + (d - MONTH_DAYS) * LONG_TRIP_DAY_FACTOR),
+    )
+
+
+def price_grid(durations, traveller_factors=(1.0,), table: Optional[RateTable] = None) -> np.ndarray:
+    """
+    Premiums for every duration × traveller × product in one broadcast.
+
+    durations: (N,) trip lengths in days; traveller_factors: (T,) multipliers
+    relative to one adult. Returns an (N, T, P) float array.
+    """
+    table = table or get_rate_table()
+    days = billed_days(durations)
+    factors = np.asarray(traveller_factors, dtype=np.float64)
+    return days[:, None, None] * factors[None, :, None] * table.daily_rates[None, None, :]
+
+
+def price_batch(durations, table: Optional[RateTable] = None) -> np.ndarray:
+    """Single-adult premiums, shape (N, P)."""
+    return price_grid(durations, (1.0,), table)[:, 0, :]
+
+
+def high_value_mask(table: Optional[RateTable] = None) -> np.ndarray:
+    """(P,) True for products meeting HIGH_VALUE_REQUIREMENTS (via plan_search)."""
+    from backend.chains.plan_search import match_mask
+
+    table = table or get_rate_table()
+    return match_mask(min_limits=HIGH_VALUE_REQUIREMENTS, products=table.products)
+
+
+def recommend_batch(prices: np.ndarray, trip_costs, adequate: np.ndarray) -> np.ndarray:
+    """
+    Recommended product index per trip.
+
+    prices (N, P), trip_costs (N,), adequate (P,) bool. High-value trips get
+    the first adequate product; everyone else (or if no product qualifies)
+    gets the cheapest. An unknown (NaN) price is never the cheapest.
+    """
+    prices = np.atleast_2d(prices)
+    cheapest = np.argmin(np.where(np.isnan(prices), np.inf, prices), axis=1)
+    candidates = np.flatnonzero(np.asarray(adequate, dtype=bool))
+    if candidates.size == 0:
+        return cheapest
+    high_value = np.asarray(trip_costs, dtype=np.float64) > HIGH_VALUE_TRIP_COST
+    return np.where(high_value, candidates[0], cheapest)
+
+
+def quote_trip(duration_days: int, table: Optional[RateTable] = None) -> List[Quote]:
+    """Typed quotes for one trip, in rate-table order."""
+    table = table or get_rate_table()
+    prices = price_batch([duration_days], table)[0]
+    return [
+        Quote(
+            product=product,
+            price=float(prices[i]),
+            coverage=dict(zip(COVERAGE_FIELDS, table.coverage[i].tolist())),
+        )
+        for i, product in enumerate(table.products)
+    ]
+
+
+def trip_terms(trip_data: Dict[str, Any]) -> Tuple[int, float]:
+    """(duration_days, trip_cost) from a merged trip dict; duration defaults to 7."""
+    duration = int(parse_amount(trip_data.get("duration")) or 7)
+    return duration, parse_amount(trip_data.get("trip_cost"))
+
+
+def parse_party(trip_data: Dict[str, Any]) -> Tuple[int, int, int]:
+    """
+    (adults, children, infants) from passenger_details such as
+    "2 adults, 1 child, 1 infant". Falls back to passenger_count adults.
+    """
+    counts = [0, 0, 0]
+    for number, kind in _PARTY_RE.findall(str(trip_data.get("passenger_details") or "")):
+        counts[_PARTY_TYPES[kind.lower()]] += int(number)
+    if not any(counts):
+        counts[0] = max(1, int(parse_amount(trip_data.get("passenger_count")) or 1))
+    return tuple(counts)
+
+
+def price_parties(durations, parties, table: Optional[RateTable] = None) -> PartyPricing:
+    """
+    Price whole parties: durations (N,), parties (N, T) counts per
+    TRAVELLER_TYPES. Per-traveller premiums, family cap and party totals
+    are computed together in one broadcast over (N, T, P).
+
+    A party without an adult ("1 infant", "2 children") would otherwise
+    quote $0 or half price, so its first traveller (a child if there is
+    one, else an infant) is charged as the adult; the returned counts
+    show that traveller as an adult.
+    """
+    table = table or get_rate_table()
+    counts = np.array(parties, dtype=np.float64).reshape(-1, len(TRAVELLER_TYPES))
+    unaccompanied = np.flatnonzero((counts[:, 0] == 0) & (counts[:, 1:].sum(axis=1) > 0))
+    lead = np.where(counts[unaccompanied, 1] > 0, 1, 2)
+    counts[unaccompanied, lead] -= 1
+    counts[unaccompanied, 0] = 1
+    unit = price_grid(durations, TRAVELLER_FACTORS, table)
+    subtotal = np.einsum("nt,ntp->np", counts, unit)
+
+    adults = counts[:, 0]
+    dependants = counts[:, 1:].sum(axis=1)
+    family = (adults >= 1) & (adults <= FAMILY_MAX_ADULTS) & (dependants >= 1)
+    cap = FAMILY_CAP_FACTOR * unit[:, 0, :]
+    capped = family[:, None] & (subtotal > cap)
+    return PartyPricing(
+        unit=unit,
+        counts=counts.astype(np.int64),
+        total=np.where(capped, cap, subtotal),
+        family_capped=capped,
+    )
+
+
+def price_trips(trips: Sequence[Dict[str, Any]], table: Optional[RateTable] = None):
+    """
+    Price and recommend a batch of trips for their whole party. Returns
+    (PartyPricing, best (N,)) where best indexes table.products.
+    """
+    table = table or get_rate_table()
+    terms = [trip_terms(t) for t in trips]
+    durations = np.fromiter((d for d, _ in terms), dtype=np.float64, count=len(terms))
+    costs = np.fromiter((c for _, c in terms), dtype=np.float64, count=len(terms))
+    pricing = price_parties(durations, [parse_party(t) for t in trips], table)
+    return pricing, recommend_batch(pricing.total, costs, high_value_mask(table))
+
+
+def format_quotes(pricing: PartyPricing, row: int = 0, table: Optional[RateTable] = None) -> List[Dict[str, Any]]:
+    """Display quotes for one trip of a batch, as returned by /generate_quotes."""
+    table = table or get_rate_table()
+    counts = pricing.counts[row]
+    quotes = []
+    registry = get_registry()
+    for i, product in enumerate(table.products):
+        entry = registry.resolve(product)
+        pdf_file = entry.pdf_file if entry else ""
+        quote = {"plan": entry.display_name if entry else product}
+        for j, field in enumerate(COVERAGE_FIELDS):
+            quote[field] = format_amount(table.coverage[i, j])
+        quote["price"] = format_amount(pricing.total[row, i], cents=True)
+        quote["per_traveller"] = [
+            {
+                "type": kind,
+                "count": int(counts[t]),
+                "unit_price": format_amount(pricing.unit[row, t, i], cents=True),
+                "subtotal": format_amount(counts[t] * pricing.unit[row, t, i], cents=True),
+            }
+            for t, kind in enumerate(TRAVELLER_TYPES)
+            if counts[t]
+        ]
+        quote["family_cap_applied"] = bool(pricing.family_capped[row, i])
+        quote["link"] = f"http://127.0.0.1:8000/policy_pdf/{urlquote(pdf_file)}" if pdf_file else ""
+        quotes.append(quote)
+    return quotes
+
+
+def build_quotes(trip_data: Dict[str, Any], table: Optional[RateTable] = None) -> Dict[str, Any]:
+    """Quotes + recommended plan for one trip's whole party (the /generate_quotes body)."""
+    table = table or get_rate_table()
+    pricing, best = price_trips([trip_data], table)
+    quotes = format_quotes(pricing, 0, table)
+    adults, children, infants = pricing.counts[0].tolist()
+    return {
+        "travellers": {"adults": adults, "children": children, "infants": infants},
+        "quotes": quotes,
+        "recommended_plan": quotes[int(best[0])]["plan"] if quotes else "",
+    }
@@ -0,0 +1,215 @@
+"""
+backend/utils/request_profiler.py
+---------------------------------
+Opt-in sampling profiler for individual requests, saved as speedscope JSON.
+
+A request is profiled when it carries `X-Profile: <PROFILE_ADMIN_TOKEN>`,
+or at random with probability PROFILE_SAMPLE_RATE, and its path is in
+PROFILE_PATHS. While it runs, a background thread snapshots every
+thread's Python stack (sys._current_frames) each PROFILE_INTERVAL_MS,
+so the event loop, the to_thread/threadpool workers and the Groq HTTP
+client all show up. C extensions appear as their Python entry point
+(PyMuPDF's get_text, json.decoder, httpx), which is enough to see which
+one dominates. Idle threads (parked in wait/select/queue.get) are
+dropped from the samples.
+
+The profile is written to PROFILE_DIR/<request id>.speedscope.json (one
+lane per thread; open it at https://www.speedscope.app) and the id is
+returned in the X-Profile-Id response header. The request id comes from
+X-Request-ID when it's a safe filename, else a fresh uuid.
+
+Other requests on the event loop at the same time appear in the samples
+too; profile on a quiet instance when that matters.
+
+When neither a token nor a sample rate is configured the middleware is
+never installed, so disabled profiling costs nothing per request.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+PROFILE_PATHS = tuple(p.strip() for p in os.getenv("PROFILE_PATHS", "/chat,/upload_extract").split(",") if p.strip())
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+MAX_STACK_DEPTH = 256
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Leaf frames that mean "this thread is parked", not working.
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("threading.py", "_wait_for_tstate_lock"),
+}
+
+
+def profiling_enabled() -> bool:
+    return bool(PROFILE_ADMIN_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(PROFILE_ADMIN_TOKEN) and token == PROFILE_ADMIN_TOKEN
+
+
+def safe_request_id(value: Optional[str]) -> str:
+    return value if value and _REQUEST_ID_RE.match(value) else uuid.uuid4().hex
+
+
+def profile_path(request_id: str, directory: str = PROFILE_DIR) -> str:
+    return os.path.join(directory, f"{request_id}.speedscope.json")
+
+
+class SamplingProfiler:
+    """Samples all threads' Python stacks on a timer until stop()."""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = max(interval_ms, 0.5) / 1000
+        self._frames: List[Dict[str, object]] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self._samples: Dict[int, List[Tuple[List[int], float]]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self._frames)
+            self._frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def _sample(self, elapsed: float):
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self._samples.setdefault(thread_id, []).append((stack, elapsed))
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(now - last)
+            last = now
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def to_speedscope(self, name: str) -> Dict[str, object]:
+        """speedscope file format: shared frame table, one sampled profile per thread."""
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+        profiles = []
+        for thread_id, samples in sorted(self._samples.items(), key=lambda kv: -len(kv[1])):
+            weights = [round(elapsed * 1000, 3) for _, elapsed in samples]
+            profiles.append({
+                "type": "sampled",
+                "name": f"{thread_names.get(thread_id, 'thread')} ({thread_id})",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": [stack for stack, _ in samples],
+                "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "backend.utils.request_profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self._frames},
+            "profiles": profiles,
+        }
+
+
+def _write_profile(path: str, data: Dict[str, object], max_files: int):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    directory = os.path.dirname(path) or "."
+    files = sorted(
+        (os.path.join(directory, n) for n in os.listdir(directory) if n.endswith(".speedscope.json")),
+        key=os.path.getmtime,
+    )
+    for old in files[:-max_files] if max_files > 0 else []:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware: profile selected requests, pass everything else straight through."""
+
+    def __init__(self, app, paths: Sequence[str] = PROFILE_PATHS, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 interval_ms: float = PROFILE_INTERVAL_MS, directory: str = PROFILE_DIR,
+                 max_files: int = PROFILE_MAX_FILES):
+        self.app = app
+        self.paths = set(paths)
+        self.sample_rate = sample_rate
+        self.interval_ms = interval_ms
+        self.directory = directory
+        self.max_files = max_files
+
+    def _wanted(self, headers: Dict[bytes, bytes]) -> bool:
+        token = headers.get(b"x-profile")
+        if token is not None and is_admin(token.decode("latin-1")):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        if not self._wanted(headers):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = safe_request_id(headers.get(b"x-request-id", b"").decode("latin-1"))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", request_id.encode())]
+            await send(message)
+
+        profiler = SamplingProfiler(self.interval_ms)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            name = f"{scope.get('method', '')} {scope['path']} {request_id} ({profiler.duration * 1000:.0f} ms)"
+            path = profile_path(request_id, self.directory)
+            await asyncio.to_thread(_write_profile, path, profiler.to_speedscope(name), self.max_files)
+            print(f"🔬 Profiled {name} → {path}")
@@ -8,35 +8,21 @@ import json
 import os
 from typing import Dict, Any
 
+from backend.utils.product_registry import resolve_product
+
 
 def get_known_policy_coverage(product_name: str) -> Dict[str, Any]:
     """
     Return known coverage amounts from the policy PDFs as a fallback.
-    These are manual entries based on actual policy documents.
+    These are manual entries (data/products.json) based on actual policy documents.
     """
-    known_coverage = {
-        "TravelEasy Policy QTD032212": {
-            "medical": "$100,000",
-            "cancellation": "$5,000",
-            "death_disablement": "$100,000",
-            "price": "$42.50"
-        },
-        "TravelEasy Pre-Ex Policy QTD032212-PX": {
-            "medical": "$100,000",
-            "cancellation": "$4,000",
-            "death_disablement": "$100,000",
-            "price": "$49.90"
-        },
-        "Scootsurance QSR022206_updated": {
-            "medical": "$70,000",
-            "cancellation": "$1,000",
-            "death_disablement": "$100,000",
-            "dental": "$50,000",
-            "travel_delay": "$600",
-            "price": "$38.00"
-        }
-    }
-    return known_coverage.get(product_name, {})
+    product = resolve_product(product_name)
+    if product is None or not product.coverage:
+        return {}
+    known_coverage = {field: f"${value:,.0f}" for field, value in product.coverage.items()}
+    if product.list_price is not None:
+        known_coverage["price"] = f"${product.list_price:,.2f}"
+    return known_coverage
 
 
 def load_policy_coverage(product_name: str) -> Dict[str, Any]:
@@ -51,17 +37,11 @@ def load_policy_coverage(product_name: str) -> Dict[str, Any]:
         return known_coverage
     
     # If not found, try to extract from sample JSONs
-    mapping = {
-        "TravelEasy Policy QTD032212": "TravelEasy Policy QTD032212.json",
-        "TravelEasy Pre-Ex Policy QTD032212-PX": "TravelEasy Pre-Ex Policy QTD032212-PX.json",
-        "Scootsurance QSR022206_updated": "Scootsurance QSR022206_updated.json",
-    }
-    
-    filename = mapping.get(product_name)
-    if not filename:
+    product = resolve_product(product_name)
+    if product is None or not product.sample_file:
         return {}
-    
-    sample_path = os.path.join("data/samples", filename)
+
+    sample_path = product.sample_path
     
     if not os.path.exists(sample_path):
         print(f"Sample file not found: {sample_path}")
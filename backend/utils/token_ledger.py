@@ -0,0 +1,328 @@
+"""
+backend/utils/token_ledger.py
+-----------------------------
+Per-request LLM token and cost accounting, aggregated for GET /usage/tokens.
+
+Every Groq call is recorded by UsageCallback (backend/utils/llm_usage.py)
+with three attributions:
+  endpoint  the API route that triggered it, set with usage_context() in
+            the handler (or job runner) and carried by a contextvar, so
+            it follows the call into asyncio.to_thread workers
+  session   the chat session / caller, same mechanism
+  template  the prompt that was sent (chat_agent, extract_itinerary, ...),
+            passed as LangChain run metadata {"prompt_template": ...}
+
+The ledger keeps running totals (calls, errors, input/output tokens, cost)
+per endpoint, template and session, the TOKEN_TOP_N most expensive single
+calls, and a rolling 60s token window checked against GROQ_TPM_BUDGET:
+
+  - before a call, the prompt size is estimated (~4 chars per token) and a
+    warning is logged when it would push the window past the budget;
+  - after a call, a prompt over PROMPT_TOKEN_BUDGET input tokens is logged
+    and counted, so prompt bloat shows up before Groq starts answering
+    413 (request larger than the TPM limit) or 429 (window exhausted).
+
+classify_llm_error() maps Groq failures to a kind (auth, too_large,
+rate_limit, unavailable) from the exception's type and HTTP status, with
+the old message-matching kept only as a fallback.
+
+Nothing here imports LangChain or Groq, so the API can import it at
+startup. Everything is in-process: per-instance numbers, reset on restart.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from backend.utils.metrics import Counter, Gauge
+
+GROQ_TPM_BUDGET = int(os.getenv("GROQ_TPM_BUDGET", "12000"))
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+TOKEN_BUDGET_WARN_RATIO = float(os.getenv("TOKEN_BUDGET_WARN_RATIO", "0.8"))
+TOKEN_TOP_N = int(os.getenv("TOKEN_TOP_N", "20"))
+TOKEN_MAX_SESSIONS = int(os.getenv("TOKEN_MAX_SESSIONS", "5000"))
+# USD per million tokens; defaults are Groq's llama-3.3-70b-versatile list prices.
+LLM_COST_INPUT_PER_M = float(os.getenv("LLM_COST_INPUT_PER_M", "0.59"))
+LLM_COST_OUTPUT_PER_M = float(os.getenv("LLM_COST_OUTPUT_PER_M", "0.79"))
+
+WINDOW_SECONDS = 60.0
+CHARS_PER_TOKEN = 4
+UNKNOWN = "unknown"
+
+TEMPLATE_TOKENS = Counter(
+    "lea_llm_prompt_tokens_total", "LLM tokens by prompt template and endpoint", ("template", "endpoint", "type")
+)
+OVER_PROMPT_BUDGET = Counter(
+    "lea_llm_prompt_over_budget_total", "LLM calls whose prompt exceeded PROMPT_TOKEN_BUDGET", ("template",)
+)
+
+_context: ContextVar[Dict[str, Optional[str]]] = ContextVar("llm_usage_context", default={})
+
+
+@contextmanager
+def usage_context(endpoint: Optional[str] = None, session: Optional[str] = None):
+    """Attribute LLM calls made inside the block to an endpoint and/or session."""
+    current = dict(_context.get())
+    if endpoint is not None:
+        current["endpoint"] = endpoint
+    if session is not None:
+        current["session"] = session
+    token = _context.set(current)
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current_context() -> Dict[str, Optional[str]]:
+    return _context.get()
+
+
+def estimate_tokens(chars: int) -> int:
+    """Rough pre-call token estimate from prompt length (English text, ~4 chars/token)."""
+    return (chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def cost_usd(input_tokens: int, output_tokens: int) -> float:
+    return (input_tokens * LLM_COST_INPUT_PER_M + output_tokens * LLM_COST_OUTPUT_PER_M) / 1_000_000
+
+
+# ---------------------------------------------------------------------------- #
+# Error classification
+# ---------------------------------------------------------------------------- #
+_STATUS_KINDS = {401: "auth", 403: "auth", 413: "too_large", 429: "rate_limit"}
+_UNAVAILABLE_TYPES = {"APIConnectionError", "APITimeoutError", "ConnectError", "ConnectTimeout", "ReadTimeout"}
+
+
+def _classify_message(message: str) -> str:
+    low = message.lower()
+    if "invalid api key" in low or "invalid_api_key" in low or "401" in low:
+        return "auth"
+    if "request too large" in low or "413" in low:
+        return "too_large"
+    if "rate limit" in low or "rate_limit" in low or "429" in low or "tokens per minute" in low:
+        return "rate_limit"
+    if "connection" in low or "timeout" in low or "dns" in low or "failed to establish" in low:
+        return "unavailable"
+    return "error"
+
+
+def classify_llm_error(error: BaseException) -> str:
+    """
+    auth | too_large | rate_limit | unavailable | error for an exception
+    raised by (or wrapping) a Groq call. Walks __cause__/__context__ and
+    reads the Groq SDK's status_code / exception type before falling back
+    to the message text.
+    """
+    seen = set()
+    current: Optional[BaseException] = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        status = getattr(current, "status_code", None)
+        if status in _STATUS_KINDS:
+            return _STATUS_KINDS[status]
+        if isinstance(status, int) and status >= 500:
+            return "unavailable"
+        if {cls.__name__ for cls in type(current).__mro__} & _UNAVAILABLE_TYPES:
+            return "unavailable"
+        current = current.__cause__ or current.__context__
+    return _classify_message(str(error))
+
+
+# ---------------------------------------------------------------------------- #
+# Ledger
+# ---------------------------------------------------------------------------- #
+def _new_totals() -> Dict[str, Any]:
+    return {
+        "calls": 0,
+        "errors": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "total_tokens": 0,
+        "cost_usd": 0.0,
+        "max_input_tokens": 0,
+        "over_prompt_budget": 0,
+    }
+
+
+def _add(totals: Dict[str, Any], input_tokens: int, output_tokens: int, over_budget: bool):
+    totals["calls"] += 1
+    totals["input_tokens"] += input_tokens
+    totals["output_tokens"] += output_tokens
+    totals["total_tokens"] += input_tokens + output_tokens
+    totals["cost_usd"] += cost_usd(input_tokens, output_tokens)
+    totals["max_input_tokens"] = max(totals["max_input_tokens"], input_tokens)
+    totals["over_prompt_budget"] += int(over_budget)
+
+
+def _public(totals: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(totals)
+    out["cost_usd"] = round(out["cost_usd"], 6)
+    out["avg_input_tokens"] = round(out["input_tokens"] / out["calls"]) if out["calls"] else 0
+    return out
+
+
+class TokenLedger:
+    """Thread-safe token totals by endpoint/template/session plus a rolling TPM window."""
+
+    def __init__(self, tpm_budget: int = GROQ_TPM_BUDGET, prompt_budget: int = PROMPT_TOKEN_BUDGET,
+                 warn_ratio: float = TOKEN_BUDGET_WARN_RATIO, top_n: int = TOKEN_TOP_N,
+                 max_sessions: int = TOKEN_MAX_SESSIONS, clock=time.time):
+        self.tpm_budget = tpm_budget
+        self.prompt_budget = prompt_budget
+        self.warn_ratio = warn_ratio
+        self.top_n = top_n
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._last_window_warning = 0.0
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._total = _new_totals()
+            self._by_endpoint: Dict[str, Dict[str, Any]] = {}
+            self._by_template: Dict[str, Dict[str, Any]] = {}
+            self._by_session: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+            self._errors: Dict[str, int] = {}
+            self._top: List[tuple] = []  # min-heap of (total_tokens, seq, entry)
+            self._window: deque = deque()  # (timestamp, tokens)
+
+    # ------------------------------------------------------------------ #
+    # Recording
+    # ------------------------------------------------------------------ #
+    def _trim_window(self, now: float):
+        while self._window and self._window[0][0] <= now - WINDOW_SECONDS:
+            self._window.popleft()
+
+    def _session_totals(self, session: str) -> Dict[str, Any]:
+        totals = self._by_session.get(session)
+        if totals is None:
+            totals = self._by_session[session] = _new_totals()
+            if len(self._by_session) > self.max_sessions:
+                self._by_session.popitem(last=False)
+        else:
+            self._by_session.move_to_end(session)
+        return totals
+
+    def check_prompt(self, estimated_tokens: int, template: str = UNKNOWN, endpoint: str = UNKNOWN) -> bool:
+        """
+        Pre-call check: False (and a warning) when a prompt of this estimated
+        size would push the last minute's usage past the TPM budget.
+        """
+        with self._lock:
+            now = self._clock()
+            self._trim_window(now)
+            used = sum(tokens for _, tokens in self._window)
+        if self.tpm_budget <= 0 or used + estimated_tokens <= self.tpm_budget:
+            return True
+        print(f"⚠ Prompt '{template}' on {endpoint} (~{estimated_tokens:,} tokens) would exceed the "
+              f"TPM budget: {used:,}/{self.tpm_budget:,} used in the last minute")
+        return False
+
+    def record(self, model: str, input_tokens: int, output_tokens: int, template: str = UNKNOWN,
+               endpoint: Optional[str] = None, session: Optional[str] = None, prompt_chars: int = 0):
+        input_tokens = int(input_tokens or 0)
+        output_tokens = int(output_tokens or 0)
+        endpoint = endpoint or UNKNOWN
+        total = input_tokens + output_tokens
+        over_budget = self.prompt_budget > 0 and input_tokens > self.prompt_budget
+        now = self._clock()
+        with self._lock:
+            _add(self._total, input_tokens, output_tokens, over_budget)
+            _add(self._by_endpoint.setdefault(endpoint, _new_totals()), input_tokens, output_tokens, over_budget)
+            _add(self._by_template.setdefault(template, _new_totals()), input_tokens, output_tokens, over_budget)
+            if session:
+                _add(self._session_totals(session), input_tokens, output_tokens, over_budget)
+
+            entry = {
+                "at": round(now, 3),
+                "model": model,
+                "template": template,
+                "endpoint": endpoint,
+                "session": session,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "prompt_chars": prompt_chars,
+                "cost_usd": round(cost_usd(input_tokens, output_tokens), 6),
+            }
+            item = (total, next(self._seq), entry)
+            if len(self._top) < self.top_n:
+                heapq.heappush(self._top, item)
+            elif self._top and total > self._top[0][0]:
+                heapq.heapreplace(self._top, item)
+
+            self._window.append((now, total))
+            self._trim_window(now)
+            used = sum(tokens for _, tokens in self._window)
+            warn_window = (self.tpm_budget > 0 and used >= self.tpm_budget * self.warn_ratio
+                           and now - self._last_window_warning >= WINDOW_SECONDS)
+            if warn_window:
+                self._last_window_warning = now
+
+        TEMPLATE_TOKENS.inc(input_tokens, template=template, endpoint=endpoint, type="input")
+        TEMPLATE_TOKENS.inc(output_tokens, template=template, endpoint=endpoint, type="output")
+        if over_budget:
+            OVER_PROMPT_BUDGET.inc(template=template)
+            print(f"⚠ Prompt '{template}' on {endpoint} used {input_tokens:,} input tokens "
+                  f"(budget {self.prompt_budget:,})")
+        if warn_window:
+            print(f"⚠ LLM usage at {used:,}/{self.tpm_budget:,} tokens in the last minute "
+                  f"({used / self.tpm_budget:.0%} of GROQ_TPM_BUDGET)")
+
+    def record_error(self, kind: str, template: str = UNKNOWN, endpoint: Optional[str] = None,
+                     session: Optional[str] = None):
+        endpoint = endpoint or UNKNOWN
+        with self._lock:
+            self._errors[kind] = self._errors.get(kind, 0) + 1
+            self._total["errors"] += 1
+            self._by_endpoint.setdefault(endpoint, _new_totals())["errors"] += 1
+            self._by_template.setdefault(template, _new_totals())["errors"] += 1
+            if session:
+                self._session_totals(session)["errors"] += 1
+
+    # ------------------------------------------------------------------ #
+    # Reporting
+    # ------------------------------------------------------------------ #
+    def window_tokens(self) -> int:
+        with self._lock:
+            self._trim_window(self._clock())
+            return sum(tokens for _, tokens in self._window)
+
+    def session(self, session: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            totals = self._by_session.get(session)
+            return _public(totals) if totals else None
+
+    def snapshot(self, top: int = 10) -> Dict[str, Any]:
+        """Totals, per-endpoint/template breakdowns, top sessions and the most expensive calls."""
+        used = self.window_tokens()
+        with self._lock:
+            by_session = sorted(self._by_session.items(), key=lambda kv: -kv[1]["total_tokens"])[:top]
+            return {
+                "budget": {
+                    "tpm_budget": self.tpm_budget,
+                    "tokens_last_minute": used,
+                    "tpm_ratio": round(used / self.tpm_budget, 3) if self.tpm_budget > 0 else None,
+                    "prompt_token_budget": self.prompt_budget,
+                },
+                "total": _public(self._total),
+                "errors": dict(self._errors),
+                "by_endpoint": {k: _public(v) for k, v in sorted(self._by_endpoint.items())},
+                "by_template": {k: _public(v) for k, v in sorted(self._by_template.items())},
+                "top_sessions": [{"session": k, **_public(v)} for k, v in by_session],
+                "top_calls": [entry for _, _, entry in heapq.nlargest(top, self._top)],
+            }
+
+
+ledger = TokenLedger()
+
+Gauge("lea_llm_tokens_last_minute", "LLM tokens used in the last 60s (rolling)", fn=lambda: ledger.window_tokens())
+Gauge("lea_llm_tpm_budget", "Configured GROQ_TPM_BUDGET", fn=lambda: ledger.tpm_budget)
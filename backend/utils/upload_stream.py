@@ -0,0 +1,132 @@
+"""
+backend/utils/upload_stream.py
+------------------------------
+Bounded-memory upload handling for /upload and /upload_extract.
+
+- save_upload() copies an UploadFile to disk in fixed-size chunks, hashing
+  as it goes, and enforces the per-file cap. Each upload is stored under a
+  fresh uuid name (the client filename is kept as metadata only), so two
+  clients uploading "ticket.pdf" at once never overwrite each other. It
+  writes to a temp file first and renames it into place only once the
+  whole upload fits.
+- UploadLimitMiddleware rejects requests whose Content-Length is over the
+  per-request cap before the multipart body is read, and stops chunked
+  bodies as soon as they cross it.
+"""
+
+import hashlib
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass
+from typing import Iterable
+
+from starlette.responses import JSONResponse
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(25 * 1024 * 1024)))
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload or request body exceeds its size cap."""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds the {limit / (1024 * 1024):.1f} MB limit")
+        self.limit = limit
+
+
+@dataclass
+class SavedUpload:
+    path: str
+    filename: str  # client filename (basename only), for display
+    size: int
+    sha256: str
+
+
+async def save_upload(upload, dest_dir: str, max_bytes: int = MAX_UPLOAD_BYTES) -> SavedUpload:
+    """
+    Stream a Starlette/FastAPI UploadFile into dest_dir.
+
+    The file is stored as <uuid><ext>; only the basename of the client
+    filename is kept, on the returned SavedUpload. Raises UploadTooLarge
+    (after deleting the partial temp file) once more than max_bytes were
+    read, so a rejected upload leaves nothing behind.
+    """
+    filename = os.path.basename(upload.filename or "") or "upload.bin"
+    ext = os.path.splitext(filename)[1].lower()
+    path = os.path.join(dest_dir, f"{uuid.uuid4().hex}{ext}")
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return SavedUpload(path=path, filename=filename, size=size, sha256=digest.hexdigest())
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware capping request bodies on the given paths with 413."""
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: int = MAX_REQUEST_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+
+    def _reject(self):
+        return JSONResponse(
+            {"ok": False, "error": str(UploadTooLarge(self.max_bytes))}, status_code=413
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        # Early rejection: don't read a byte of an oversized declared body.
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+            await self._reject()(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise UploadTooLarge(self.max_bytes)
+            return message
+
+        async def guarded_send(message):
+            # Form parsing turns our error into a 400; swallow whatever the
+            # app answers once the cap was hit and send the 413 instead.
+            if not exceeded:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            pass
+        if exceeded:
+            await self._reject()(scope, receive, send)
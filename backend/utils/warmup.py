@@ -0,0 +1,109 @@
+"""
+backend/utils/warmup.py
+-----------------------
+Startup warm-up with per-step timings, backing the /ready endpoint.
+
+The API lifespan registers steps (taxonomy load, comparison matrix, quote
+rate table, agent build, Groq connection, optional synthetic query) and
+starts them in the background once the app is serving, so /health answers
+straight away while /ready returns 503 until warm-up has finished. Each
+step runs in a worker thread, one after another, and records its status
+and duration.
+
+Required steps gate readiness; optional ones (network calls such as the
+Groq TLS handshake) are reported but a failure there doesn't keep the
+instance out of rotation. With WARMUP_ENABLED=0 every step is skipped and
+the instance is ready immediately.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+WARMUP_SYNTHETIC_QUERY = os.getenv("WARMUP_SYNTHETIC_QUERY", "0") == "1"
+
+
+class Warmup:
+    """Ordered warm-up steps run once in the background; report() feeds /ready."""
+
+    def __init__(self, enabled: bool = WARMUP_ENABLED):
+        self.enabled = enabled
+        self._steps: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    def add(self, name: str, fn: Callable[[], Any], required: bool = True):
+        self._steps.append({
+            "name": name,
+            "fn": fn,
+            "required": required,
+            "status": "pending",
+            "duration_ms": None,
+            "error": None,
+        })
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def start(self):
+        """Run the steps on the running event loop without blocking startup."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def run(self):
+        self._started = time.perf_counter()
+        for step in self._steps:
+            if not self.enabled:
+                step["status"] = "skipped"
+                continue
+            step["status"] = "running"
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(step["fn"])
+                step["status"] = "ok"
+            except Exception as e:
+                step["status"] = "failed"
+                step["error"] = str(e)
+                marker = "❌" if step["required"] else "⚠"
+                print(f"{marker} Warm-up step '{step['name']}' failed: {e}")
+            step["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        self._finished = time.perf_counter()
+        if self.enabled:
+            print(f"🔥 Warm-up finished in {self._finished - self._started:.2f}s ({'ready' if self.ready else 'NOT ready'})")
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    # ------------------------------------------------------------------ #
+    # Readiness
+    # ------------------------------------------------------------------ #
+    @property
+    def ready(self) -> bool:
+        return self._finished is not None and all(
+            s["status"] in ("ok", "skipped") for s in self._steps if s["required"]
+        )
+
+    def report(self) -> Dict[str, Any]:
+        if self._finished is not None:
+            state = "done"
+        elif self._started is not None:
+            state = "warming"
+        else:
+            state = "pending"
+        total = None
+        if self._started is not None:
+            total = round(((self._finished or time.perf_counter()) - self._started) * 1000, 1)
+        return {
+            "ready": self.ready,
+            "state": state,
+            "total_ms": total,
+            "steps": [{k: v for k, v in s.items() if k != "fn"} for s in self._steps],
+        }
@@ -0,0 +1,238 @@
+"""
+backend/utils/webhook_queue.py
+------------------------------
+Durable, idempotent queue for incoming Stripe webhook events.
+
+/webhook/stripe verifies the signature, appends the event to a SQLite log
+keyed by Stripe's event id (a redelivered event is ignored) and returns
+straight away, so slow storage never makes Stripe retry. A single
+background consumer applies events oldest-first through an async handler;
+failures are retried with backoff and parked as `failed` after
+WEBHOOK_MAX_ATTEMPTS. Processed events stay in the log for
+WEBHOOK_RETENTION_HOURS so late redeliveries are still recognised.
+
+stats() reports queue depth, lag (age of the oldest pending event),
+receive→apply latency and throughput.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from backend.utils.payment_repository import LatencyHistogram
+
+WEBHOOK_DB_PATH = os.getenv("WEBHOOK_DB_PATH", "data/webhook_events.db")
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+WEBHOOK_RETENTION_HOURS = float(os.getenv("WEBHOOK_RETENTION_HOURS", "72"))
+
+POLL_SECONDS = 5.0        # consumer wake-up when no enqueue signal arrives
+BATCH_SIZE = 50
+MAX_BACKOFF_SECONDS = 300.0
+THROUGHPUT_WINDOW = 60.0  # seconds of history for events/sec
+
+# Receive→apply latency buckets (ms); coarser than storage latency.
+LAG_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_events (
+    event_id      TEXT PRIMARY KEY,
+    type          TEXT NOT NULL,
+    payload       TEXT NOT NULL,
+    status        TEXT NOT NULL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    next_attempt  REAL NOT NULL,
+    error         TEXT,
+    received_at   REAL NOT NULL,
+    processed_at  REAL
+);
+CREATE INDEX IF NOT EXISTS webhook_events_pending ON webhook_events (status, next_attempt);
+"""
+
+
+def event_key(event: Dict[str, Any], raw: bytes = b"") -> str:
+    """Stripe's event id, or a content hash for hand-built test events without one."""
+    return event.get("id") or "sha256:" + hashlib.sha256(raw or json.dumps(event, sort_keys=True).encode()).hexdigest()
+
+
+class WebhookQueue:
+    """SQLite event log + one asyncio consumer running `handler(event)`."""
+
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[None]],
+        db_path: str = WEBHOOK_DB_PATH,
+        max_attempts: int = WEBHOOK_MAX_ATTEMPTS,
+        retention_hours: float = WEBHOOK_RETENTION_HOURS,
+    ):
+        self.handler = handler
+        self.max_attempts = max(1, max_attempts)
+        self.retention_seconds = retention_hours * 3600
+        self._lock = threading.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self._received = 0
+        self._duplicates = 0
+        self._processed = 0
+        self._failed = 0
+        self._recent = deque()  # processed_at timestamps inside THROUGHPUT_WINDOW
+        self._lag = LatencyHistogram(LAG_BUCKETS_MS)
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def start(self):
+        """Start the consumer on the running event loop (pending events resume)."""
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._consume())
+            pending = self._count("pending")
+            if pending:
+                print(f"🔁 Resuming {pending} pending webhook event(s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ------------------------------------------------------------------ #
+    # Producer
+    # ------------------------------------------------------------------ #
+    def _insert(self, event_id: str, event: Dict[str, Any]) -> bool:
+        now = time.time()
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT OR IGNORE INTO webhook_events "
+                "(event_id, type, payload, status, next_attempt, received_at) VALUES (?, ?, ?, 'pending', ?, ?)",
+                (event_id, event.get("type", ""), json.dumps(event), now, now),
+            )
+        return cur.rowcount == 1
+
+    async def enqueue(self, event: Dict[str, Any], raw: bytes = b"") -> bool:
+        """Durably record an event. Returns False if it was already received."""
+        event_id = event_key(event, raw)
+        created = await asyncio.to_thread(self._insert, event_id, event)
+        self._received += 1
+        if not created:
+            self._duplicates += 1
+            return False
+        self.start()
+        self._wake.set()
+        return True
+
+    # ------------------------------------------------------------------ #
+    # Consumer
+    # ------------------------------------------------------------------ #
+    def _due(self) -> list:
+        with self._lock:
+            return self._db.execute(
+                "SELECT event_id, payload, attempts, received_at FROM webhook_events "
+                "WHERE status = 'pending' AND next_attempt <= ? ORDER BY received_at LIMIT ?",
+                (time.time(), BATCH_SIZE),
+            ).fetchall()
+
+    def _finish(self, event_id: str, status: str, attempts: int, error: Optional[str], next_attempt: float):
+        with self._lock:
+            self._db.execute(
+                "UPDATE webhook_events SET status = ?, attempts = ?, error = ?, next_attempt = ?, "
+                "processed_at = CASE WHEN ? = 'pending' THEN NULL ELSE ? END WHERE event_id = ?",
+                (status, attempts, error, next_attempt, status, time.time(), event_id),
+            )
+
+    async def _apply(self, row) -> None:
+        attempts = row["attempts"] + 1
+        try:
+            await self.handler(json.loads(row["payload"]))
+        except Exception as e:
+            if attempts >= self.max_attempts:
+                print(f"❌ Webhook event {row['event_id']} failed after {attempts} attempts: {e}")
+                self._failed += 1
+                await asyncio.to_thread(self._finish, row["event_id"], "failed", attempts, str(e), 0)
+            else:
+                delay = min(MAX_BACKOFF_SECONDS, 2 ** attempts)
+                print(f"⚠ Webhook event {row['event_id']} failed (attempt {attempts}), retrying in {delay:.0f}s: {e}")
+                await asyncio.to_thread(
+                    self._finish, row["event_id"], "pending", attempts, str(e), time.time() + delay
+                )
+            return
+
+        now = time.time()
+        await asyncio.to_thread(self._finish, row["event_id"], "done", attempts, None, 0)
+        self._processed += 1
+        self._recent.append(now)
+        self._trim_recent(now)
+        self._lag.observe((now - row["received_at"]) * 1000)
+
+    async def _consume(self):
+        last_purge = 0.0
+        while True:
+            # Clear before reading so an enqueue during this batch still wakes us.
+            self._wake.clear()
+            rows = await asyncio.to_thread(self._due)
+            for row in rows:
+                await self._apply(row)
+            if time.time() - last_purge > 3600:
+                await asyncio.to_thread(self.purge)
+                last_purge = time.time()
+            if len(rows) < BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+    # ------------------------------------------------------------------ #
+    # Maintenance / metrics
+    # ------------------------------------------------------------------ #
+    def purge(self) -> int:
+        """Delete processed events older than the retention window."""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            cur = self._db.execute(
+                "DELETE FROM webhook_events WHERE status IN ('done', 'failed') AND processed_at < ?", (cutoff,)
+            )
+        return cur.rowcount
+
+    def _count(self, status: str) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM webhook_events WHERE status = ?", (status,)).fetchone()[0]
+
+    def _trim_recent(self, now: float):
+        while self._recent and now - self._recent[0] > THROUGHPUT_WINDOW:
+            self._recent.popleft()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        self._trim_recent(now)
+        with self._lock:
+            oldest = self._db.execute(
+                "SELECT MIN(received_at) FROM webhook_events WHERE status = 'pending'"
+            ).fetchone()[0]
+        return {
+            "consumer_running": self._task is not None and not self._task.done(),
+            "pending": self._count("pending"),
+            "failed": self._count("failed"),
+            "lag_seconds": round(now - oldest, 3) if oldest else 0.0,
+            "received_total": self._received,
+            "duplicates_total": self._duplicates,
+            "processed_total": self._processed,
+            "failed_total": self._failed,
+            "throughput_per_sec": round(len(self._recent) / THROUGHPUT_WINDOW, 3),
+            "apply_latency_ms": self._lag.snapshot(),
+        }
@@ -0,0 +1,129 @@
+"""
+Lookup benchmark: payment_intent.payment_failed resolution by scan vs by key.
+
+Seeds an in-memory stand-in for the DynamoDB payments table (get_item /
+put_item / scan with 1 MB-style pages) with N payment records, each linked
+to a Stripe intent through payment_index.put_payment, then resolves random
+Stripe intents three ways:
+
+  first-page scan   the old handler: one scan() call, misses anything past page 1
+  paginated scan    every page until found (the legacy fallback path)
+  keyed             payment_index.find_by_stripe_intent (pointer, then record)
+
+Run: python tests/benchmark_payment_lookup.py [records]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils.payment_index import find_by_stripe_intent, put_payment  # noqa: E402
+
+DEFAULT_RECORDS = 1_000_000
+SCAN_PAGE_ITEMS = 4000   # ~1 MB DynamoDB scan page at ~250 bytes/item
+SCAN_LOOKUPS = 5
+KEYED_LOOKUPS = 10_000
+
+
+class InMemoryTable:
+    """Just enough of boto3's Table for payment_index (equality filters only)."""
+
+    def __init__(self):
+        self.items = {}
+        self.reads = 0
+        self._scan_order = None
+
+    def put_item(self, Item):
+        self.items[Item["payment_intent_id"]] = dict(Item)
+        self._scan_order = None
+
+    def get_item(self, Key):
+        self.reads += 1
+        item = self.items.get(Key["payment_intent_id"])
+        return {"Item": dict(item)} if item is not None else {}
+
+    def scan(self, FilterExpression, ExpressionAttributeValues, ExclusiveStartKey=None, **_):
+        self.reads += 1
+        attr, placeholder = (part.strip() for part in FilterExpression.split("="))
+        wanted = ExpressionAttributeValues[placeholder]
+        if self._scan_order is None:
+            self._scan_order = list(self.items)  # insertion order stands in for hash order
+        start = ExclusiveStartKey["_pos"] if ExclusiveStartKey else 0
+        page = self._scan_order[start:start + SCAN_PAGE_ITEMS]
+        response = {"Items": [
+            {"payment_intent_id": k} for k in page if self.items[k].get(attr) == wanted
+        ]}
+        if start + len(page) < len(self._scan_order):
+            response["LastEvaluatedKey"] = {"payment_intent_id": page[-1], "_pos": start + len(page)}
+        return response
+
+
+def seed(n: int) -> InMemoryTable:
+    table = InMemoryTable()
+    for i in range(n):
+        put_payment(table, {
+            "payment_intent_id": f"test_payment_{i:012x}",
+            "payment_status": "pending",
+            "stripe_payment_intent": f"pi_{i:016x}",
+        })
+    return table
+
+
+def first_page_scan(table, intent):
+    response = table.scan(
+        FilterExpression="stripe_payment_intent = :intent_id",
+        ExpressionAttributeValues={":intent_id": intent},
+    )
+    items = response.get("Items", [])
+    return items[0]["payment_intent_id"] if items else None
+
+
+def paginated_scan(table, intent):
+    kwargs = {
+        "FilterExpression": "stripe_payment_intent = :intent_id",
+        "ExpressionAttributeValues": {":intent_id": intent},
+    }
+    while True:
+        response = table.scan(**kwargs)
+        if response["Items"]:
+            return response["Items"][0]["payment_intent_id"]
+        if "LastEvaluatedKey" not in response:
+            return None
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def keyed(table, intent):
+    record = find_by_stripe_intent(table, intent, scan_fallback=False)
+    return record["payment_intent_id"] if record else None
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RECORDS
+    rng = random.Random(42)
+
+    start = time.perf_counter()
+    table = seed(n)
+    print(f"📦 Seeded {n:,} payments ({len(table.items):,} items incl. pointers) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    for name, fn, lookups in (
+        ("first-page scan", first_page_scan, SCAN_LOOKUPS),
+        ("paginated scan", paginated_scan, SCAN_LOOKUPS),
+        ("keyed", keyed, KEYED_LOOKUPS),
+    ):
+        targets = [rng.randrange(n) for _ in range(lookups)]
+        table.reads = 0
+        hits = 0
+        start = time.perf_counter()
+        for i in targets:
+            hits += fn(table, f"pi_{i:016x}") == f"test_payment_{i:012x}"
+        elapsed = time.perf_counter() - start
+        print(f"  {name:>15}: {elapsed / lookups * 1000:9.3f} ms/lookup  "
+              f"{table.reads / lookups:8.1f} reads/lookup  found {hits}/{lookups}")
+
+
+if __name__ == "__main__":
+    main()
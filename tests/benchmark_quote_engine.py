@@ -0,0 +1,94 @@
+"""
+Throughput benchmark: per-trip scalar quoting vs the vectorised quote engine.
+
+"scalar" mirrors the old /generate_quotes loop: calculate_dynamic_price per
+product, "$" strings, then get_recommended_plan re-parsing them. "vectorised"
+prices and recommends the whole batch with quote_engine in one call.
+
+Run: python tests/benchmark_quote_engine.py [batch_size]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils.quote_engine import (  # noqa: E402
+    COVERAGE_FIELDS,
+    daily_rate,
+    format_amount,
+    get_rate_table,
+    high_value_mask,
+    price_batch,
+    recommend_batch,
+)
+
+DEFAULT_BATCH = 10_000
+
+
+def _scalar_price(product: str, duration: int) -> float:
+    # The pre-engine calculate_dynamic_price, one product and one duration per call.
+    rate = daily_rate(product)
+    if duration <= 7:
+        return rate * 7
+    if duration <= 30:
+        return rate * duration
+    return rate * 30 + rate * (duration - 30) * 0.7
+
+
+def _scalar_recommend(quotes: list, trip_cost: float) -> str:
+    # The pre-engine get_recommended_plan: string parsing inside the sort.
+    def extract_price(price_str):
+        return float(price_str.replace("$", "").replace(",", ""))
+
+    sorted_quotes = sorted(quotes, key=lambda q: extract_price(q["price"]))
+    if trip_cost > 3000:
+        for q in quotes:
+            if float(q["medical"].replace("$", "").replace(",", "")) >= 80000:
+                return q["plan"]
+    return sorted_quotes[0]["plan"]
+
+
+def run_scalar(durations, costs, table):
+    medical = [format_amount(m) for m in table.coverage[:, COVERAGE_FIELDS.index("medical")]]
+    picks = []
+    for duration, cost in zip(durations.tolist(), costs.tolist()):
+        quotes = [
+            {"plan": p, "price": f"${_scalar_price(p, duration):.2f}", "medical": medical[i]}
+            for i, p in enumerate(table.products)
+        ]
+        picks.append(_scalar_recommend(quotes, cost))
+    return picks
+
+
+def run_vectorised(durations, costs, table):
+    prices = price_batch(durations, table)
+    best = recommend_batch(prices, costs, high_value_mask(table))
+    return [table.products[i] for i in best]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BATCH
+    rng = np.random.default_rng(42)
+    durations = rng.integers(1, 90, size=n)
+    costs = rng.uniform(200, 8000, size=n)
+    table = get_rate_table()
+    quotes_per_run = n * len(table.products)
+
+    print(f"📦 {n:,} trips × {len(table.products)} products = {quotes_per_run:,} quotes")
+    results = {}
+    for name, fn in (("scalar", run_scalar), ("vectorised", run_vectorised)):
+        start = time.perf_counter()
+        results[name] = fn(durations, costs, table)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:>10}: {elapsed * 1000:8.1f} ms  ({quotes_per_run / elapsed:,.0f} quotes/sec)")
+
+    assert results["scalar"] == results["vectorised"], "recommendations differ"
+    print("✅ Recommendations identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Cold-start benchmark for backend/api.py.
+
+Two measurements, each in a fresh interpreter:
+  - import profile: `python -X importtime -c "import backend.api"`, summarised
+    as total import time plus the heaviest modules (cumulative);
+  - time to first /health: interpreter start -> app startup hooks ->
+    first 200 from GET /health (via TestClient), median of several runs.
+
+Heavy dependencies (LangChain/Groq, stripe, boto3, requests, PyMuPDF) are
+imported lazily by the API; the run fails if any of them is imported at
+startup, or if the median time to first /health exceeds the budget.
+
+Run: python tests/benchmark_startup.py [--runs 5] [--budget-ms 1000] [--report tests/startup_report.txt]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+DEFAULT_RUNS = 5
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1000"))
+TOP_MODULES = 15
+
+# Must not be imported until a request needs them.
+LAZY_MODULES = ("langchain_groq", "langchain_core", "stripe", "boto3", "botocore", "requests", "fitz", "pymupdf")
+
+# Reports the time of the first /health response, not process exit: the
+# background warm-up may still be running when the client closes.
+_HEALTH_SNIPPET = """
+import os, time
+from fastapi.testclient import TestClient
+import backend.api as api
+with TestClient(api.app) as client:
+    assert client.get("/health").status_code == 200
+    print("HEALTH_OK", time.time() - float(os.environ["BENCH_SPAWNED_AT"]), flush=True)
+"""
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("GROQ_API_KEY", "benchmark")
+    env.setdefault("RETRIEVAL_ENABLED", "0")
+    env.setdefault("PAYMENTS_BACKEND", "none")
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def import_profile():
+    """[(module, self_us, cumulative_us, depth)] for `import backend.api`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.api"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"❌ import backend.api failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def time_to_first_health() -> float:
+    """Seconds from spawning the interpreter to the first /health response."""
+    env = _env()
+    env["BENCH_SPAWNED_AT"] = repr(time.time())
+    result = subprocess.run(
+        [sys.executable, "-c", _HEALTH_SNIPPET], cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    match = re.search(r"HEALTH_OK ([\d.]+)", result.stdout)
+    if not match:
+        sys.exit(f"❌ /health did not come up:\n{result.stderr[-2000:]}")
+    return float(match.group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="Fail if median time to first /health exceeds this")
+    parser.add_argument("--report", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    rows = import_profile()
+    total_ms = sum(r[1] for r in rows) / 1000
+    api_ms = next((r[2] for r in rows if r[0] == "backend.api"), 0) / 1000
+    imported = {r[0] for r in rows}
+    eager = sorted(m for m in LAZY_MODULES if m in imported)
+
+    health = [time_to_first_health() for _ in range(max(1, args.runs))]
+    median_ms = statistics.median(health) * 1000
+
+    lines = [
+        "API cold start (python tests/benchmark_startup.py)",
+        f"Python {sys.version.split()[0]}, {len(rows)} modules imported",
+        "",
+        f"import backend.api:        {api_ms:8.1f} ms",
+        f"all imports (incl. site):  {total_ms:8.1f} ms",
+        f"time to first /health:     {median_ms:8.1f} ms median of {len(health)} "
+        f"(min {min(health) * 1000:.1f}, max {max(health) * 1000:.1f}, budget {args.budget_ms:.0f})",
+        "",
+        f"Heaviest modules by cumulative import time (top {TOP_MODULES}):",
+        f"  {'cumulative ms':>13}  {'self ms':>8}  module",
+    ]
+    for module, self_us, cumulative_us, depth in sorted(rows, key=lambda r: -r[2])[:TOP_MODULES]:
+        lines.append(f"  {cumulative_us / 1000:13.1f}  {self_us / 1000:8.1f}  {'  ' * depth}{module}")
+    lines += [
+        "",
+        "Lazily imported (must be absent at startup): " + ", ".join(LAZY_MODULES),
+        "Imported eagerly: " + (", ".join(eager) if eager else "none"),
+    ]
+    report = "\n".join(lines)
+    print(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+
+    failures = []
+    if eager:
+        failures.append(f"heavy modules imported at startup: {', '.join(eager)}")
+    if median_ms > args.budget_ms:
+        failures.append(f"time to first /health {median_ms:.0f} ms > budget {args.budget_ms:.0f} ms")
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        sys.exit(1)
+    print("\n✅ Within startup budget")
+
+
+if __name__ == "__main__":
+    main()
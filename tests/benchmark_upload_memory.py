@@ -0,0 +1,75 @@
+"""
+Peak-RSS benchmark: old whole-file upload write vs streamed save_upload().
+
+Each mode runs in a fresh subprocess so ru_maxrss reflects only that mode.
+The upload is a 50 MB UploadFile spooled to disk, as Starlette hands it to
+the endpoint.
+
+Run: python tests/benchmark_upload_memory.py [size_mb]
+"""
+
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+DEFAULT_SIZE_MB = 50
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _make_upload(size_mb: int):
+    from starlette.datastructures import UploadFile
+
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    block = os.urandom(1024 * 1024)
+    for _ in range(size_mb):
+        spool.write(block)
+    spool.seek(0)
+    return UploadFile(spool, filename="bench.pdf")
+
+
+async def _old(upload, dest_dir):
+    path = os.path.join(dest_dir, upload.filename)
+    with open(path, "wb") as f:
+        f.write(await upload.read())
+
+
+async def _new(upload, dest_dir):
+    from backend.utils.upload_stream import save_upload
+
+    await save_upload(upload, dest_dir, max_bytes=1 << 40)
+
+
+def run_mode(mode: str, size_mb: int):
+    upload = _make_upload(size_mb)
+    before = _peak_rss_mb()
+    with tempfile.TemporaryDirectory() as dest_dir:
+        asyncio.run((_old if mode == "old" else _new)(upload, dest_dir))
+    print(f"{mode} {before:.1f} {_peak_rss_mb():.1f}")
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE_MB
+    print(f"📦 Upload size: {size_mb} MB")
+    for mode in ("old", "new"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, str(size_mb)],
+            check=True, capture_output=True, text=True,
+        ).stdout.split()
+        before, peak = float(out[1]), float(out[2])
+        print(f"  {mode:>3}: peak RSS {peak:7.1f} MB  (+{peak - before:.1f} MB over baseline)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--mode":
+        run_mode(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,45 @@
+"""
+Shared fixtures for tests that drive backend/api.py through TestClient.
+
+The API reads its configuration at import time, so the environment is
+pointed at local-only backends (in-memory payments, temp SQLite queues,
+no warm-up, no retrieval) before the first import. Values already set in
+the environment win.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+_STATE_DIR = tempfile.mkdtemp(prefix="lea-api-tests-")
+
+API_TEST_ENV = {
+    "GROQ_API_KEY": "test",
+    "RETRIEVAL_ENABLED": "0",
+    "WARMUP_ENABLED": "0",
+    "PAYMENTS_BACKEND": "memory",
+    "STRIPE_WEBHOOK_SECRET": "whsec_test",
+    "WEBHOOK_DB_PATH": os.path.join(_STATE_DIR, "webhook_events.db"),
+    "JOBS_DB_PATH": os.path.join(_STATE_DIR, "jobs.db"),
+}
+
+
+@pytest.fixture(scope="session")
+def api():
+    for key, value in API_TEST_ENV.items():
+        os.environ.setdefault(key, value)
+    import backend.api as api_module
+
+    return api_module
+
+
+@pytest.fixture
+def client(api):
+    from fastapi.testclient import TestClient
+
+    with TestClient(api.app) as test_client:
+        yield test_client
@@ -0,0 +1,103 @@
+"""
+Tests for the bulk quoting CLI in backend/utils/batch_quotes.py (chunked
+CSV reads, per-chunk pricing, ordered output, Parquet round trip).
+
+Run: pytest tests/test_batch_quotes.py -v
+"""
+
+import csv
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils import batch_quotes  # noqa: E402
+from backend.utils.quote_engine import build_quotes, parse_amount  # noqa: E402
+
+TRIPS = [
+    {"booking_id": f"B{i:03d}", "duration": str(duration), "trip_cost": str(cost), "passenger_details": party}
+    for i, (duration, cost, party) in enumerate([
+        (3, 800, "1 adult"),
+        (10, 5000, "2 adults, 1 child"),
+        (45, 1200, ""),
+        (14, 2500, "2 adults, 3 children"),
+        ("", 400, "1 adult, 1 infant"),
+        (90, 9000, "3 adults"),
+        (7, 3100, "1 adult, 2 kids"),
+    ])
+]
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.fixture
+def trips_csv(tmp_path):
+    path = tmp_path / "trips.csv"
+    _write_csv(path, TRIPS)
+    return str(path)
+
+
+def test_read_chunks_splits_rows(trips_csv):
+    chunks = list(batch_quotes.read_chunks(trips_csv, chunk_rows=3))
+    assert [len(c) for c in chunks] == [3, 3, 1]
+    assert [r["booking_id"] for c in chunks for r in c] == [t["booking_id"] for t in TRIPS]
+
+
+def test_quote_chunk_matches_generate_quotes():
+    for trip, quoted in zip(TRIPS, batch_quotes.quote_chunk(TRIPS)):
+        expected = build_quotes(trip)
+        assert quoted["booking_id"] == trip["booking_id"]
+        assert (quoted["adults"], quoted["children"], quoted["infants"]) == tuple(expected["travellers"].values())
+        assert quoted["recommended_plan"] == expected["recommended_plan"]
+        for quote in expected["quotes"]:
+            # Both round to cents; half-cent ties may land on either side.
+            assert quoted[f"price_{quote['plan']}"] == pytest.approx(parse_amount(quote["price"]), abs=0.011)
+        assert quoted["recommended_price"] == quoted[f"price_{quoted['recommended_plan']}"]
+
+
+def test_run_writes_every_row_in_input_order(trips_csv, tmp_path, capsys):
+    out = tmp_path / "quotes.csv"
+    assert batch_quotes.run(trips_csv, str(out), workers=2, chunk_rows=2) == len(TRIPS)
+    rows = _read_csv(out)
+    assert [r["booking_id"] for r in rows] == [t["booking_id"] for t in TRIPS]
+    assert rows[4]["duration"] == ""  # input columns pass through untouched
+    assert {"recommended_plan", "recommended_price", "adults", "children", "infants"} <= set(rows[0])
+    assert "Quoted 7 trips" in capsys.readouterr().out
+
+
+def test_cli_entry_point(trips_csv, tmp_path, monkeypatch):
+    out = tmp_path / "quotes.csv"
+    monkeypatch.setattr(sys, "argv", ["batch_quotes", trips_csv, "-o", str(out), "--workers", "1", "--chunk-rows", "0"])
+    batch_quotes.main()
+    assert len(_read_csv(out)) == len(TRIPS)
+
+
+def test_parquet_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    src = tmp_path / "trips.parquet"
+    pq.write_table(pa.Table.from_pylist(TRIPS), src)
+    out = tmp_path / "quotes.parquet"
+    assert batch_quotes.run(str(src), str(out), workers=1, chunk_rows=3) == len(TRIPS)
+    rows = pq.read_table(out).to_pylist()
+    assert [r["booking_id"] for r in rows] == [t["booking_id"] for t in TRIPS]
+
+
+def test_parquet_without_pyarrow_exits_cleanly(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(SystemExit, match="pyarrow"):
+        list(batch_quotes.read_chunks(str(tmp_path / "trips.parquet")))
@@ -0,0 +1,143 @@
+"""
+Tests for backend/ingestion/build_page_map.py and
+backend/chains/citation_helper.py: page numbers and offsets recorded from
+small fixture PDFs, term_sources() citing only the documents that have a
+term, and add_citation() falling back to every policy PDF when none do.
+
+Run: pytest tests/test_citation_helper.py -v
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+fitz = pytest.importorskip("fitz")
+
+from backend.chains import citation_helper  # noqa: E402
+from backend.ingestion import build_page_map as bpm  # noqa: E402
+from backend.utils.product_registry import get_registry  # noqa: E402
+
+TRAVELEASY = "TravelEasy Policy QTD032212"
+SCOOT = "Scootsurance QSR022206_updated"
+
+# One list of lines per page. Headings use "-": the built-in PDF font has
+# no en dash, and HEADING_RE accepts both.
+PDFS = {
+    TRAVELEASY: [
+        ["Welcome to your policy.", "Acts of terrorism are explained below."],
+        ["SECTION 6 - OVERSEAS MEDICAL EXPENSES", "We will pay for treatment abroad."],
+        ["General conditions.", "SECTION 7 - TRIP CANCELLATION", "If you cancel before departure.",
+         "Terrorism at the destination."],
+    ],
+    SCOOT: [
+        ["SECTION 2 - OVERSEAS MEDICAL EXPENSES", "Hospital bills overseas."],
+    ],
+}
+TERMS = ["overseas_medical_expenses", "trip_cancellation", "terrorism", "baggage_delay"]
+
+
+def _write_pdf(path, pages):
+    doc = fitz.open()
+    for lines in pages:
+        doc.new_page().insert_text((72, 72), "\n".join(lines))
+    doc.save(str(path))
+    doc.close()
+
+
+def _page_text(product, page):
+    return " ".join(PDFS[product][page - 1])
+
+
+@pytest.fixture
+def page_map(tmp_path, monkeypatch):
+    for product, pages in PDFS.items():
+        _write_pdf(tmp_path / f"{product}.pdf", pages)
+    (tmp_path / "notes.txt").write_text("not a policy")
+    monkeypatch.setattr(bpm, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(bpm, "taxonomy_terms", lambda: TERMS)
+    return bpm.build_page_map()
+
+
+@pytest.fixture
+def cited(page_map, tmp_path, monkeypatch):
+    """citation_helper reading the fixture map from disk."""
+    path = tmp_path / "clause_page_map.json"
+    path.write_text(json.dumps(page_map), encoding="utf-8")
+    monkeypatch.setattr(citation_helper, "PAGE_MAP_PATH", str(path))
+    monkeypatch.setattr(citation_helper, "_page_map", None)
+    return citation_helper
+
+
+def test_documents_and_clause_pages(page_map):
+    assert page_map["documents"] == {
+        SCOOT: {"file": f"{SCOOT}.pdf", "pages": 1},
+        TRAVELEASY: {"file": f"{TRAVELEASY}.pdf", "pages": 3},
+    }
+    clauses = page_map["clauses"][TRAVELEASY]
+    assert [(c["section"], c["title"], c["page"]) for c in clauses] == [
+        ("6", "OVERSEAS MEDICAL EXPENSES", 2),
+        ("7", "TRIP CANCELLATION", 3),
+    ]
+    for clause in clauses:
+        assert clause["offset"] == _page_text(TRAVELEASY, clause["page"]).index(f"SECTION {clause['section']}")
+    assert clauses[0]["offset"] == 0 and clauses[1]["offset"] > 0
+
+
+def test_terms_point_at_the_clause_or_first_text_hit(page_map):
+    terms = page_map["terms"]
+    assert terms["overseas_medical_expenses"] == {
+        TRAVELEASY: {"page": 2, "offset": 0, "section": "6", "pages": [2]},
+        SCOOT: {"page": 1, "offset": 0, "section": "2", "pages": [1]},
+    }
+    cancellation = terms["trip_cancellation"][TRAVELEASY]
+    assert (cancellation["page"], cancellation["section"]) == (3, "7")
+    assert cancellation["offset"] == _page_text(TRAVELEASY, 3).index("SECTION 7")
+
+    # No heading: first page mentioning it, every mentioning page kept.
+    assert terms["terrorism"] == {
+        TRAVELEASY: {
+            "page": 1,
+            "offset": _page_text(TRAVELEASY, 1).lower().index("terrorism"),
+            "section": None,
+            "pages": [1, 3],
+        },
+    }
+    assert "baggage_delay" not in terms
+
+
+def test_term_sources_cite_only_documents_with_the_term(cited):
+    assert cited.term_sources("overseas_medical_expenses") == [
+        {"file": f"{SCOOT}.pdf", "page": 1},
+        {"file": f"{TRAVELEASY}.pdf", "page": 2},
+    ]
+    assert cited.term_sources("trip_cancellation") == [{"file": f"{TRAVELEASY}.pdf", "page": 3}]
+    assert cited.term_sources("baggage_delay") == []
+    assert cited.term_sources(None) == []
+
+
+def test_add_citation_links_the_pages(cited):
+    reply = cited.add_citation("Answer.", sources=cited.term_sources("trip_cancellation"))
+    assert reply.startswith("Answer.\n\n**Policy Documents:**\n")
+    assert "- TravelEasy Policy QTD032212: [p. 3](http://127.0.0.1:8000/policy_pdf/" \
+           "TravelEasy%20Policy%20QTD032212.pdf#page=3)" in reply
+    assert "Scootsurance" not in reply
+
+
+def test_add_citation_falls_back_to_every_pdf(cited):
+    reply = cited.add_citation("Answer.", sources=cited.term_sources("baggage_delay"))
+    products = list(get_registry())
+    assert reply.count("\n- ") == len(products)
+    for product in products:
+        assert f"[{product.display_name} (PDF)]" in reply
+    assert "#page=" not in reply
+
+
+def test_missing_page_map_cites_whole_documents(tmp_path, monkeypatch):
+    monkeypatch.setattr(citation_helper, "PAGE_MAP_PATH", str(tmp_path / "missing.json"))
+    monkeypatch.setattr(citation_helper, "_page_map", None)
+    assert citation_helper.term_sources("trip_cancellation") == []
+    assert "#page=" not in citation_helper.add_citation("Answer.", sources=[])
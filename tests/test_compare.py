@@ -0,0 +1,55 @@
+"""
+Tests for GET /compare and compare_policies() in
+backend/chains/policy_comparator.py (both served from the comparison
+matrix).
+
+Run: pytest tests/test_compare.py -v
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.chains.policy_comparator import compare_policies, get_comparison_matrix  # noqa: E402
+
+TRAVELEASY = "TravelEasy Policy QTD032212"
+SCOOT = "Scootsurance QSR022206_updated"
+
+
+def test_compare_returns_every_product_and_benefit(client):
+    body = client.get("/compare").json()
+    matrix = get_comparison_matrix()
+    assert body["ok"] is True
+    assert body["products"] == list(matrix.products)
+    assert [row["benefit"] for row in body["benefits"]] == list(matrix.benefits)
+
+
+def test_compare_filters_by_benefit_and_product(client):
+    body = client.get("/compare", params={"benefit": "medical", "product": [TRAVELEASY, SCOOT]}).json()
+    assert body["products"] == [TRAVELEASY, SCOOT]
+    [row] = body["benefits"]
+    assert row["benefit"] == "overseas_medical_expenses"
+    assert row["products"][SCOOT] == {"covered": True, "limit": 70000.0, "diff_vs_best_other": -30000.0}
+    assert row["products"][TRAVELEASY]["diff_vs_best_other"] == 0.0
+
+
+def test_compare_skips_unknown_benefits(client):
+    assert client.get("/compare", params={"benefit": "space_travel"}).json()["benefits"] == []
+
+
+def test_compare_unknown_product_is_404(client):
+    response = client.get("/compare", params={"product": [TRAVELEASY, "Acme Gold"]})
+    assert response.status_code == 404
+    assert "Acme Gold" in response.json()["detail"]
+
+
+def test_compare_policies_renders_the_matrix_row():
+    table = compare_policies("medical", [TRAVELEASY, SCOOT])
+    assert table.startswith("### Comparison: overseas_medical_expenses")
+    assert f"| **{SCOOT}** | Covered | $70,000 | -$30,000 |" in table
+    assert "Pre-Ex" not in table
+
+
+def test_compare_policies_unknown_benefit_points_to_the_pdfs():
+    assert "policy documents" in compare_policies("space_travel")
@@ -0,0 +1,172 @@
+"""
+Tests for backend/utils/job_queue.py (durable SQLite queue, re-queue on
+restart, ETA estimates, retention purge, input cleanup).
+
+Run: pytest tests/test_job_queue.py -v
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils import job_queue as jq  # noqa: E402
+from backend.utils.job_queue import DEFAULT_JOB_SECONDS, JobQueue  # noqa: E402
+
+
+def _wait(queue, job_id, statuses=("done", "failed"), timeout=5.0):
+    deadline = time.time() + timeout
+    while (job := queue.get(job_id))["status"] not in statuses:
+        assert time.time() < deadline, job
+        time.sleep(0.01)
+    return job
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+
+@pytest.fixture
+def queues():
+    created = []
+    yield created
+    for queue in created:
+        queue.shutdown(wait=True)
+
+
+def test_runs_jobs_and_stores_results(db_path, queues):
+    queue = JobQueue(lambda kind, payload: {"echo": payload["x"]}, db_path=db_path)
+    queues.append(queue)
+    job = _wait(queue, queue.submit("extract", {"x": 1}))
+    assert job["status"] == "done"
+    assert job["result"] == {"echo": 1}
+    assert job["eta_seconds"] is None
+    assert queue.get("missing") is None
+
+
+def test_handler_errors_mark_the_job_failed(db_path, queues):
+    def broken(kind, payload):
+        raise ValueError("unreadable PDF")
+
+    queue = JobQueue(broken, db_path=db_path)
+    queues.append(queue)
+    job = _wait(queue, queue.submit("extract", {}))
+    assert job["status"] == "failed"
+    assert job["error"] == "unreadable PDF"
+
+
+def test_jobs_survive_a_restart(db_path, queues):
+    release = threading.Event()
+    first = JobQueue(lambda kind, payload: release.wait(5) and "first", db_path=db_path, workers=1)
+    running = first.submit("extract", {})
+    queued = first.submit("extract", {})
+    _wait(first, running, statuses=("running",))
+    first.shutdown(wait=False)  # process stops: one job mid-run, one still queued
+
+    second = JobQueue(lambda kind, payload: "second", db_path=db_path, workers=1)
+    queues.append(second)
+    assert second.start() == 2
+    assert _wait(second, running)["result"] == "second"
+    assert _wait(second, queued)["result"] == "second"
+    release.set()
+
+
+def test_eta_counts_jobs_ahead_per_worker(db_path, queues):
+    release = threading.Event()
+    queue = JobQueue(lambda kind, payload: release.wait(5), db_path=db_path, workers=1)
+    queues.append(queue)
+    ids = [queue.submit("extract", {}) for _ in range(3)]
+    _wait(queue, ids[0], statuses=("running",))
+
+    assert 0 <= queue.get(ids[0])["eta_seconds"] <= DEFAULT_JOB_SECONDS
+    assert queue.get(ids[1])["eta_seconds"] == 2 * DEFAULT_JOB_SECONDS
+    assert queue.get(ids[2])["eta_seconds"] == 3 * DEFAULT_JOB_SECONDS
+
+    queue.workers = 2  # jobs ahead drain two at a time
+    assert queue.get(ids[2])["eta_seconds"] == 2 * DEFAULT_JOB_SECONDS
+    release.set()
+
+
+def test_eta_uses_recent_durations(db_path, queues):
+    queue = JobQueue(lambda kind, payload: None, db_path=db_path, workers=1)
+    queues.append(queue)
+    now = time.time()
+    for i, seconds in enumerate((4.0, 6.0)):
+        queue._db.execute(
+            "INSERT INTO jobs (id, kind, status, payload, created_at, started_at, finished_at) "
+            "VALUES (?, 'extract', 'done', '{}', ?, ?, ?)",
+            (f"old{i}", now - 60, now - 30, now - 30 + seconds),
+        )
+    queue._db.execute(
+        "INSERT INTO jobs (id, kind, status, payload, created_at) VALUES ('next', 'extract', 'queued', '{}', ?)",
+        (now,),
+    )
+    assert queue.get("next")["eta_seconds"] == 5.0
+
+
+def test_purge_drops_finished_jobs_past_retention(db_path, queues, monkeypatch):
+    queue = JobQueue(lambda kind, payload: "ok", db_path=db_path, retention_hours=1)
+    queues.append(queue)
+    job_id = queue.submit("extract", {})
+    _wait(queue, job_id)
+
+    real_time = time.time
+    monkeypatch.setattr(jq.time, "time", lambda: real_time() + 2 * 3600)
+    assert queue.purge() == 1
+    assert queue.get(job_id) is None
+
+
+def test_cleanup_runs_when_a_job_finishes_or_fails(db_path, queues):
+    cleaned = []
+
+    def handler(kind, payload):
+        if payload["fail"]:
+            raise ValueError("unreadable PDF")
+        return "ok"
+
+    queue = JobQueue(handler, db_path=db_path, cleanup=lambda kind, payload: cleaned.append(payload["path"]))
+    queues.append(queue)
+    done = queue.submit("extract", {"path": "a.pdf", "fail": False})
+    failed = queue.submit("extract", {"path": "b.pdf", "fail": True})
+    assert _wait(queue, done)["status"] == "done"
+    assert _wait(queue, failed)["status"] == "failed"
+    assert sorted(cleaned) == ["a.pdf", "b.pdf"]
+
+
+def test_interrupted_jobs_keep_their_inputs(db_path, queues):
+    cleaned = []
+    release = threading.Event()
+    first = JobQueue(lambda kind, payload: release.wait(5), db_path=db_path, workers=1,
+                     cleanup=lambda kind, payload: cleaned.append(payload))
+    first.submit("extract", {"path": "a.pdf"})
+    first.submit("extract", {"path": "b.pdf"})
+    first.shutdown(wait=False)
+    assert cleaned == []  # still needed when the restart re-queues them
+    release.set()
+
+
+def test_purge_cleans_up_and_survives_cleanup_errors(db_path, queues, monkeypatch, capsys):
+    cleaned = []
+
+    def cleanup(kind, payload):
+        cleaned.append(payload["path"])
+        if payload["path"] == "bad.pdf":
+            raise OSError("permission denied")
+
+    queue = JobQueue(lambda kind, payload: "ok", db_path=db_path, retention_hours=1)
+    queues.append(queue)
+    ids = [queue.submit("extract", {"path": path}) for path in ("bad.pdf", "good.pdf")]
+    for job_id in ids:
+        _wait(queue, job_id)
+
+    queue.cleanup = cleanup  # as if the first cleanup never ran (e.g. a crash)
+    real_time = time.time
+    monkeypatch.setattr(jq.time, "time", lambda: real_time() + 2 * 3600)
+    assert queue.purge() == 2
+    assert sorted(cleaned) == ["bad.pdf", "good.pdf"]
+    assert "permission denied" in capsys.readouterr().out
@@ -0,0 +1,102 @@
+"""
+Tests for backend/utils/metrics.py (Prometheus exposition, stage timers,
+route-labelled request histograms) and backend/utils/llm_usage.py.
+
+Run: pytest tests/test_metrics.py -v
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils import metrics  # noqa: E402
+from backend.utils.metrics import Counter, Gauge, Histogram, MetricsMiddleware, render, stage  # noqa: E402
+
+
+@pytest.fixture
+def registered():
+    created = []
+
+    def make(cls, *args, **kwargs):
+        metric = cls(*args, **kwargs)
+        created.append(metric)
+        return metric
+
+    yield make
+    for metric in created:
+        metrics.unregister(metric)
+
+
+def test_counter_and_labels_render(registered):
+    tokens = registered(Counter, "t_tokens_total", "Tokens", ("model", "type"))
+    tokens.inc(12, model="m", type="input")
+    tokens.inc(3, model="m", type="input")
+    text = render()
+    assert "# TYPE t_tokens_total counter" in text
+    assert 't_tokens_total{model="m",type="input"} 15' in text
+
+
+def test_histogram_buckets_are_cumulative(registered):
+    latency = registered(Histogram, "t_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        latency.observe(value, stage="llm")
+    text = render()
+    assert 't_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert 't_seconds_bucket{stage="llm",le="1"} 3' in text
+    assert 't_seconds_bucket{stage="llm",le="+Inf"} 4' in text
+    assert 't_seconds_count{stage="llm"} 4' in text
+    assert 't_seconds_sum{stage="llm"} 6.05' in text
+
+
+def test_gauge_reads_callback_and_survives_errors(registered):
+    registered(Gauge, "t_ratio", "Ratio", ("cache",), fn=lambda: {("quote",): 0.75})
+    registered(Gauge, "t_broken", "Broken", fn=lambda: 1 / 0)
+    text = render()
+    assert 't_ratio{cache="quote"} 0.75' in text
+    assert "# TYPE t_broken gauge" in text
+
+
+def test_stage_times_and_counts_errors():
+    before = metrics.STAGE_SECONDS.count(pipeline="test", stage="boom")
+    with pytest.raises(ValueError):
+        with stage("test", "boom"):
+            raise ValueError("x")
+    assert metrics.STAGE_SECONDS.count(pipeline="test", stage="boom") == before + 1
+    assert metrics.STAGE_ERRORS.value(pipeline="test", stage="boom") >= 1
+
+
+def test_middleware_labels_by_route_template():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: str):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    before = metrics.HTTP_REQUEST_SECONDS.count(method="GET", route="/items/{item_id}", status="200")
+    client.get("/items/a")
+    client.get("/items/b")
+    client.get("/nowhere")
+    assert metrics.HTTP_REQUEST_SECONDS.count(method="GET", route="/items/{item_id}", status="200") == before + 2
+    assert metrics.HTTP_REQUEST_SECONDS.count(method="GET", route="unmatched", status="404") >= 1
+
+
+def test_usage_callback_counts_provider_tokens():
+    pytest.importorskip("langchain_core")
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, LLMResult
+
+    from backend.utils.llm_usage import UsageCallback
+
+    message = AIMessage(content="hi", usage_metadata={"input_tokens": 120, "output_tokens": 30, "total_tokens": 150})
+    before = metrics.LLM_TOKENS.value(model="test-model", type="input")
+    UsageCallback("test-model").on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+    assert metrics.LLM_TOKENS.value(model="test-model", type="input") == before + 120
+    assert metrics.LLM_TOKENS.value(model="test-model", type="output") >= 30
@@ -0,0 +1,75 @@
+"""
+Tests for backend/chains/nlu.py: the single-pass classifier's route,
+benefit and mindset for each keyword group, including apostrophe-free and
+curly-apostrophe spellings ("dont", "don’t").
+
+Run: pytest tests/test_nlu.py -v
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.chains.nlu import ROUTES, classify  # noqa: E402
+
+
+@pytest.mark.parametrize("question, intent", [
+    ("Which plans give at least $100k medical?", "search"),
+    ("Compare TravelEasy and Scootsurance", "comparison"),
+    ("Is TravelEasy better than Scootsurance?", "comparison"),
+    ("Why is Scoot cheaper vs TravelEasy?", "comparison"),
+    ("What is trip curtailment?", "explanation"),
+    ("Can you explain the excess?", "explanation"),
+    ("Am I covered for pre-existing conditions?", "eligibility"),
+    ("What happens if I break my leg?", "scenario"),
+    ("I'm going skiing in Japan", "scenario"),
+    ("Hello there", "general"),
+])
+def test_route(question, intent):
+    result = classify(question)
+    assert result.intent == intent
+    assert result.route == ROUTES[intent]
+
+
+@pytest.mark.parametrize("question, benefit", [
+    ("How much medical cover do I get?", "overseas_medical_expenses"),
+    ("Can I get a refund if I cancel?", "trip_cancellation"),
+    ("My trip was called off", "trip_cancellation"),
+    ("Does it include the medical costs if I cancel my trip?", "overseas_medical_expenses"),
+    ("Is baggage covered?", None),
+])
+def test_benefit(question, benefit):
+    assert classify(question).benefit == benefit
+
+
+@pytest.mark.parametrize("question, mindset", [
+    ("I'm not sure, help me decide", "unsure"),
+    ("I don't know which plan", "unsure"),
+    ("I dont know which plan", "unsure"),
+    ("I'm confused about the excess", "confused"),
+    ("I don't understand", "confused"),
+    ("I dont understand the coverage", "confused"),
+    ("I don’t understand the coverage", "confused"),
+    ("This is so complicated", "confused"),
+    ("This is unfair, I'm angry", "frustrated"),
+    ("Why can't I claim for this?", "frustrated"),
+    ("Why cant I claim for this?", "frustrated"),
+    ("Why is Scoot cheaper vs TravelEasy?", "neutral"),
+    ("Why does the price change with duration?", "neutral"),
+    ("I need it asap, my flight soon", "urgent"),
+    ("I'm ready to buy", "ready"),
+    ("Ill choose TravelEasy", "ready"),
+    ("Just browsing, curious about the options", "exploratory"),
+    ("I'm worried about the risk", "cautious"),
+    ("How much medical cover do I get?", "neutral"),
+])
+def test_mindset(question, mindset):
+    assert classify(question).mindset == mindset
+
+
+def test_text_keeps_its_apostrophes():
+    # question_handler passes .text on to scenario_coverage.
+    assert classify("I Don’t Understand").text == "i don't understand"
@@ -0,0 +1,175 @@
+"""
+Tests for backend/utils/payment_reconciler.py.
+
+Stripe is replaced by StubStripe (a dict of checkout sessions), and storage
+by the in-memory and SQLite payment tables, so these run offline.
+
+Run: pytest tests/test_payment_reconciler.py -v
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils.payment_reconciler import RateLimiter, reconcile  # noqa: E402
+from backend.utils.payment_repository import MemoryTable, PaymentRepository, SQLiteTable  # noqa: E402
+
+
+class StubStripe:
+    """checkout.Session.retrieve stand-in; records every lookup."""
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.calls = []
+
+    def retrieve(self, session_id):
+        self.calls.append(session_id)
+        if session_id not in self.sessions:
+            raise RuntimeError(f"No such checkout.session: {session_id}")
+        return self.sessions[session_id]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repo(request, tmp_path):
+    table = MemoryTable() if request.param == "memory" else SQLiteTable(str(tmp_path / "payments.db"))
+    repository = PaymentRepository(table, request.param, workers=4)
+    yield repository
+    repository.close()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def pending(pid, session_id=None, age_hours=1.0):
+    record = {
+        "payment_intent_id": pid,
+        "payment_status": "pending",
+        "created_at": (datetime.utcnow() - timedelta(hours=age_hours)).isoformat(),
+    }
+    if session_id:
+        record["stripe_session_id"] = session_id
+    return record
+
+
+def seed(repo):
+    records = [
+        pending("pay_paid", "cs_paid"),
+        pending("pay_expired", "cs_expired"),
+        pending("pay_open", "cs_open"),
+        pending("pay_lookup_fails", "cs_unknown"),
+        pending("pay_abandoned", age_hours=48),
+        pending("pay_recent"),
+        {"payment_intent_id": "pay_done", "payment_status": "completed"},
+    ]
+    for record in records:
+        run(repo.put(record))
+    return StubStripe({
+        "cs_paid": {"status": "complete", "payment_status": "paid", "payment_intent": "pi_paid"},
+        "cs_expired": {"status": "expired", "payment_status": "unpaid", "payment_intent": None},
+        "cs_open": {"status": "open", "payment_status": "unpaid", "payment_intent": None},
+    })
+
+
+def test_reconcile_resolves_pending_records(repo):
+    stripe = seed(repo)
+    published = []
+    counts = run(reconcile(repo, stripe, page_size=2, rate=1000, on_update=lambda *a: published.append(a)))
+
+    status = lambda pid: run(repo.get(pid))["payment_status"]  # noqa: E731
+    assert status("pay_paid") == "completed"
+    assert status("pay_expired") == "expired"
+    assert status("pay_abandoned") == "abandoned"
+    assert status("pay_open") == "pending"
+    assert status("pay_lookup_fails") == "pending"
+    assert status("pay_recent") == "pending"
+
+    paid = run(repo.get("pay_paid"))
+    assert paid["stripe_payment_intent"] == "pi_paid" and paid["version"] == 1
+    assert "expires_at" not in paid
+    assert run(repo.find_by_stripe_intent("pi_paid"))["payment_intent_id"] == "pay_paid"
+    assert run(repo.get("pay_expired"))["expires_at"] > time.time()
+
+    assert sorted(stripe.calls) == ["cs_expired", "cs_open", "cs_paid", "cs_unknown"]
+    assert counts["scanned"] == 6
+    assert counts["written"] == 3
+    assert counts["errors"] == 1
+    assert counts["unchanged"] == 2
+    assert sorted(published) == [("pay_abandoned", "abandoned"), ("pay_expired", "expired"), ("pay_paid", "completed")]
+
+
+def test_reconcile_is_idempotent(repo):
+    stripe = seed(repo)
+    run(reconcile(repo, stripe, rate=1000))
+    counts = run(reconcile(repo, stripe, rate=1000))
+    assert counts["written"] == 0
+    assert counts["scanned"] == 3  # open, failed lookup, recent
+
+
+def test_records_changed_during_the_scan_are_skipped(repo):
+    stripe = seed(repo)
+    lookup = stripe.retrieve
+
+    def racing_retrieve(session_id):
+        # While Stripe is consulted: the webhook completes pay_expired and
+        # /stripe-checkout stores a session on pay_abandoned.
+        if session_id == "cs_expired":
+            asyncio.run(repo.update("pay_expired", {"payment_status": "completed"}))
+            asyncio.run(repo.update("pay_abandoned", {"stripe_session_id": "cs_new"}))
+        return lookup(session_id)
+
+    stripe.retrieve = racing_retrieve
+    published = []
+    counts = run(reconcile(repo, stripe, page_size=10, rate=1000, on_update=lambda *a: published.append(a)))
+
+    assert run(repo.get("pay_expired"))["payment_status"] == "completed"
+    abandoned = run(repo.get("pay_abandoned"))
+    assert (abandoned["payment_status"], abandoned["stripe_session_id"]) == ("pending", "cs_new")
+    assert counts["conflicts"] == 2 and counts["written"] == 1
+    assert published == [("pay_paid", "completed")]
+
+
+def test_dry_run_writes_nothing(repo):
+    stripe = seed(repo)
+    counts = run(reconcile(repo, stripe, rate=1000, dry_run=True))
+    assert counts["written"] == 0
+    assert counts["completed"] == 1 and counts["expired"] == 1 and counts["abandoned"] == 1
+    assert run(repo.get("pay_paid"))["payment_status"] == "pending"
+
+
+def test_expired_ttl_records_are_purged(repo):
+    stripe = seed(repo)
+    run(repo.put({"payment_intent_id": "pay_old_expired", "payment_status": "expired", "expires_at": 1}))
+    counts = run(reconcile(repo, stripe, rate=1000))
+    assert counts["purged"] == 1
+    assert run(repo.get("pay_old_expired")) is None
+
+
+def test_rate_limiter_bounds_stripe_calls():
+    sessions = {f"cs_{i}": {"status": "open"} for i in range(12)}
+    repository = PaymentRepository(MemoryTable(), "memory", workers=4)
+    for i in range(12):
+        run(repository.put(pending(f"pay_{i:02d}", f"cs_{i}")))
+
+    start = time.perf_counter()
+    counts = run(reconcile(repository, StubStripe(sessions), concurrency=8, rate=20))
+    elapsed = time.perf_counter() - start
+    repository.close()
+
+    # Burst of 20 tokens covers all 12; at 10/s with burst 2, 12 calls need >= 1s.
+    assert counts["stripe_calls"] == 12 and elapsed < 1.0
+    limiter = RateLimiter(10, burst=2)
+
+    async def acquire_all():
+        for _ in range(12):
+            await limiter.acquire()
+
+    start = time.perf_counter()
+    run(acquire_all())
+    assert time.perf_counter() - start >= 0.95
@@ -0,0 +1,207 @@
+"""
+Backend conformance tests for backend/utils/payment_repository.py.
+
+The same scenarios run against every backend; they must behave identically.
+The in-memory and SQLite backends always run. DynamoDB runs when
+DDB_ENDPOINT points at a local DynamoDB with the payments table created.
+
+Run: pytest tests/test_payment_repository.py -v
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils.payment_index import backfill_pointers  # noqa: E402
+from backend.utils.payment_repository import (  # noqa: E402
+    DynamoTable,
+    MemoryTable,
+    PaymentRepository,
+    SQLiteTable,
+)
+
+BACKENDS = ["memory", "sqlite"] + (["dynamodb"] if os.getenv("DDB_ENDPOINT") else [])
+
+
+@pytest.fixture(params=BACKENDS)
+def repo(request, tmp_path):
+    if request.param == "memory":
+        table = MemoryTable()
+    elif request.param == "sqlite":
+        table = SQLiteTable(str(tmp_path / "payments.db"))
+    else:
+        table = DynamoTable(
+            os.getenv("DYNAMODB_PAYMENTS_TABLE", "lea-payments-local"),
+            region=os.getenv("AWS_REGION", "ap-southeast-1"),
+            endpoint_url=os.getenv("DDB_ENDPOINT"),
+        )
+    repository = PaymentRepository(table, request.param, workers=4)
+    yield repository
+    repository.close()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def new_id():
+    return f"test_payment_{uuid.uuid4().hex[:12]}"
+
+
+def test_put_get_delete(repo):
+    pid = new_id()
+    record = {"payment_intent_id": pid, "payment_status": "pending", "amount": 4250, "currency": "SGD"}
+    assert run(repo.get(pid)) is None
+
+    run(repo.put(record))
+    assert run(repo.get(pid)) == record
+
+    run(repo.delete(pid))
+    assert run(repo.get(pid)) is None
+
+
+def test_update_sets_fields_without_touching_others(repo):
+    pid = new_id()
+    run(repo.put({"payment_intent_id": pid, "payment_status": "pending"}))
+    run(repo.update(pid, {"stripe_session_id": "cs_test_1", "payment_status": "processing"}))
+    assert run(repo.get(pid)) == {
+        "payment_intent_id": pid,
+        "payment_status": "processing",
+        "stripe_session_id": "cs_test_1",
+        "version": 1,
+    }
+
+
+def test_update_bumps_version_so_stale_versioned_writes_retry(repo):
+    pid = new_id()
+    run(repo.put({"payment_intent_id": pid, "payment_status": "pending"}))
+    webhook_copy = run(repo.get(pid))  # webhook reads before checkout stores the session id
+
+    run(repo.update(pid, {"stripe_session_id": "cs_test_2"}))
+    assert not run(repo.put_versioned({**webhook_copy, "payment_status": "completed", "version": 1}, None))
+
+    fresh = run(repo.get(pid))
+    assert run(repo.put_versioned({**fresh, "payment_status": "completed", "version": 2}, fresh["version"]))
+    assert run(repo.get(pid))["stripe_session_id"] == "cs_test_2"
+
+    run(repo.update(pid, {"note": "after"}))
+    assert run(repo.get(pid))["version"] == 3
+
+
+def test_returned_records_are_copies(repo):
+    pid = new_id()
+    run(repo.put({"payment_intent_id": pid, "payment_status": "pending"}))
+    record = run(repo.get(pid))
+    record["payment_status"] = "mutated"
+    assert run(repo.get(pid))["payment_status"] == "pending"
+
+
+def test_find_by_stripe_intent_via_metadata_pointer_and_backfill(repo):
+    pid, stripe_pi = new_id(), f"pi_{uuid.uuid4().hex[:16]}"
+
+    # Metadata id: direct keyed read
+    run(repo.put({"payment_intent_id": pid, "payment_status": "pending"}))
+    assert run(repo.find_by_stripe_intent(stripe_pi, pid))["payment_intent_id"] == pid
+
+    # Pointer written by put() once the record carries the Stripe intent
+    run(repo.put({"payment_intent_id": pid, "payment_status": "completed", "stripe_payment_intent": stripe_pi}))
+    assert run(repo.find_by_stripe_intent(stripe_pi))["payment_status"] == "completed"
+
+    # Legacy record without a pointer: the lookup doesn't scan for it; the
+    # one-off backfill writes its pointer
+    legacy, legacy_pi = new_id(), f"pi_{uuid.uuid4().hex[:16]}"
+    repo.table.put_item(Item={"payment_intent_id": legacy, "stripe_payment_intent": legacy_pi})
+    assert run(repo.find_by_stripe_intent(legacy_pi)) is None
+    assert backfill_pointers(repo.table, dry_run=True)["backfilled"] >= 1
+    assert run(repo.find_by_stripe_intent(legacy_pi)) is None
+    backfill_pointers(repo.table, page_size=2)
+    assert run(repo.find_by_stripe_intent(legacy_pi))["payment_intent_id"] == legacy
+    assert repo.table.get_item(Key={"payment_intent_id": f"stripe#{legacy_pi}"})["Item"]["target_id"] == legacy
+    assert backfill_pointers(repo.table)["backfilled"] == 0
+
+    assert run(repo.find_by_stripe_intent(f"pi_missing_{uuid.uuid4().hex[:8]}")) is None
+
+
+def test_scan_paginates(repo):
+    if repo.backend == "dynamodb":
+        pytest.skip("page size is set by DynamoDB")
+    ids = sorted(new_id() for _ in range(5))
+    for pid in ids:
+        repo.table.put_item(Item={"payment_intent_id": pid, "payment_status": "pending"})
+
+    seen, kwargs = [], {"Limit": 2}
+    while True:
+        page = repo.table.scan(**kwargs)
+        seen += [item["payment_intent_id"] for item in page["Items"]]
+        if "LastEvaluatedKey" not in page:
+            break
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+    assert seen == ids
+
+
+def test_latency_histograms_record_each_operation(repo):
+    pid = new_id()
+    run(repo.put({"payment_intent_id": pid}))
+    run(repo.get(pid))
+    run(repo.get(pid))
+    stats = repo.latency_stats()
+    assert stats["get"]["count"] == 2
+    assert stats["put"]["count"] == 1
+    assert sum(stats["get"]["buckets"].values()) == 2
+    assert stats["get"]["p99_ms"] is not None
+
+
+def test_put_versioned_rejects_stale_writers(repo):
+    pid = new_id()
+    run(repo.put({"payment_intent_id": pid, "payment_status": "pending"}))
+    first, second = run(repo.get(pid)), run(repo.get(pid))
+
+    assert run(repo.put_versioned({**first, "payment_status": "completed", "version": 1}, None))
+    assert not run(repo.put_versioned({**second, "payment_status": "expired", "version": 1}, None))
+    assert run(repo.get(pid))["payment_status"] == "completed"
+
+    current = run(repo.get(pid))
+    assert run(repo.put_versioned({**current, "note": "x", "version": 2}, 1))
+    assert not run(repo.put_versioned({**current, "note": "y", "version": 2}, 1))
+    assert run(repo.get(pid))["note"] == "x"
+
+
+def test_iter_by_status_pages_through_matches(repo):
+    if repo.backend == "dynamodb":
+        pytest.skip("table may hold records from other runs")
+    ids = sorted(new_id() for _ in range(5))
+    for i, pid in enumerate(ids):
+        run(repo.put({"payment_intent_id": pid, "payment_status": "pending" if i % 2 == 0 else "completed"}))
+
+    async def collect():
+        return [page async for page in repo.iter_by_status("pending", page_size=2)]
+
+    pages = run(collect())
+    assert [r["payment_intent_id"] for page in pages for r in page] == ids[0::2]
+
+
+def test_batch_put_writes_records_and_pointers(repo):
+    records = [{"payment_intent_id": new_id(), "payment_status": "completed",
+                "stripe_payment_intent": f"pi_{uuid.uuid4().hex[:16]}"} for _ in range(30)]
+    run(repo.batch_put(records))
+    for record in records:
+        assert run(repo.get(record["payment_intent_id"])) == record
+        assert run(repo.find_by_stripe_intent(record["stripe_payment_intent"]))["payment_intent_id"] == record["payment_intent_id"]
+
+
+def test_purge_expired_drops_only_past_ttl(repo):
+    if repo.backend == "dynamodb":
+        pytest.skip("DynamoDB TTL deletes in the background")
+    expired, live, no_ttl = new_id(), new_id(), new_id()
+    run(repo.put({"payment_intent_id": expired, "expires_at": 1}))
+    run(repo.put({"payment_intent_id": live, "expires_at": 4_000_000_000}))
+    run(repo.put({"payment_intent_id": no_ttl}))
+    assert run(repo.purge_expired()) == 1
+    assert run(repo.get(expired)) is None
+    assert run(repo.get(live)) is not None
+    assert run(repo.get(no_ttl)) is not None
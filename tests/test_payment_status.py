@@ -0,0 +1,187 @@
+"""
+Tests for backend/utils/payment_status.py (TTL status cache, long-poll
+waiters, SSE stream), the single set of final statuses shared with the
+webhook consumer in backend/api.py, and the API's test-record cleanup().
+
+Run: pytest tests/test_payment_status.py -v
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils.payment_repository import MemoryTable, PaymentRepository  # noqa: E402
+from backend.utils.payment_status import FINAL_STATUSES, NOT_FOUND, PaymentStatusHub  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def new_id() -> str:
+    return f"pi_test_{uuid.uuid4().hex[:12]}"
+
+
+@pytest.fixture
+def repo():
+    return PaymentRepository(MemoryTable(), "memory")
+
+
+def _pending(repo) -> str:
+    pid = new_id()
+    run(repo.put({"payment_intent_id": pid, "payment_status": "pending"}))
+    return pid
+
+
+async def _later(seconds, fn, *args):
+    await asyncio.sleep(seconds)
+    result = fn(*args)
+    if asyncio.iscoroutine(result):
+        await result
+
+
+def test_only_completed_is_final():
+    # failed/expired/abandoned can still turn into completed; waiters must not stop on them.
+    assert FINAL_STATUSES == {"completed"}
+
+
+def test_get_caches_until_ttl(repo):
+    pid = _pending(repo)
+    hub = PaymentStatusHub(repo, ttl_seconds=60)
+
+    async def scenario():
+        assert await hub.get(pid) == "pending"
+        await repo.update(pid, {"payment_status": "completed"})
+        assert await hub.get(pid) == "pending"  # served from cache
+        hub.ttl_seconds = 0
+        hub._cache.clear()
+        assert await hub.get(pid) == "completed"
+        assert await hub.get(new_id()) == NOT_FOUND
+
+    run(scenario())
+    assert (hub.hits, hub.misses) == (1, 3)
+
+
+def test_wait_returns_at_once_when_status_already_differs(repo):
+    pid = _pending(repo)
+    hub = PaymentStatusHub(repo)
+    assert run(hub.wait_for_change(pid, None, timeout=5)) == "pending"
+
+
+def test_publish_wakes_waiters(repo):
+    pid = _pending(repo)
+    hub = PaymentStatusHub(repo, recheck_seconds=30)
+
+    async def scenario():
+        waiters = [hub.wait_for_change(pid, "pending", timeout=5) for _ in range(2)]
+        publisher = _later(0.05, hub.publish, pid, "completed")
+        started = asyncio.get_running_loop().time()
+        first, second, _ = await asyncio.gather(*waiters, publisher)
+        return first, second, asyncio.get_running_loop().time() - started
+
+    first, second, elapsed = run(scenario())
+    assert first == second == "completed"
+    assert elapsed < 1
+    assert hub.stats()["waiting"] == 0 and not hub._waiters
+
+
+def test_wait_times_out_with_the_current_status(repo):
+    pid = _pending(repo)
+    hub = PaymentStatusHub(repo)
+    assert run(hub.wait_for_change(pid, "pending", timeout=0.1)) == "pending"
+    assert hub.stats()["waiting"] == 0
+
+
+def test_recheck_sees_writes_from_another_worker(repo):
+    # No publish() in this process: the waiter must re-read the store.
+    pid = _pending(repo)
+    hub = PaymentStatusHub(repo, ttl_seconds=60, recheck_seconds=0.05)
+
+    async def scenario():
+        writer = _later(0.02, repo.update, pid, {"payment_status": "completed"})
+        status, _ = await asyncio.gather(hub.wait_for_change(pid, "pending", timeout=5), writer)
+        return status
+
+    assert run(scenario()) == "completed"
+
+
+def test_stream_follows_changes_until_final(repo):
+    pid = _pending(repo)
+    hub = PaymentStatusHub(repo)
+
+    async def scenario():
+        seen = []
+
+        async def publisher():
+            # Like the webhook consumer: persist, then publish.
+            for delay, status in ((0.05, "failed"), (0.15, "completed")):  # declined, then retried
+                await asyncio.sleep(delay)
+                await repo.update(pid, {"payment_status": status})
+                hub.publish(pid, status)
+
+        async def reader():
+            async for status in hub.stream(pid, max_seconds=5, heartbeat_seconds=0.1):
+                seen.append(status)
+
+        await asyncio.gather(reader(), publisher())
+        return seen
+
+    seen = run(scenario())
+    assert seen[0] == "pending"
+    assert [s for s in seen if s is not None] == ["pending", "failed", "completed"]
+    assert None in seen  # heartbeat while still failed
+
+
+def test_stream_stops_at_max_seconds_and_for_unknown_ids(repo):
+    pid = _pending(repo)
+    hub = PaymentStatusHub(repo)
+
+    async def collect(payment_intent_id, max_seconds):
+        return [s async for s in hub.stream(payment_intent_id, max_seconds, heartbeat_seconds=0.05)]
+
+    seen = run(collect(pid, 0.12))
+    assert seen[0] == "pending" and set(seen[1:]) == {None}
+    assert run(collect(new_id(), 5)) == [NOT_FOUND]
+
+
+def test_webhook_completes_a_failed_payment_but_never_reopens_it(api, repo, monkeypatch):
+    monkeypatch.setattr(api, "payments", repo)
+    monkeypatch.setattr(api, "payment_status", PaymentStatusHub(repo))
+    pid = new_id()
+
+    async def scenario():
+        await api.payments.put({"payment_intent_id": pid, "payment_status": "pending"})
+        await api._transition_payment(await api.payments.get(pid), {"payment_status": "failed"})
+
+        waiter = asyncio.ensure_future(api.wait_for_payment_confirmation(pid, timeout=5))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()  # a failed payment can still be retried
+        assert await api._transition_payment(await api.payments.get(pid), {"payment_status": "completed"})
+        assert await waiter
+
+        assert not await api._transition_payment(await api.payments.get(pid), {"payment_status": "expired"})
+        return await api.payments.get(pid)
+
+    assert run(scenario())["payment_status"] == "completed"
+
+
+def test_cleanup_deletes_through_the_repository(api, repo, monkeypatch):
+    monkeypatch.setattr(api, "payments", repo)
+    pid = _pending(repo)
+    assert run(api.cleanup(pid)) is True
+    assert run(repo.get(pid)) is None
+
+
+def test_cleanup_logs_failures(api, repo, monkeypatch, caplog):
+    async def broken(payment_intent_id):
+        raise RuntimeError("table gone")
+
+    monkeypatch.setattr(repo, "delete", broken)
+    monkeypatch.setattr(api, "payments", repo)
+    assert run(api.cleanup("pi_missing")) is False
+    assert "table gone" in caplog.text
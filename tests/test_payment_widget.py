@@ -0,0 +1,87 @@
+"""
+Tests for the live status panel in app/components/payment_widget.py: it
+keeps long-polling through non-final statuses (failed -> completed) and
+stops once the backend's final status arrives.
+
+Run: pytest tests/test_payment_widget.py -v
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+pytest.importorskip("streamlit")
+
+from backend.utils.payment_status import FINAL_STATUSES  # noqa: E402
+from components import payment_widget  # noqa: E402
+
+API = "http://api.test"
+
+
+class FakeStreamlit:
+    """Records what the status panel shows; session_state is a plain dict."""
+
+    def __init__(self):
+        self.session_state = {}
+        self.shown = []
+        self.balloons_shown = 0
+        for kind in ("success", "info", "error", "warning", "caption"):
+            setattr(self, kind, lambda text, kind=kind: self.shown.append((kind, text)))
+
+    def balloons(self):
+        self.balloons_shown += 1
+
+
+@pytest.fixture
+def ui(monkeypatch):
+    fake = FakeStreamlit()
+    monkeypatch.setattr(payment_widget, "st", fake)
+    return fake
+
+
+@pytest.fixture
+def api_statuses(monkeypatch):
+    """Serve /payment-status answers from a list; records each request's params."""
+    answers, calls = [], []
+
+    def get(url, params=None, timeout=None):
+        calls.append(params)
+        return SimpleNamespace(status_code=200, json=lambda status=answers.pop(0): {"payment_status": status})
+
+    monkeypatch.setattr(payment_widget.requests, "get", get)
+    return answers, calls
+
+
+def _poll():
+    render = getattr(payment_widget._render_payment_status, "__wrapped__", payment_widget._render_payment_status)
+    render(API, "pi_1")
+
+
+def test_widget_uses_the_backend_final_statuses():
+    assert payment_widget.FINAL_STATUSES is FINAL_STATUSES
+
+
+def test_failed_then_completed_keeps_listening(ui, api_statuses):
+    answers, calls = api_statuses
+    answers.extend(["pending", "failed", "completed"])
+
+    _poll()
+    _poll()
+    assert ui.session_state["payment_status_pi_1"] == "failed"
+    assert ui.shown[-1][0] == "error"
+
+    _poll()  # still asking after "failed": the card can be retried
+    assert calls[-1] == {"wait": payment_widget.STATUS_WAIT_SECONDS, "status": "failed"}
+    assert ui.session_state["payment_status_pi_1"] == "completed"
+    assert ui.session_state["payment_confirmed"] is True
+    assert ui.balloons_shown == 1
+
+    _poll()  # final: no further requests
+    assert len(calls) == 3
+    assert ui.shown[-1] == ("success", "✅ Payment completed successfully!")
@@ -0,0 +1,64 @@
+"""
+Tests for backend/chains/plan_search.py (coverage filters over the
+comparison matrix, question parsing) and the search routing in
+backend/chains/nlu.py.
+
+Run: pytest tests/test_plan_search.py -v
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.chains.nlu import classify  # noqa: E402
+from backend.chains.plan_search import answer_plan_query, parse_plan_query, search_plans  # noqa: E402
+
+MEDICAL = "overseas_medical_expenses"
+CANCELLATION = "trip_cancellation"
+DENTAL = "emergency_dental_expenses_accident"
+
+
+@pytest.mark.parametrize("question, min_limits, covers", [
+    ("Which plans give at least $100k medical and cover dental?", {MEDICAL: 100000.0}, [DENTAL]),
+    ("plans with medical coverage of at least 150,000", {MEDICAL: 150000.0}, []),
+    ("medical >= 100k and cancellation over $5,000", {MEDICAL: 100000.0, CANCELLATION: 5000.0}, []),
+    ("plans with more than 5k of cancellation cover", {CANCELLATION: 5000.0}, []),
+    ("Medical ≥ $80K please", {MEDICAL: 80000.0}, []),
+])
+def test_adjacent_benefit_and_comparator_become_filters(question, min_limits, covers):
+    assert parse_plan_query(question) == (min_limits, covers)
+
+
+def test_minimum_without_an_amount_is_not_a_filter():
+    # Misroute 1: "minimum" + "medical" used to filter medical >= $2,000 (the trip cost).
+    question = "Is the minimum medical cover enough for a 5 day trip to Japan costing 2000?"
+    assert parse_plan_query(question) == ({}, [])
+    assert answer_plan_query(question) is None
+    assert classify(question).route != "search_plans"
+
+
+def test_unrelated_numbers_are_not_assigned_to_benefits():
+    # Misroute 2: any number >= 100 went to the nearest benefit word.
+    question = "Which plans have at least $100k medical for my $3000 trip with cancellation?"
+    assert parse_plan_query(question) == ({MEDICAL: 100000.0}, [CANCELLATION])
+    assert classify("Which plans with medical suit a 2000 dollar trip?").route != "search_plans"
+
+
+def test_search_keywords_with_a_threshold_route_to_search():
+    assert classify("Which plans give at least $100k medical?").route == "search_plans"
+    assert classify("which plans cover dental?").route != "search_plans"
+
+
+def test_search_plans_filters_and_sorts():
+    plans = search_plans(min_limits={"medical": 80000}, sort_by="cancellation")
+    assert [p["product"] for p in plans] == ["TravelEasy Policy QTD032212", "TravelEasy Pre-Ex Policy QTD032212-PX"]
+    assert plans[0]["limits"] == {MEDICAL: 100000.0, CANCELLATION: 5000.0}
+
+
+def test_answer_lists_matching_plans():
+    answer = answer_plan_query("plans with at least $60k medical and cover dental")
+    assert answer.startswith("**Plans with overseas medical expenses ≥ $60,000 and covers")
+    assert "Scootsurance QSR022206_updated" in answer
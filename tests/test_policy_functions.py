@@ -38,7 +38,7 @@ context_data = {
 
 # 🔹 Test 1 — Comparison
 print("\n🧩 TEST 1: Compare Medical Coverage")
-response = compare_policies(plan_a, plan_b, "medical_coverage")
+response = compare_policies("medical_coverage")
 print("Response:\n", response)
 
 # 🔹 Test 2 — Explanation
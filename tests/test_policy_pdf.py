@@ -0,0 +1,85 @@
+"""
+Tests for GET /policy_pdf/{filename} in backend/api.py (precomputed ETags,
+304 revalidation, byte ranges, path traversal).
+
+Run: pytest tests/test_policy_pdf.py -v
+"""
+
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture
+def pdf_dir(api, tmp_path, monkeypatch):
+    (tmp_path / "Sample Policy.pdf").write_bytes(b"%PDF-1.4\n" + bytes(range(256)) * 40 + b"\n%%EOF\n")
+    (tmp_path / "notes.txt").write_text("not a pdf")
+    monkeypatch.setattr(api, "POLICY_PDF_DIR", str(tmp_path))
+    monkeypatch.setattr(api, "PDF_MANIFEST_PATH", str(tmp_path / "missing_manifest.json"))
+    monkeypatch.setattr(api, "_pdf_etags", {})
+    return tmp_path
+
+
+def test_etags_are_precomputed_at_startup(api, pdf_dir, monkeypatch):
+    assert api.precompute_pdf_etags() == 1
+    assert "Sample Policy.pdf" in api._pdf_etags
+
+    def no_hashing(path):
+        raise AssertionError("hashed on the request path")
+
+    monkeypatch.setattr(api, "file_sha256", no_hashing)
+    from fastapi.testclient import TestClient
+
+    response = TestClient(api.app).get("/policy_pdf/Sample Policy.pdf")
+    assert response.status_code == 200
+
+
+def test_full_response_has_validators(client, pdf_dir):
+    response = client.get("/policy_pdf/Sample Policy.pdf")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.headers["etag"].startswith('"') and len(response.headers["etag"]) == 66
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.content == (pdf_dir / "Sample Policy.pdf").read_bytes()
+
+
+def test_manifest_hash_is_used_when_it_matches(api, client, pdf_dir, monkeypatch):
+    stat = os.stat(pdf_dir / "Sample Policy.pdf")
+    manifest = pdf_dir / "manifest.json"
+    manifest.write_text(json.dumps({
+        "Sample Policy.pdf": {"sha256": "ab" * 32, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns},
+    }))
+    monkeypatch.setattr(api, "PDF_MANIFEST_PATH", str(manifest))
+    assert client.get("/policy_pdf/Sample Policy.pdf").headers["etag"] == f'"{"ab" * 32}"'
+
+
+def test_if_none_match_returns_304(client, pdf_dir):
+    etag = client.get("/policy_pdf/Sample Policy.pdf").headers["etag"]
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get("/policy_pdf/Sample Policy.pdf", headers={"If-None-Match": header})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+    assert client.get("/policy_pdf/Sample Policy.pdf", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_range_returns_206(client, pdf_dir):
+    data = (pdf_dir / "Sample Policy.pdf").read_bytes()
+    response = client.get("/policy_pdf/Sample Policy.pdf", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 100-199/{len(data)}"
+    assert response.content == data[100:200]
+
+
+def test_replaced_pdf_gets_a_new_etag(client, pdf_dir):
+    before = client.get("/policy_pdf/Sample Policy.pdf").headers["etag"]
+    path = pdf_dir / "Sample Policy.pdf"
+    path.write_bytes(path.read_bytes() + b"% amended\n")
+    assert client.get("/policy_pdf/Sample Policy.pdf").headers["etag"] != before
+
+
+@pytest.mark.parametrize("name", ["../requirements.txt", "..%2Frequirements.txt", "%2E%2E%2Fapi.py", "missing.pdf"])
+def test_traversal_and_unknown_files_are_404(client, pdf_dir, name):
+    assert client.get(f"/policy_pdf/{name}").status_code == 404
@@ -0,0 +1,45 @@
+"""
+Tests for backend/chains/question_handler.py routing and
+policy_comparator.load_policy(), which resolves products through the
+product registry instead of hard-coded ids.
+
+Run: pytest tests/test_question_handler.py -v
+"""
+
+import dataclasses
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.chains.policy_comparator import load_all_policies, load_policy  # noqa: E402
+from backend.chains.question_handler import handle_question  # noqa: E402
+from backend.utils import product_registry  # noqa: E402
+from backend.utils.product_registry import ProductRegistry, get_registry  # noqa: E402
+
+
+@pytest.fixture
+def renamed_registry(monkeypatch):
+    """Same products under new ids: nothing may depend on "traveleasy"/"scootsurance"."""
+    products = [dataclasses.replace(p, id=f"sku-{i}") for i, p in enumerate(get_registry())]
+    monkeypatch.setattr(product_registry, "_registry", ProductRegistry(products))
+    monkeypatch.setattr(product_registry, "_registry_mtime", product_registry.products_mtime())
+
+
+def test_load_policy_resolves_aliases():
+    taxonomy = load_all_policies()["Scootsurance QSR022206_updated"]
+    assert load_policy("Scootsurance") is taxonomy
+    assert load_policy() is taxonomy  # every product shares the combined taxonomy
+    assert load_policy("Acme Gold") == {}
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("What does trip cancellation mean?", "Trip Cancellation"),
+    ("Am I covered for pre-existing conditions?", "pre-existing"),
+    ("If I break my leg skiing in Japan, what happens?", ""),
+    ("Compare medical", "### Comparison: overseas_medical_expenses"),
+])
+def test_routes_without_hard_coded_product_ids(renamed_registry, question, expected):
+    assert expected.lower() in handle_question(question).lower()
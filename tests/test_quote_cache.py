@@ -0,0 +1,98 @@
+"""
+Tests for backend/utils/quote_cache.py: canonical trip keys, LRU eviction
+and invalidation when the taxonomy or data/products.json changes.
+
+Run: pytest tests/test_quote_cache.py -v
+"""
+
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils import product_registry, quote_engine  # noqa: E402
+from backend.utils.quote_cache import QuoteCache, trip_signature  # noqa: E402
+
+TRIP = {"duration": 10, "trip_cost": 1500, "passenger_details": "2 adults", "destination": "Japan"}
+
+
+@pytest.fixture
+def products(tmp_path, monkeypatch):
+    """A private copy of data/products.json the test can edit."""
+    path = tmp_path / "products.json"
+    shutil.copy(product_registry.PRODUCTS_PATH, path)
+    monkeypatch.setattr(product_registry, "PRODUCTS_PATH", str(path))
+    monkeypatch.setattr(product_registry, "_registry", None)
+    monkeypatch.setattr(quote_engine, "_rate_table", None)
+
+    def edit(update):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        for product in data["products"]:
+            product.update(update.get(product["id"], {}))
+        path.write_text(json.dumps(data), encoding="utf-8")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    return edit
+
+
+def _price(result, plan):
+    return next(q["price"] for q in result["quotes"] if q["plan"] == plan)
+
+
+def test_signature_ignores_formatting_noise():
+    noisy = {"duration": "10", "trip_cost": "$1,500.00", "passenger_details": "2 Adults",
+             "destination": "  japan ", "traveller_name": "A. Tan"}
+    assert trip_signature(noisy) == trip_signature(TRIP)
+    assert trip_signature({**TRIP, "duration": 11}) != trip_signature(TRIP)
+
+
+def test_hits_return_independent_copies(products):
+    cache = QuoteCache()
+    first = cache.get_quotes(TRIP)
+    first["quotes"].clear()
+    assert cache.get_quotes(TRIP)["quotes"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lru_evicts_the_oldest_entry(products):
+    cache = QuoteCache(max_entries=2)
+    for duration in (1, 10, 20):
+        cache.get_quotes({**TRIP, "duration": duration})
+    cache.get_quotes({**TRIP, "duration": 1})
+    assert cache.stats()["entries"] == 2
+    assert cache.misses == 4
+
+
+def test_daily_rate_change_in_products_json_invalidates(products):
+    cache = QuoteCache()
+    before = _price(cache.get_quotes(TRIP), "TravelEasy Policy QTD032212")
+    products({"traveleasy": {"daily_rate": 10.0}})
+
+    after = _price(cache.get_quotes(TRIP), "TravelEasy Policy QTD032212")
+    assert before != after
+    assert after == quote_engine.format_amount(2 * 10 * 10.0, cents=True)
+    assert cache.hits == 0
+
+
+def test_display_name_change_in_products_json_invalidates(products):
+    cache = QuoteCache()
+    cache.get_quotes(TRIP)
+    products({"scootsurance": {"display_name": "Scootsurance Lite"}})
+    plans = [q["plan"] for q in cache.get_quotes(TRIP)["quotes"]]
+    assert "Scootsurance Lite" in plans
+    assert cache.stats()["entries"] == 1
+
+
+def test_half_written_products_json_keeps_previous_registry(products, capsys):
+    registry = product_registry.get_registry()
+    path = product_registry.PRODUCTS_PATH
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"products": [')
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000_000))
+    assert product_registry.get_registry() is registry
+    assert "Could not reload" in capsys.readouterr().out
@@ -0,0 +1,156 @@
+"""
+Tests for backend/utils/quote_engine.py: vectorised prices and
+recommendations match the per-trip scalar rules, price strings keep the
+"$1234.00" format clients parse, and party parsing/pricing (traveller
+factors, family cap, parties without an adult), and malformed prices or
+limits are treated as unknown rather than $0.
+
+Run: pytest tests/test_quote_engine.py -v
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils import quote_engine as qe  # noqa: E402
+from backend.utils.policy_extractor import calculate_dynamic_price, get_recommended_plan  # noqa: E402
+
+DURATIONS = list(range(1, 121)) + [0, 365]
+
+
+def _scalar_price(product: str, duration: int) -> float:
+    # The per-trip rule /generate_quotes used before the engine.
+    rate = qe.daily_rate(product)
+    if duration <= 7:
+        return rate * 7
+    if duration <= 30:
+        return rate * duration
+    return rate * 30 + rate * (duration - 30) * 0.7
+
+
+@pytest.fixture(scope="module")
+def table():
+    return qe.get_rate_table()
+
+
+def test_batch_prices_match_scalar_rule(table):
+    prices = qe.price_batch(DURATIONS, table)
+    assert prices.shape == (len(DURATIONS), len(table.products))
+    for n, duration in enumerate(DURATIONS):
+        for p, product in enumerate(table.products):
+            assert prices[n, p] == pytest.approx(_scalar_price(product, duration))
+            assert calculate_dynamic_price(product, duration) == pytest.approx(prices[n, p])
+
+
+def test_batch_recommendations_match_scalar_pick(table):
+    rng = np.random.default_rng(7)
+    durations = rng.integers(1, 90, size=200)
+    costs = rng.uniform(200, 8000, size=200)
+    best = qe.recommend_batch(qe.price_batch(durations, table), costs, qe.high_value_mask(table))
+
+    medical = table.coverage[:, qe.COVERAGE_FIELDS.index("medical")]
+    for n in range(len(durations)):
+        quotes = [
+            {"plan": product, "price": f"${_scalar_price(product, int(durations[n])):.2f}",
+             "medical": qe.format_amount(medical[p])}
+            for p, product in enumerate(table.products)
+        ]
+        assert get_recommended_plan(quotes, costs[n]) == table.products[best[n]]
+
+
+def test_price_strings_keep_the_scalar_format(table):
+    assert qe.format_amount(1062.37, cents=True) == "$1062.37"
+    assert qe.format_amount(100000) == "$100,000"
+
+    quotes = qe.build_quotes({"duration": 200, "trip_cost": 1000})["quotes"]
+    for quote, product in zip(quotes, table.products):
+        assert quote["price"] == f"${_scalar_price(product, 200):.2f}"
+    assert any("," not in q["price"] and float(q["price"][1:]) >= 1000 for q in quotes)
+
+
+@pytest.mark.parametrize("trip, party", [
+    ({"passenger_details": "2 adults, 1 child, 1 infant"}, (2, 1, 1)),
+    ({"passenger_details": "1 Adult, 2 kids and 2 babies"}, (1, 2, 2)),
+    ({"passenger_details": "3 children"}, (0, 3, 0)),
+    ({"passenger_details": "family trip", "passenger_count": "4"}, (4, 0, 0)),
+    ({"passenger_count": None}, (1, 0, 0)),
+    ({}, (1, 0, 0)),
+])
+def test_parse_party(trip, party):
+    assert qe.parse_party(trip) == party
+
+
+def test_price_parties_applies_traveller_factors_and_family_cap(table):
+    pricing = qe.price_parties([10, 10, 10], [(3, 0, 0), (2, 1, 1), (2, 3, 0)], table)
+    adult = qe.price_batch([10], table)[0]
+
+    assert pricing.total[0] == pytest.approx(3 * adult)
+    assert not pricing.family_capped[0].any()
+    assert pricing.total[1] == pytest.approx(2.5 * adult)  # infant free, child half
+    assert not pricing.family_capped[1].any()
+    assert pricing.total[2] == pytest.approx(qe.FAMILY_CAP_FACTOR * adult)  # 3.5 adults, capped
+    assert pricing.family_capped[2].all()
+
+
+@pytest.mark.parametrize("party, counts, adult_premiums", [
+    ((0, 0, 1), [1, 0, 0], 1.0),
+    ((0, 2, 0), [1, 1, 0], 1.5),
+    ((0, 1, 2), [1, 0, 2], 1.0),
+])
+def test_party_without_an_adult_pays_an_adult_premium(table, party, counts, adult_premiums):
+    parties = np.array([party])
+    pricing = qe.price_parties([5], parties, table)
+    assert pricing.counts[0].tolist() == counts
+    assert pricing.total[0] == pytest.approx(adult_premiums * qe.price_batch([5], table)[0])
+    assert parties.tolist() == [list(party)]  # caller's array untouched
+
+
+def test_infant_only_quote_is_not_free():
+    quotes = qe.build_quotes({"duration": 5, "passenger_details": "1 infant"})
+    assert quotes["travellers"] == {"adults": 1, "children": 0, "infants": 0}
+    assert all(qe.parse_amount(q["price"]) > 0 for q in quotes["quotes"])
+
+
+def test_malformed_limit_is_unknown_not_zero(monkeypatch):
+    from backend.utils import taxonomy_reader
+
+    real = taxonomy_reader.load_policy_coverage
+
+    def coverage(product):
+        limits = dict(real(product))
+        if product == "TravelEasy":
+            limits["medical"] = "TBA"
+        return limits
+
+    monkeypatch.setattr(taxonomy_reader, "load_policy_coverage", coverage)
+    table = qe.build_rate_table(["TravelEasy", "Scootsurance"])
+    medical, dental = qe.COVERAGE_FIELDS.index("medical"), qe.COVERAGE_FIELDS.index("dental")
+    assert np.isnan(table.coverage[0, medical])
+    assert table.coverage[0, dental] == 0  # missing, as before
+    assert table.coverage[1, medical] == 70000
+
+    quotes = qe.format_quotes(qe.price_parties([7], [(1, 0, 0)], table), table=table)
+    assert quotes[0]["medical"] == "N/A"
+    assert quotes[0]["dental"] == "$0"
+
+
+def test_malformed_amounts_are_never_cheapest_or_adequate():
+    assert qe.parse_amount("TBA") == 0.0
+    assert np.isnan(qe.parse_amount("TBA", default=np.nan))
+    assert qe.parse_amount("$1,234.50", default=np.nan) == 1234.5
+
+    prices = np.array([[np.nan, 80.0, 60.0]])
+    assert qe.recommend_batch(prices, [100], np.zeros(3, dtype=bool)).tolist() == [2]
+
+    quotes = [
+        {"plan": "A", "price": "Call us", "medical": "$200,000"},
+        {"plan": "B", "price": "$40.00", "medical": "TBA"},
+        {"plan": "C", "price": "$55.00", "medical": "$100,000"},
+    ]
+    assert get_recommended_plan(quotes, trip_cost=500) == "B"
+    assert get_recommended_plan(quotes[:1] + quotes[2:], trip_cost=500) == "C"
+    assert get_recommended_plan(quotes[1:], trip_cost=5000) == "C"
@@ -0,0 +1,103 @@
+"""
+Tests for backend/utils/request_profiler.py (sampling + speedscope output,
+opt-in middleware).
+
+Run: pytest tests/test_request_profiler.py -v
+"""
+
+import json
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils import request_profiler  # noqa: E402
+from backend.utils.request_profiler import ProfilerMiddleware, SamplingProfiler  # noqa: E402
+
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+def test_sampler_captures_running_code_as_speedscope():
+    profiler = SamplingProfiler(interval_ms=1)
+    profiler.start()
+    busy_loop(0.15)
+    profiler.stop()
+    data = profiler.to_speedscope("busy")
+
+    assert data["$schema"].startswith("https://www.speedscope.app")
+    frames = data["shared"]["frames"]
+    profile = data["profiles"][0]
+    assert profile["type"] == "sampled" and len(profile["samples"]) == len(profile["weights"]) > 10
+    assert "busy_loop" in {frames[i]["name"] for stack in profile["samples"] for i in stack}
+    assert all("request-profiler" not in p["name"] for p in data["profiles"])
+
+
+def test_safe_request_id_rejects_paths():
+    assert request_profiler.safe_request_id("req-123_ok") == "req-123_ok"
+    assert request_profiler.safe_request_id("../etc/passwd") != "../etc/passwd"
+    assert len(request_profiler.safe_request_id(None)) == 32
+
+
+@pytest.fixture
+def app_factory(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(request_profiler, "PROFILE_ADMIN_TOKEN", "s3cret")
+
+    def make(sample_rate=0.0):
+        app = FastAPI()
+        app.add_middleware(ProfilerMiddleware, paths=["/slow"], sample_rate=sample_rate,
+                           interval_ms=1, directory=str(tmp_path))
+
+        @app.get("/slow")
+        def slow():
+            return {"n": busy_loop(0.05)}
+
+        @app.get("/other")
+        def other():
+            return {"ok": True}
+
+        return TestClient(app)
+
+    return make
+
+
+def test_admin_header_profiles_request(app_factory, tmp_path):
+    client = app_factory()
+    response = client.get("/slow", headers={"X-Profile": "s3cret", "X-Request-ID": "req-1"})
+    assert response.headers["x-profile-id"] == "req-1"
+    with open(tmp_path / "req-1.speedscope.json") as f:
+        data = json.load(f)
+    names = {frame["name"] for frame in data["shared"]["frames"]}
+    assert "busy_loop" in names
+
+
+def test_unprofiled_requests_pass_through(app_factory, tmp_path):
+    client = app_factory()
+    assert "x-profile-id" not in client.get("/slow").headers
+    assert "x-profile-id" not in client.get("/slow", headers={"X-Profile": "wrong"}).headers
+    assert "x-profile-id" not in client.get("/other", headers={"X-Profile": "s3cret"}).headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sample_rate_profiles_without_header(app_factory, tmp_path):
+    client = app_factory(sample_rate=1.0)
+    profile_id = client.get("/slow").headers["x-profile-id"]
+    assert (tmp_path / f"{profile_id}.speedscope.json").exists()
+
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.setattr(request_profiler, "PROFILE_ADMIN_TOKEN", "")
+    monkeypatch.setattr(request_profiler, "PROFILE_SAMPLE_RATE", 0.0)
+    assert not request_profiler.profiling_enabled()
+    assert not request_profiler.is_admin("")
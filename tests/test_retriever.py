@@ -0,0 +1,72 @@
+"""
+Tests for backend/chains/retriever.py fallbacks: a missing index or a
+failing query yields no clauses instead of an error.
+
+Run: pytest tests/test_retriever.py -v
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.chains import retriever  # noqa: E402
+
+
+class StubEmbedder:
+    def get_query_embedding(self, question):
+        return [0.1, 0.2, 0.3]
+
+
+class StubCollection:
+    def __init__(self, error=None):
+        self.error = error
+
+    def query(self, **kwargs):
+        if self.error:
+            raise self.error
+        return {
+            "documents": [["Overseas medical expenses up to $250,000."]],
+            "metadatas": [[{"product": "TravelEasy", "file": "te.pdf", "page": 4, "offset": 120}]],
+            "distances": [[0.25]],
+        }
+
+
+@pytest.fixture
+def index(monkeypatch):
+    monkeypatch.setattr(retriever, "RETRIEVAL_ENABLED", True)
+    monkeypatch.setattr(retriever, "_unavailable", False)
+    monkeypatch.setattr(retriever, "_embedder", StubEmbedder())
+
+    def use(collection):
+        monkeypatch.setattr(retriever, "_collection", collection)
+
+    return use
+
+
+def test_returns_clauses_best_first(index):
+    index(StubCollection())
+    [clause] = retriever.retrieve_clauses("medical cover?")
+    assert clause["product"] == "TravelEasy"
+    assert clause["page"] == 4
+    assert clause["score"] == 0.75
+    assert "[TravelEasy, p.4]" in retriever.format_clauses([clause])
+
+
+def test_query_failure_falls_back_to_no_clauses(index, capsys):
+    index(StubCollection(error=RuntimeError("Error executing plan: segment reader")))
+    assert retriever.retrieve_clauses("medical cover?") == []
+    assert "Clause retrieval failed" in capsys.readouterr().out
+    # A transient query error doesn't switch retrieval off for later requests.
+    assert retriever._unavailable is False
+
+
+def test_missing_index_disables_retrieval(index, monkeypatch):
+    def no_index():
+        raise ValueError("Collection policy_clauses does not exist.")
+
+    monkeypatch.setattr(retriever, "get_collection", no_index)
+    assert retriever.retrieve_clauses("medical cover?") == []
+    assert retriever._unavailable is True
@@ -0,0 +1,144 @@
+"""
+Tests for app/components/session_maintenance.py (flat-file migration,
+TTL sweep, report) and the flat-file merge in session_store.
+
+Run: pytest tests/test_session_maintenance.py -v
+"""
+
+import json
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from components import session_maintenance, session_store  # noqa: E402
+from components.session_store import (  # noqa: E402
+    ARCHIVE_SUFFIX, LOG_SUFFIX, TRIP_SUFFIX, append_message, load_recent, load_trip, session_path,
+)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_store, "SESS_DIR", tmp_path)
+    monkeypatch.setattr(session_store, "_known_shards", set())
+    monkeypatch.setattr(session_maintenance, "SESS_DIR", tmp_path)
+    return tmp_path
+
+
+def _age(path, days):
+    old = time.time() - days * 86400
+    os.utime(path, (old, old))
+
+
+def _jsonl(*contents):
+    return "".join(json.dumps({"role": "user", "content": c}) + "\n" for c in contents)
+
+
+def test_migrate_moves_flat_files_into_shards(store):
+    (store / "user_ab000001.jsonl").write_text(_jsonl("hi"), encoding="utf-8")
+    (store / "user_ab000001.trip.json").write_text('{"trip": 1}', encoding="utf-8")
+    assert session_maintenance.migrate_flat_files() == 2
+    assert session_path("user_ab000001", LOG_SUFFIX).exists()
+    assert load_trip("user_ab000001") == {"trip": 1}
+    assert not list(store.glob("*.json*"))
+
+
+def test_migrate_merges_log_when_shard_copy_exists(store):
+    sid = "user_ab000002"
+    append_message(sid, {"role": "user", "content": "newer"})
+    (store / f"{sid}.jsonl").write_text(_jsonl("older 1", "older 2"), encoding="utf-8")
+
+    assert session_maintenance.migrate_flat_files() == 1
+    messages, _ = load_recent(sid)
+    assert [m["content"] for m in messages] == ["older 1", "older 2", "newer"]
+    assert not (store / f"{sid}.jsonl").exists()
+
+
+def test_merge_prepends_to_archive_after_rotation(store, monkeypatch):
+    sid = "user_ab000003"
+    for i in range(4):
+        append_message(sid, {"role": "user", "content": f"m{i}"})
+    monkeypatch.setattr(session_store, "MAX_MESSAGES", 1)
+    session_store.compact(sid)
+    (store / f"{sid}.jsonl").write_text(_jsonl("flat"), encoding="utf-8")
+
+    session_maintenance.migrate_flat_files()
+    assert session_path(sid, ARCHIVE_SUFFIX).read_text(encoding="utf-8").startswith(_jsonl("flat"))
+    messages, _ = load_recent(sid)
+    assert [m["content"] for m in messages] == ["flat", "m0", "m1", "m2", "m3"]
+
+
+def test_migrate_merges_trip_payloads(store):
+    sid = "user_ab000004"
+    session_store.save_trip(sid, {"quotes": [1], "trip": "new"})
+    (store / f"{sid}.trip.json").write_text('{"trip": "old", "uploads": ["a.pdf"]}', encoding="utf-8")
+    session_maintenance.migrate_flat_files()
+    assert load_trip(sid) == {"trip": "new", "uploads": ["a.pdf"], "quotes": [1]}
+
+
+def test_sweep_expires_idle_sessions_together(store):
+    idle, active = "user_ab000005", "user_cd000006"
+    append_message(idle, {"role": "user", "content": "old"})
+    session_store.save_trip(idle, {"trip": 1})
+    append_message(active, {"role": "user", "content": "new"})
+    session_store.save_trip(active, {"trip": 2})
+    for suffix in (LOG_SUFFIX, TRIP_SUFFIX):
+        _age(session_path(idle, suffix), 40)
+    _age(session_path(active, TRIP_SUFFIX), 40)  # chat is recent, so the trip stays
+
+    stats = session_maintenance.sweep(ttl_days=30)
+    assert stats["expired_sessions"] == 1
+    assert stats["removed_files"] == 2
+    assert not session_path(idle, LOG_SUFFIX).exists()
+    assert load_trip(active) == {"trip": 2}
+
+
+def test_sweep_drops_empty_trip_payloads(store):
+    sid = "user_ab000007"
+    append_message(sid, {"role": "user", "content": "hi"})
+    session_path(sid, TRIP_SUFFIX).write_text("{}", encoding="utf-8")
+    stats = session_maintenance.sweep(ttl_days=30)
+    assert stats["empty_trips"] == 1
+    assert session_path(sid, LOG_SUFFIX).exists()
+
+
+def test_sweep_survives_files_vanishing(store, monkeypatch):
+    for sid in ("user_ab000008", "user_ab000009"):
+        append_message(sid, {"role": "user", "content": "x"})
+        _age(session_path(sid, LOG_SUFFIX), 40)
+
+    real_unlink = os.unlink
+
+    def racing_unlink(path, *args, **kwargs):
+        real_unlink(path)
+        raise FileNotFoundError(path)  # a live writer's compaction got there first
+
+    monkeypatch.setattr(session_maintenance.os, "unlink", racing_unlink)
+    stats = session_maintenance.sweep(ttl_days=30)
+    assert stats["expired_sessions"] == 2
+    assert not list(store.rglob("*.jsonl"))
+
+
+def test_run_maintenance_logs_instead_of_raising(store, monkeypatch, capsys):
+    def boom():
+        raise PermissionError("read-only file system")
+
+    monkeypatch.setattr(session_maintenance, "migrate_flat_files", boom)
+    assert "error" in session_maintenance.run_maintenance()
+    assert "Session maintenance failed" in capsys.readouterr().out
+
+
+def test_report_counts_archive_segments(store, monkeypatch):
+    sid = "user_ab000010"
+    for i in range(3):
+        append_message(sid, {"role": "user", "content": f"m{i}"})
+    monkeypatch.setattr(session_store, "MAX_MESSAGES", 1)
+    session_store.compact(sid)
+    report = session_maintenance.report()
+    assert report["sessions"] == 1
+    assert report["by_kind"]["archive"] == 1
+    assert report["by_kind"]["chat"] == 1
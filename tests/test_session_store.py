@@ -0,0 +1,123 @@
+"""
+Tests for app/components/session_store.py (append-only chat log, paginated
+backwards reads, rotation into the archive segment).
+
+Run: pytest tests/test_session_store.py -v
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from components import session_store  # noqa: E402
+from components.session_store import append_message, compact, load_recent, session_path  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_store, "SESS_DIR", tmp_path)
+    monkeypatch.setattr(session_store, "_known_shards", set())
+    return tmp_path
+
+
+def _msg(i):
+    return {"role": "user", "content": f"message {i}"}
+
+
+def _all_pages(sid, limit):
+    pages, cursor = [], None
+    while True:
+        messages, cursor = load_recent(sid, limit=limit, before=cursor)
+        pages.append(messages)
+        if not cursor:
+            return pages
+
+
+def test_empty_session(store):
+    assert load_recent("user_ab000000") == ([], 0)
+
+
+def test_pages_walk_back_to_the_first_message(store):
+    sid = "user_ab000001"
+    for i in range(23):
+        append_message(sid, _msg(i))
+
+    recent, cursor = load_recent(sid, limit=10)
+    assert [m["content"] for m in recent] == [f"message {i}" for i in range(13, 23)]
+    assert cursor > 0
+
+    older, cursor = load_recent(sid, limit=10, before=cursor)
+    assert [m["content"] for m in older] == [f"message {i}" for i in range(3, 13)]
+
+    oldest, cursor = load_recent(sid, limit=10, before=cursor)
+    assert [m["content"] for m in oldest] == [f"message {i}" for i in range(3)]
+    assert cursor == 0
+
+
+def test_page_larger_than_read_block(store, monkeypatch):
+    monkeypatch.setattr(session_store, "_READ_BLOCK", 64)
+    sid = "user_ab000002"
+    for i in range(30):
+        append_message(sid, {"role": "assistant", "content": "x" * 50 + str(i)})
+    pages = _all_pages(sid, limit=7)
+    flat = [m["content"] for page in reversed(pages) for m in page]
+    assert flat == ["x" * 50 + str(i) for i in range(30)]
+
+
+def test_unicode_and_torn_lines_are_skipped(store):
+    sid = "user_ab000003"
+    append_message(sid, {"role": "user", "content": "日本へ行く"})
+    with open(session_path(sid, session_store.LOG_SUFFIX), "ab") as f:
+        f.write(b'{"role": "user", "cont\n')  # corrupt line
+    append_message(sid, _msg(1))
+    with open(session_path(sid, session_store.LOG_SUFFIX), "ab") as f:
+        f.write(b'{"role": "assistant"')  # append still in flight
+    messages, cursor = load_recent(sid)
+    assert [m["content"] for m in messages] == ["日本へ行く", "message 1"]
+    assert cursor == 0
+
+
+def test_rotation_keeps_every_message(store, monkeypatch):
+    monkeypatch.setattr(session_store, "COMPACT_BYTES", 600)
+    monkeypatch.setattr(session_store, "MAX_MESSAGES", 5)
+    sid = "user_ab000004"
+    for i in range(60):
+        append_message(sid, _msg(i))
+
+    archive = session_path(sid, session_store.ARCHIVE_SUFFIX)
+    active = session_path(sid, session_store.LOG_SUFFIX)
+    assert archive.exists()
+    assert active.stat().st_size <= 600
+
+    pages = _all_pages(sid, limit=8)
+    flat = [m["content"] for page in reversed(pages) for m in page]
+    assert flat == [f"message {i}" for i in range(60)]
+
+
+def test_cursor_stays_valid_across_rotation(store, monkeypatch):
+    sid = "user_ab000005"
+    for i in range(20):
+        append_message(sid, _msg(i))
+    recent, cursor = load_recent(sid, limit=5)
+    assert recent[0]["content"] == "message 15"
+
+    # Rotate everything but the last two lines into the archive.
+    monkeypatch.setattr(session_store, "MAX_MESSAGES", 2)
+    compact(sid)
+    assert session_path(sid, session_store.ARCHIVE_SUFFIX).exists()
+
+    older, cursor = load_recent(sid, limit=5, before=cursor)
+    assert [m["content"] for m in older] == [f"message {i}" for i in range(10, 15)]
+
+
+def test_legacy_transcript_is_migrated(store):
+    sid = "user_ab000006"
+    (store / f"{sid}.json").write_text(json.dumps([_msg(0), _msg(1)]), encoding="utf-8")
+    messages, _ = load_recent(sid)
+    assert [m["content"] for m in messages] == ["message 0", "message 1"]
+    assert not (store / f"{sid}.json").exists()
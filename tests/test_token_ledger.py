@@ -0,0 +1,247 @@
+"""
+Tests for backend/utils/token_ledger.py (per endpoint/session/template token
+accounting, TPM budget window, Groq error classification), the ledger
+wiring in backend/utils/llm_usage.py and backend/ingestion/llama_structurer.py,
+and the admin-only GET /usage/tokens.
+
+Run: pytest tests/test_token_ledger.py -v
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils.token_ledger import (  # noqa: E402
+    TokenLedger, classify_llm_error, current_context, estimate_tokens, usage_context,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def ledger(clock):
+    return TokenLedger(tpm_budget=1000, prompt_budget=300, warn_ratio=0.8, top_n=3, max_sessions=2, clock=clock)
+
+
+def test_totals_by_endpoint_template_and_session(ledger):
+    ledger.record("m", 100, 20, template="chat_agent", endpoint="/chat", session="s1")
+    ledger.record("m", 200, 10, template="chat_agent", endpoint="/chat", session="s1")
+    ledger.record("m", 50, 5, template="extract_ticket", endpoint="/upload_extract")
+    snap = ledger.snapshot()
+
+    assert snap["total"]["calls"] == 3
+    assert snap["total"]["input_tokens"] == 350
+    assert snap["by_endpoint"]["/chat"]["total_tokens"] == 330
+    assert snap["by_template"]["chat_agent"]["avg_input_tokens"] == 150
+    assert snap["by_template"]["chat_agent"]["max_input_tokens"] == 200
+    assert snap["by_template"]["extract_ticket"]["calls"] == 1
+    assert snap["top_sessions"][0]["session"] == "s1"
+    assert ledger.session("s1")["output_tokens"] == 30
+    assert ledger.session("missing") is None
+    assert snap["total"]["cost_usd"] > 0
+
+
+def test_top_calls_keeps_the_most_expensive(ledger):
+    for n in (10, 500, 40, 300, 20):
+        ledger.record("m", n, 0, template=f"t{n}")
+    top = ledger.snapshot(top=10)["top_calls"]
+    assert [c["input_tokens"] for c in top] == [500, 300, 40]
+    assert top[0]["template"] == "t500" and top[0]["endpoint"] == "unknown"
+
+
+def test_sessions_are_bounded_lru(ledger):
+    ledger.record("m", 1, 1, session="a")
+    ledger.record("m", 1, 1, session="b")
+    ledger.record("m", 1, 1, session="a")  # a is now most recent
+    ledger.record("m", 1, 1, session="c")
+    assert ledger.session("b") is None
+    assert ledger.session("a")["calls"] == 2
+    assert ledger.session("c")["calls"] == 1
+
+
+def test_prompt_budget_is_counted_and_logged(ledger, capsys):
+    ledger.record("m", 350, 10, template="extract_itinerary", endpoint="/upload_extract")
+    ledger.record("m", 100, 10, template="extract_itinerary", endpoint="/upload_extract")
+    assert ledger.snapshot()["by_template"]["extract_itinerary"]["over_prompt_budget"] == 1
+    assert "extract_itinerary" in capsys.readouterr().out
+
+
+def test_rolling_window_and_pre_call_check(ledger, clock, capsys):
+    ledger.record("m", 500, 100)
+    assert ledger.window_tokens() == 600
+    assert ledger.check_prompt(300) is True
+    assert ledger.check_prompt(500, template="chat_agent", endpoint="/chat") is False
+    assert "would exceed the TPM budget" in capsys.readouterr().out
+
+    ledger.record("m", 150, 50)  # 800/1000 -> warning threshold
+    assert "of GROQ_TPM_BUDGET" in capsys.readouterr().out
+    assert ledger.snapshot()["budget"]["tpm_ratio"] == 0.8
+
+    clock.now += 61
+    assert ledger.window_tokens() == 0
+    assert ledger.check_prompt(900) is True
+
+
+def test_errors_are_attributed(ledger):
+    ledger.record_error("rate_limit", template="chat_agent", endpoint="/chat", session="s1")
+    snap = ledger.snapshot()
+    assert snap["errors"] == {"rate_limit": 1}
+    assert snap["by_endpoint"]["/chat"]["errors"] == 1
+    assert ledger.session("s1")["errors"] == 1
+
+
+def test_usage_context_nests_and_resets():
+    assert current_context().get("endpoint") is None
+    with usage_context(endpoint="/chat", session="s1"):
+        with usage_context(session="s2"):
+            assert current_context() == {"endpoint": "/chat", "session": "s2"}
+        assert current_context()["session"] == "s1"
+    assert current_context().get("endpoint") is None
+
+
+def test_estimate_tokens():
+    assert estimate_tokens(0) == 0
+    assert estimate_tokens(4000) == 1000
+
+
+def test_classify_groq_errors_by_status():
+    groq = pytest.importorskip("groq")
+    httpx = pytest.importorskip("httpx")
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+
+    def status_error(cls, code):
+        return cls("boom", response=httpx.Response(code, request=request), body=None)
+
+    assert classify_llm_error(status_error(groq.AuthenticationError, 401)) == "auth"
+    assert classify_llm_error(status_error(groq.APIStatusError, 413)) == "too_large"
+    assert classify_llm_error(status_error(groq.RateLimitError, 429)) == "rate_limit"
+    assert classify_llm_error(status_error(groq.InternalServerError, 503)) == "unavailable"
+    assert classify_llm_error(groq.APITimeoutError(request=request)) == "unavailable"
+
+    try:
+        try:
+            raise status_error(groq.RateLimitError, 429)
+        except Exception as inner:
+            raise RuntimeError("chain failed") from inner
+    except RuntimeError as wrapped:
+        assert classify_llm_error(wrapped) == "rate_limit"
+
+
+def test_classify_falls_back_to_message():
+    assert classify_llm_error(ValueError("Error code: 413 - Request too large for model")) == "too_large"
+    assert classify_llm_error(ValueError("Rate limit reached on tokens per minute (TPM)")) == "rate_limit"
+    assert classify_llm_error(ValueError("invalid_api_key")) == "auth"
+    assert classify_llm_error(ValueError("something else")) == "error"
+
+
+def test_usage_callback_attributes_template_and_context(ledger):
+    pytest.importorskip("langchain_core")
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+
+    from backend.utils.llm_usage import UsageCallback
+
+    reply = AIMessage(content="{}", usage_metadata={"input_tokens": 420, "output_tokens": 12, "total_tokens": 432})
+    llm = GenericFakeChatModel(messages=iter([reply]), callbacks=[UsageCallback("test-model", ledger=ledger)])
+
+    with usage_context(endpoint="/upload_extract", session="s9"):
+        llm.invoke("x" * 800, config={"metadata": {"prompt_template": "extract_ticket"}})
+
+    call = ledger.snapshot()["top_calls"][0]
+    assert call["template"] == "extract_ticket"
+    assert call["endpoint"] == "/upload_extract"
+    assert call["session"] == "s9"
+    assert call["input_tokens"] == 420
+    assert call["prompt_chars"] == 800
+    assert ledger.snapshot()["by_template"]["extract_ticket"]["over_prompt_budget"] == 1
+
+
+class FakeCompletionLLM:
+    """llama_index-style LLM: complete() returns .text and the raw Groq payload."""
+
+    model = "llama-3.3-70b-versatile"
+
+    def __init__(self, text='{"plan": "gold"}', usage=None, error=None):
+        self.text, self.usage, self.error = text, usage, error
+        self.prompts = []
+
+    def complete(self, prompt):
+        self.prompts.append(prompt)
+        if self.error:
+            raise self.error
+        return SimpleNamespace(text=self.text, raw={"usage": self.usage} if self.usage else {})
+
+
+def test_ingestion_calls_are_recorded(ledger, monkeypatch):
+    from backend.ingestion import llama_structurer
+
+    monkeypatch.setattr(llama_structurer, "ledger", ledger)
+    llm = FakeCompletionLLM(usage={"prompt_tokens": 250, "completion_tokens": 40, "total_tokens": 290})
+
+    assert llama_structurer.llm_structure_text(llm, "chunk text", "SCHEMA") == {"plan": "gold"}
+    call = ledger.snapshot()["top_calls"][0]
+    assert (call["endpoint"], call["template"], call["input_tokens"], call["output_tokens"]) == (
+        "ingestion", "structure_policy", 250, 40)
+    assert call["prompt_chars"] == len(llm.prompts[0])
+    assert ledger.snapshot()["by_endpoint"]["ingestion"]["cost_usd"] > 0
+
+
+def test_ingestion_usage_from_an_sdk_object_and_errors(ledger, monkeypatch):
+    from backend.ingestion import llama_structurer
+
+    monkeypatch.setattr(llama_structurer, "ledger", ledger)
+    raw = SimpleNamespace(usage=SimpleNamespace(prompt_tokens=12, completion_tokens=3))
+    assert llama_structurer.completion_usage(SimpleNamespace(raw=raw)) == (12, 3)
+    assert llama_structurer.completion_usage(SimpleNamespace(raw=None)) == (0, 0)
+
+    with pytest.raises(RuntimeError):
+        llama_structurer.llm_structure_text(FakeCompletionLLM(error=RuntimeError("boom")), "x", "SCHEMA", "custom")
+    assert ledger.snapshot()["by_endpoint"]["ingestion"]["errors"] == 1
+
+
+@pytest.fixture
+def usage_client(client, api, ledger, monkeypatch):
+    from backend.utils import request_profiler
+
+    monkeypatch.setattr(request_profiler, "PROFILE_ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(api, "token_ledger", ledger)
+    ledger.record("m", 100, 20, template="chat_agent", endpoint="/chat", session="s1")
+    return client
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Profile": "wrong"}])
+def test_usage_endpoint_needs_the_admin_token(usage_client, headers):
+    for params in ({}, {"session_id": "s1"}):
+        response = usage_client.get("/usage/tokens", params=params, headers=headers)
+        assert response.status_code == 403
+        assert "s1" not in response.text
+
+
+def test_usage_endpoint_with_the_admin_token(usage_client):
+    admin = {"X-Profile": "s3cret"}
+    body = usage_client.get("/usage/tokens", headers=admin).json()
+    assert body["top_sessions"][0]["session"] == "s1"
+    assert usage_client.get("/usage/tokens", params={"session_id": "s1"}, headers=admin).json()["calls"] == 1
+    assert usage_client.get("/usage/tokens", params={"session_id": "nope"}, headers=admin).status_code == 404
+
+
+def test_usage_endpoint_is_closed_without_a_configured_token(client, monkeypatch):
+    from backend.utils import request_profiler
+
+    monkeypatch.setattr(request_profiler, "PROFILE_ADMIN_TOKEN", "")
+    assert client.get("/usage/tokens", headers={"X-Profile": ""}).status_code == 403
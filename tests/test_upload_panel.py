@@ -0,0 +1,63 @@
+"""
+Tests for the extraction job submission in app/components/upload_panel.py:
+a page rerun never resubmits the same upload, while uploading the same file
+again (e.g. after a failed extraction) does.
+
+Run: pytest tests/test_upload_panel.py -v
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+pytest.importorskip("streamlit")
+
+from streamlit.proto.Common_pb2 import FileURLs  # noqa: E402
+from streamlit.runtime.uploaded_file_manager import UploadedFile, UploadedFileRec  # noqa: E402
+
+from components import upload_panel  # noqa: E402
+
+
+def _upload(file_id, name="ticket.pdf", data=b"%PDF-1.4"):
+    return UploadedFile(UploadedFileRec(file_id=file_id, name=name, type="application/pdf", data=data), FileURLs())
+
+
+@pytest.fixture
+def session(monkeypatch):
+    state = {}
+    monkeypatch.setattr(upload_panel.st, "session_state", state)
+    monkeypatch.setattr(upload_panel.st, "error", lambda text: None)
+    return state
+
+
+def test_upload_key_tells_reuploads_of_the_same_file_apart():
+    first, again = _upload("id-1"), _upload("id-2")
+    assert first.name == again.name
+    assert upload_panel._upload_key(first) != upload_panel._upload_key(again)
+    assert upload_panel._upload_key(SimpleNamespace(name="legacy.pdf")) == "legacy.pdf"
+
+
+def test_submit_records_the_upload_not_the_filename(session, monkeypatch):
+    posted = []
+
+    def post(url, files=None, data=None, timeout=None):
+        posted.append(files["file"][0])
+        return SimpleNamespace(status_code=202, json=lambda: {"job_id": f"job{len(posted)}"})
+
+    monkeypatch.setattr(upload_panel.requests, "post", post)
+    failed_upload = _upload("id-1")
+    upload_panel._submit_extract_job("http://api.test", failed_upload, "ticket")
+    assert session["last_ticket_file"] == upload_panel._upload_key(failed_upload)
+
+    # The job failed; the user picks the same ticket.pdf again.
+    retry = _upload("id-2")
+    assert upload_panel._upload_key(retry) != session["last_ticket_file"]
+    upload_panel._submit_extract_job("http://api.test", retry, "ticket")
+    assert posted == ["ticket.pdf", "ticket.pdf"]
+    assert session["extract_jobs"]["ticket"] == {"job_id": "job2", "filename": "ticket.pdf"}
@@ -0,0 +1,218 @@
+"""
+Tests for backend/utils/upload_stream.py (streamed save with a per-file
+cap, unique stored names, temp-file-then-rename, and the 413 request-size
+middleware) and for same-name uploads through POST /jobs/extract.
+
+Run: pytest tests/test_upload_stream.py -v
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.datastructures import UploadFile  # noqa: E402
+
+from backend.utils.upload_stream import UploadLimitMiddleware, UploadTooLarge, save_upload  # noqa: E402
+
+
+def _upload(data: bytes, filename: str = "ticket.pdf") -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename=filename)
+
+
+def _save(data: bytes, dest, max_bytes: int, filename: str = "ticket.pdf"):
+    return asyncio.run(save_upload(_upload(data, filename), str(dest), max_bytes=max_bytes))
+
+
+def test_saves_in_chunks_and_hashes(tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.utils.upload_stream.UPLOAD_CHUNK_BYTES", 7)
+    data = os.urandom(100)
+    saved = _save(data, tmp_path, max_bytes=1000)
+    assert saved.filename == "ticket.pdf"
+    assert saved.size == 100
+    assert saved.sha256 == hashlib.sha256(data).hexdigest()
+    assert open(saved.path, "rb").read() == data
+    assert os.listdir(tmp_path) == [os.path.basename(saved.path)]
+
+
+def test_stored_name_is_unique_and_keeps_the_extension(tmp_path):
+    first = _save(b"first", tmp_path, max_bytes=10)
+    second = _save(b"second", tmp_path, max_bytes=10)
+    assert first.path != second.path
+    assert first.path.endswith(".pdf") and os.path.dirname(first.path) == str(tmp_path)
+    assert open(first.path, "rb").read() == b"first"
+    assert open(second.path, "rb").read() == b"second"
+
+
+def test_only_the_basename_is_used(tmp_path):
+    saved = _save(b"x", tmp_path, max_bytes=10, filename="../../etc/passwd")
+    assert saved.filename == "passwd"
+    assert os.path.dirname(saved.path) == str(tmp_path)
+
+
+def test_too_large_upload_leaves_nothing_behind(tmp_path):
+    (tmp_path / "ticket.pdf").write_bytes(b"earlier upload")
+    with pytest.raises(UploadTooLarge):
+        _save(b"x" * 11, tmp_path, max_bytes=10)
+    assert (tmp_path / "ticket.pdf").read_bytes() == b"earlier upload"
+    assert os.listdir(tmp_path) == ["ticket.pdf"]  # no partial temp file left
+
+
+def test_file_at_the_limit_is_accepted(tmp_path):
+    assert _save(b"x" * 10, tmp_path, max_bytes=10).size == 10
+
+
+def test_failed_read_leaves_nothing_behind(tmp_path):
+    (tmp_path / "ticket.pdf").write_bytes(b"earlier upload")
+
+    class Broken(UploadFile):
+        async def read(self, size=-1):
+            raise ConnectionResetError("client went away")
+
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(save_upload(Broken(io.BytesIO(b""), filename="ticket.pdf"), str(tmp_path)))
+    assert os.listdir(tmp_path) == ["ticket.pdf"]
+
+
+@pytest.fixture
+def capped_client(tmp_path):
+    from fastapi import FastAPI, File, HTTPException
+    from fastapi import UploadFile as FastAPIUploadFile
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: FastAPIUploadFile = File(...)):
+        try:
+            saved = await save_upload(file, str(tmp_path), max_bytes=100)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        return {"size": saved.size}
+
+    app.add_middleware(UploadLimitMiddleware, paths={"/upload"}, max_bytes=1000)
+    return TestClient(app)
+
+
+def test_per_file_cap_returns_413(capped_client, tmp_path):
+    (tmp_path / "a.pdf").write_bytes(b"keep me")
+    response = capped_client.post("/upload", files={"file": ("a.pdf", b"x" * 200)})
+    assert response.status_code == 413
+    assert (tmp_path / "a.pdf").read_bytes() == b"keep me"
+
+
+def test_declared_content_length_over_cap_returns_413(capped_client):
+    response = capped_client.post("/upload", files={"file": ("a.pdf", b"x" * 2000)})
+    assert response.status_code == 413
+    assert response.json()["ok"] is False
+
+
+def test_chunked_body_over_cap_returns_413(capped_client):
+    def body():
+        for _ in range(20):
+            yield b"x" * 100
+
+    response = capped_client.post(
+        "/upload", content=body(), headers={"Content-Type": "multipart/form-data; boundary=xyz"}
+    )
+    assert response.status_code == 413
+
+
+def test_small_upload_passes_the_middleware(capped_client):
+    response = capped_client.post("/upload", files={"file": ("a.pdf", b"x" * 50)})
+    assert response.status_code == 200
+    assert response.json() == {"size": 50}
+
+
+def test_same_name_job_uploads_extract_their_own_file(api, client, tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(api, "extract_document", lambda path, doc_type: {"text": open(path).read()})
+
+    job_ids = []
+    for content in ("alice's ticket", "bob's ticket"):
+        response = client.post("/jobs/extract", files={"file": ("ticket.pdf", content.encode())})
+        assert response.status_code == 202
+        assert response.json()["filename"] == "ticket.pdf"
+        job_ids.append(response.json()["job_id"])
+
+    results = []
+    for job_id in job_ids:
+        deadline = time.time() + 10
+        while (job := client.get(f"/jobs/{job_id}").json())["status"] not in ("done", "failed"):
+            assert time.time() < deadline
+            time.sleep(0.02)
+        results.append(job["result"])
+    assert results == [{"text": "alice's ticket"}, {"text": "bob's ticket"}]
+    assert os.listdir(tmp_path) == []  # each job removes its upload once finished
+
+
+def _finish(client, job_id):
+    deadline = time.time() + 10
+    while (job := client.get(f"/jobs/{job_id}").json())["status"] not in ("done", "failed"):
+        assert time.time() < deadline
+        time.sleep(0.02)
+    return job
+
+
+def test_failed_job_removes_its_upload_and_the_file_can_be_resubmitted(api, client, tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "UPLOAD_DIR", str(tmp_path))
+    attempts = []
+
+    def flaky_extract(path, doc_type):
+        attempts.append(path)
+        if len(attempts) == 1:
+            raise ValueError("Groq unavailable")
+        return {"text": open(path).read()}
+
+    monkeypatch.setattr(api, "extract_document", flaky_extract)
+    first = client.post("/jobs/extract", files={"file": ("ticket.pdf", b"same file")}).json()
+    assert _finish(client, first["job_id"])["status"] == "failed"
+    assert os.listdir(tmp_path) == []
+
+    second = client.post("/jobs/extract", files={"file": ("ticket.pdf", b"same file")})
+    assert second.status_code == 202
+    assert _finish(client, second.json()["job_id"])["result"] == {"text": "same file"}
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.fixture
+def no_job_side_effects(api, monkeypatch):
+    """Fail the test if /jobs/extract saves or queues anything."""
+    def forbidden(*args, **kwargs):
+        raise AssertionError("oversized upload reached the endpoint")
+
+    monkeypatch.setattr(api, "save_upload", forbidden)
+    monkeypatch.setattr(api.job_queue, "submit", forbidden)
+
+
+def test_jobs_extract_rejects_declared_oversized_body(client, no_job_side_effects):
+    from backend.utils.upload_stream import MAX_REQUEST_BYTES
+
+    response = client.post(
+        "/jobs/extract",
+        content=b"x" * 10,
+        headers={"Content-Type": "multipart/form-data; boundary=xyz", "Content-Length": str(MAX_REQUEST_BYTES + 1)},
+    )
+    assert response.status_code == 413
+    assert response.json()["ok"] is False
+
+
+def test_jobs_extract_rejects_streamed_oversized_body(client, no_job_side_effects):
+    from backend.utils.upload_stream import MAX_REQUEST_BYTES
+
+    chunk = b"x" * (1024 * 1024)
+
+    def body():
+        for _ in range(MAX_REQUEST_BYTES // len(chunk) + 2):
+            yield chunk
+
+    response = client.post(
+        "/jobs/extract", content=body(), headers={"Content-Type": "multipart/form-data; boundary=xyz"}
+    )
+    assert response.status_code == 413
@@ -0,0 +1,92 @@
+"""
+Tests for backend/utils/warmup.py (readiness gating and step reporting)
+and the chat agent's Groq connection warm-up.
+
+Run: pytest tests/test_warmup.py -v
+"""
+
+import asyncio
+import os
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils.warmup import Warmup  # noqa: E402
+
+
+def _boom():
+    raise RuntimeError("unreachable")
+
+
+def test_ready_only_after_all_steps_ran():
+    calls = []
+    warmup = Warmup(enabled=True)
+    warmup.add("first", lambda: calls.append("first"))
+    warmup.add("second", lambda: calls.append("second"))
+    assert not warmup.ready
+    assert warmup.report()["state"] == "pending"
+
+    asyncio.run(warmup.run())
+    report = warmup.report()
+    assert calls == ["first", "second"]
+    assert warmup.ready and report["state"] == "done"
+    assert [s["status"] for s in report["steps"]] == ["ok", "ok"]
+    assert all(s["duration_ms"] is not None for s in report["steps"])
+    assert "fn" not in report["steps"][0]
+
+
+def test_failed_required_step_blocks_readiness():
+    warmup = Warmup(enabled=True)
+    warmup.add("taxonomy", _boom)
+    warmup.add("after", lambda: None)
+    asyncio.run(warmup.run())
+    steps = warmup.report()["steps"]
+    assert not warmup.ready
+    assert steps[0]["status"] == "failed" and steps[0]["error"] == "unreachable"
+    assert steps[1]["status"] == "ok"
+
+
+def test_failed_optional_step_is_reported_but_ready():
+    warmup = Warmup(enabled=True)
+    warmup.add("taxonomy", lambda: None)
+    warmup.add("llm_connection", _boom, required=False)
+    asyncio.run(warmup.run())
+    assert warmup.ready
+    assert warmup.report()["steps"][1]["status"] == "failed"
+
+
+def test_disabled_skips_every_step():
+    calls = []
+    warmup = Warmup(enabled=False)
+    warmup.add("taxonomy", lambda: calls.append(1))
+    asyncio.run(warmup.run())
+    assert calls == [] and warmup.ready
+    assert warmup.report()["steps"][0]["status"] == "skipped"
+
+
+def test_agent_warm_up_lists_models_on_the_chat_pool(monkeypatch):
+    from backend.chains.conversational_agent import create_insurance_agent
+
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    clients = []
+    real_init = httpx.Client.__init__
+
+    def init(self, *args, **kwargs):
+        real_init(self, *args, **kwargs)
+        clients.append(self)
+
+    monkeypatch.setattr(httpx.Client, "__init__", init)
+    ask = create_insurance_agent()
+    assert len(clients) == 1  # the chat model's pool
+
+    sent = []
+
+    def send(self, request, **kwargs):
+        sent.append((self, request.method, request.url.path))
+        return httpx.Response(200, json={"object": "list", "data": []}, request=request)
+
+    monkeypatch.setattr(httpx.Client, "send", send)
+    ask.warm_up()
+    assert sent == [(clients[0], "GET", "/openai/v1/models")]
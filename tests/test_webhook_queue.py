@@ -0,0 +1,211 @@
+"""
+Tests for backend/utils/webhook_queue.py: redelivery dedupe, retry with
+exponential backoff, parking as `failed` after the last attempt, retention
+purge and the stats() counters.
+
+Run: pytest tests/test_webhook_queue.py -v
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils import webhook_queue  # noqa: E402
+from backend.utils.webhook_queue import MAX_BACKOFF_SECONDS, WebhookQueue, event_key  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class Clock:
+    """Stand-in for time.time() inside webhook_queue."""
+
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(webhook_queue.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    queues = []
+
+    def make(handler, **kwargs):
+        queue = WebhookQueue(handler, db_path=str(tmp_path / "events.db"), **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue._db.close()
+
+
+def _row(queue, event_id):
+    return queue._db.execute("SELECT * FROM webhook_events WHERE event_id = ?", (event_id,)).fetchone()
+
+
+async def _drain(queue):
+    """Apply every due event once, like one pass of the consumer loop."""
+    for row in await asyncio.to_thread(queue._due):
+        await queue._apply(row)
+
+
+def _event(event_id, kind="payment_intent.succeeded"):
+    return {"id": event_id, "type": kind, "data": {"object": {"id": "pi_1"}}}
+
+
+def test_redelivered_event_is_ignored(make_queue, clock):
+    seen = []
+
+    async def scenario():
+        applied = asyncio.Event()
+
+        async def handler(event):
+            seen.append(event["id"])
+            applied.set()
+
+        queue = make_queue(handler)
+        assert await queue.enqueue(_event("evt_1"))
+        assert not await queue.enqueue(_event("evt_1"))
+        await asyncio.wait_for(applied.wait(), timeout=5)
+        assert not await queue.enqueue(_event("evt_1"))  # still recognised once done
+        await queue.stop()
+        return queue
+
+    queue = run(scenario())
+    assert seen == ["evt_1"]
+    stats = queue.stats()
+    assert (stats["received_total"], stats["duplicates_total"], stats["processed_total"]) == (3, 2, 1)
+
+
+def test_events_without_an_id_are_keyed_by_content():
+    event = {"type": "checkout.session.completed", "data": {"object": {"id": "cs_1"}}}
+    assert event_key(event).startswith("sha256:")
+    assert event_key(event) == event_key(dict(reversed(list(event.items()))))
+    assert event_key(event, b"raw body") != event_key(event)
+    assert event_key(_event("evt_9")) == "evt_9"
+
+
+def test_failure_is_retried_with_exponential_backoff(make_queue, clock):
+    calls = []
+
+    async def handler(event):
+        calls.append(clock.now)
+        if len(calls) < 3:
+            raise RuntimeError("storage down")
+
+    queue = make_queue(handler, max_attempts=5)
+    start = clock.now
+    queue._insert("evt_1", _event("evt_1"))
+
+    run(_drain(queue))
+    row = _row(queue, "evt_1")
+    assert (row["status"], row["attempts"], row["error"]) == ("pending", 1, "storage down")
+    assert row["next_attempt"] == start + 2
+
+    run(_drain(queue))  # not due yet
+    assert len(calls) == 1
+
+    clock.now = start + 2
+    run(_drain(queue))
+    assert _row(queue, "evt_1")["next_attempt"] == clock.now + 4
+
+    clock.now += 4
+    run(_drain(queue))
+    row = _row(queue, "evt_1")
+    assert (row["status"], row["attempts"], row["error"]) == ("done", 3, None)
+    assert calls == [start, start + 2, start + 6]
+    assert queue.stats()["apply_latency_ms"]["count"] == 1
+
+
+def test_backoff_is_capped(make_queue, clock):
+    async def handler(event):
+        raise RuntimeError("still down")
+
+    queue = make_queue(handler, max_attempts=20)
+    queue._insert("evt_1", _event("evt_1"))
+    queue._db.execute("UPDATE webhook_events SET attempts = 12")
+    run(_drain(queue))
+    assert _row(queue, "evt_1")["next_attempt"] == clock.now + MAX_BACKOFF_SECONDS
+
+
+def test_event_is_parked_as_failed_after_max_attempts(make_queue, clock, capsys):
+    async def handler(event):
+        raise ValueError("bad payload")
+
+    queue = make_queue(handler, max_attempts=2)
+    queue._insert("evt_1", _event("evt_1"))
+    queue._insert("evt_2", _event("evt_2"))
+
+    run(_drain(queue))
+    clock.now += 2
+    run(_drain(queue))
+
+    row = _row(queue, "evt_1")
+    assert (row["status"], row["attempts"], row["error"]) == ("failed", 2, "bad payload")
+    assert row["processed_at"] == clock.now
+    assert "failed after 2 attempts" in capsys.readouterr().out
+
+    clock.now += MAX_BACKOFF_SECONDS
+    run(_drain(queue))  # parked events are not picked up again
+    stats = queue.stats()
+    assert (stats["pending"], stats["failed"], stats["failed_total"], stats["processed_total"]) == (0, 2, 2, 0)
+
+
+def test_purge_drops_processed_events_past_retention(make_queue, clock):
+    async def handler(event):
+        if event["id"] == "evt_bad":
+            raise RuntimeError("boom")
+
+    queue = make_queue(handler, max_attempts=1, retention_hours=1)
+    for event_id in ("evt_ok", "evt_bad"):
+        queue._insert(event_id, _event(event_id))
+    run(_drain(queue))
+
+    clock.now += 1800
+    queue._insert("evt_late", _event("evt_late"))  # still pending: never purged
+    assert queue.purge() == 0
+
+    clock.now += 1801
+    assert queue.purge() == 2
+    assert _row(queue, "evt_ok") is None and _row(queue, "evt_bad") is None
+    assert _row(queue, "evt_late")["status"] == "pending"
+    assert queue.stats()["lag_seconds"] == 1801.0
+
+
+def test_consumer_applies_events_in_arrival_order(make_queue):
+    applied = []
+
+    async def handler(event):
+        applied.append(event["id"])
+
+    async def scenario():
+        queue = make_queue(handler)
+        for n in range(3):
+            await queue.enqueue(_event(f"evt_{n}"))
+        assert queue.stats()["consumer_running"]
+        # Well under POLL_SECONDS: events enqueued mid-batch must wake the consumer.
+        for _ in range(200):
+            if queue.stats()["processed_total"] == 3:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return queue.stats()
+
+    stats = run(scenario())
+    assert applied == ["evt_0", "evt_1", "evt_2"]
+    assert not stats["consumer_running"]
+    assert stats["pending"] == 0 and stats["throughput_per_sec"] > 0